@@ -3,18 +3,195 @@ Configuration management for Visualización de Cultivos QGIS Plugin
 
 This module handles environment variables and configuration settings.
 It loads from .env file if available, with sensible defaults.
+
+Settings are resolved lazily: each one is parsed from the environment on
+first access and cached, so importing the module costs almost nothing.
+Config.reload() re-reads the environment and the .env file, and with
+ENABLE_HOT_RELOAD the .env file is watched and reloaded when it changes.
+Config.configure() tunes values at runtime (e.g. cache and memory limits),
+and Config.set_profile() switches every performance setting at once.
 """
+import importlib.util
 import os
+import threading
+import time
 from pathlib import Path
-from typing import Any, Union
+from typing import Any, Callable, Dict, Generic, List, Optional, TypeVar, Union
+
+# python-dotenv es opcional; se importa solo al leer el archivo .env
+DOTENV_AVAILABLE = importlib.util.find_spec('dotenv') is not None
+
+T = TypeVar('T')
+
+# Intervalo mínimo entre comprobaciones del archivo .env con ENABLE_HOT_RELOAD (segundos)
+HOT_RELOAD_INTERVAL = 1.0
+
+
+def env_bool(value: str) -> bool:
+    """Parse a boolean environment value ('true', '1', 'yes', 'on')"""
+    return value.lower() in ('true', '1', 'yes', 'on')
+
+
+def env_list(value: str) -> List[str]:
+    """Parse a comma-separated environment value"""
+    return value.split(',')
+
+
+# Valores por defecto de los ajustes de rendimiento en cada perfil
+# (una variable de entorno o Config.configure() tienen prioridad sobre el perfil)
+PERFORMANCE_PROFILES: Dict[str, Dict[str, str]] = {
+    # Equipos con poca RAM: pocos ids en memoria, instantáneas mapeadas y un solo proceso
+    'low_memory': {
+        'MAX_FEATURES_IN_MEMORY': '2000',
+        'CACHE_SIZE_MB': '32',
+        'RESULT_CACHE_ENTRIES': '32',
+        'SNAPSHOT_MEMORY_MAP': 'True',
+        'SELECTION_CHUNK_SIZE': '10000',
+        'SCAN_WORKERS': '1',
+    },
+    'balanced': {
+        'MAX_FEATURES_IN_MEMORY': '10000',
+        'CACHE_SIZE_MB': '256',
+        'RESULT_CACHE_ENTRIES': '256',
+        'SNAPSHOT_MEMORY_MAP': 'True',
+        'SELECTION_CHUNK_SIZE': '50000',
+        'SCAN_WORKERS': '0',
+    },
+    # Estaciones de trabajo: instantáneas copiadas a RAM y selecciones en bloques grandes
+    'max_throughput': {
+        'MAX_FEATURES_IN_MEMORY': '1000000',
+        'CACHE_SIZE_MB': '2048',
+        'RESULT_CACHE_ENTRIES': '4096',
+        'SNAPSHOT_MEMORY_MAP': 'False',
+        'SELECTION_CHUNK_SIZE': '250000',
+        'SCAN_WORKERS': '0',
+    },
+}
+DEFAULT_PROFILE = 'balanced'
+
+
+def env_profile(value: str) -> str:
+    """Parse a performance profile name (unknown names fall back to the default profile)"""
+    value = value.strip().lower()
+    return value if value in PERFORMANCE_PROFILES else DEFAULT_PROFILE
+
+
+class Setting(Generic[T]):
+    """
+    Configuration value read from the environment on first access
+
+    The raw value is the environment variable named like the attribute (or
+    the default) and is converted with parse; the result is cached until
+    Config.reload(). Assigning or patching the class attribute replaces the
+    setting, as with a plain class attribute.
+    """
+
+    def __init__(self, default: str, parse: Callable[[str], T] = str):
+        self.default = default
+        self.parse = parse
+        self.name = ''
+
+    def __set_name__(self, owner, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance, owner) -> T:
+        state = owner._settings
+        state.poll(owner)
+        try:
+            return state.values[self.name]
+        except KeyError:
+            return state.resolve(owner, self)
+
+    def default_for(self, owner) -> str:
+        """Raw value used when the environment does not set the variable"""
+        return self.default
+
+
+class ProfileSetting(Setting[T]):
+    """Setting whose default comes from the active PERFORMANCE_PROFILE"""
+
+    def __init__(self, parse: Callable[[str], T] = str):
+        super().__init__('', parse)
+
+    def default_for(self, owner) -> str:
+        return PERFORMANCE_PROFILES[owner.PERFORMANCE_PROFILE][self.name]
+
 
-# Try to load python-dotenv if available
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-    DOTENV_AVAILABLE = True
-except ImportError:
-    DOTENV_AVAILABLE = False
+class _SettingsState:
+    """Cached values, runtime overrides and .env file tracking of a Config class"""
+
+    def __init__(self, env_file: Path):
+        self.env_file = env_file
+        self.values: Dict[str, Any] = {}
+        self.overrides: Dict[str, Any] = {}
+        self.env_loaded = False
+        self.env_keys: Dict[str, str] = {}
+        self.env_mtime: Optional[float] = None
+        self.next_check = 0.0
+        self.lock = threading.RLock()
+
+    def resolve(self, owner, setting: Setting) -> Any:
+        """Parse and cache a setting"""
+        with self.lock:
+            if not self.env_loaded:
+                self.load_env_file()
+            if setting.name in self.overrides:
+                value = self.overrides[setting.name]
+            else:
+                value = setting.parse(os.environ.get(setting.name, setting.default_for(owner)))
+            self.values[setting.name] = value
+            return value
+
+    def load_env_file(self) -> None:
+        """
+        Copy the .env file into os.environ
+
+        Variables already set in the process environment win, as with
+        load_dotenv(); variables that came from a previous version of the
+        file are updated or removed.
+        """
+        self.env_loaded = True
+        self.env_mtime = self._mtime()
+        if not DOTENV_AVAILABLE:
+            return
+        from dotenv import dotenv_values
+        values = {key: value for key, value in dotenv_values(self.env_file).items()
+                  if value is not None} if self.env_mtime is not None else {}
+        for key in set(self.env_keys) - set(values):
+            # Solo se quita si nadie la cambió desde que se cargó
+            if os.environ.get(key) == self.env_keys[key]:
+                del os.environ[key]
+        loaded = {}
+        for key, value in values.items():
+            if key not in os.environ or os.environ[key] == self.env_keys.get(key):
+                os.environ[key] = value
+                loaded[key] = value
+        self.env_keys = loaded
+
+    def poll(self, owner) -> None:
+        """Reload when the .env file changed (ENABLE_HOT_RELOAD, checked at most once per interval)"""
+        if not self.env_loaded or time.monotonic() < self.next_check:
+            return
+        self.next_check = time.monotonic() + HOT_RELOAD_INTERVAL
+        if not owner.ENABLE_HOT_RELOAD:
+            # Sin recarga en caliente no vuelve a comprobarse hasta el próximo reload()
+            self.next_check = float('inf')
+            return
+        if self._mtime() != self.env_mtime:
+            self.reload()
+
+    def reload(self) -> None:
+        """Forget the cached values and read the .env file again"""
+        with self.lock:
+            self.values.clear()
+            self.load_env_file()
+            self.next_check = 0.0
+
+    def _mtime(self) -> Optional[float]:
+        try:
+            return self.env_file.stat().st_mtime
+        except OSError:
+            return None
 
 
 class Config:
@@ -22,124 +199,196 @@ class Config:
     
     # Base directory
     BASE_DIR = Path(__file__).parent.absolute()
+    _settings = _SettingsState(BASE_DIR / '.env')
     
     # =============================================================================
     # PROJECT CONFIGURATION
     # =============================================================================
-    PROJECT_NAME = os.getenv('PROJECT_NAME', 'visualizacion_de_cultivos')
-    PROJECT_VERSION = os.getenv('PROJECT_VERSION', '2.0.0')
-    DEBUG = os.getenv('DEBUG', 'False').lower() in ('true', '1', 'yes', 'on')
-    ENVIRONMENT = os.getenv('ENVIRONMENT', 'development')
+    PROJECT_NAME = Setting('visualizacion_de_cultivos')
+    PROJECT_VERSION = Setting('2.0.0')
+    DEBUG = Setting('False', env_bool)
+    ENVIRONMENT = Setting('development')
     
     # =============================================================================
     # DATA SOURCES
     # =============================================================================
-    CULTIVOS_GPKG_PATH = os.getenv('CULTIVOS_GPKG_PATH', str(BASE_DIR / 'Cultivos.gpkg'))
-    OCCIDENTE_GPKG_PATH = os.getenv('OCCIDENTE_GPKG_PATH', str(BASE_DIR / 'Occidente.gpkg'))
+    CULTIVOS_GPKG_PATH = Setting(str(BASE_DIR / 'Cultivos.gpkg'))
+    OCCIDENTE_GPKG_PATH = Setting(str(BASE_DIR / 'Occidente.gpkg'))
     
     # Test data paths
-    TEST_CULTIVOS_GPKG_PATH = os.getenv(
-        'TEST_CULTIVOS_GPKG_PATH', 
-        str(BASE_DIR / 'tests' / 'fixtures' / 'test_cultivos.gpkg')
-    )
-    TEST_OCCIDENTE_GPKG_PATH = os.getenv(
-        'TEST_OCCIDENTE_GPKG_PATH',
-        str(BASE_DIR / 'tests' / 'fixtures' / 'test_occidente.gpkg')
-    )
+    TEST_CULTIVOS_GPKG_PATH = Setting(str(BASE_DIR / 'tests' / 'fixtures' / 'test_cultivos.gpkg'))
+    TEST_OCCIDENTE_GPKG_PATH = Setting(str(BASE_DIR / 'tests' / 'fixtures' / 'test_occidente.gpkg'))
     
     # Layer names
-    DEFAULT_CROP_LAYER_NAME = os.getenv('DEFAULT_CROP_LAYER_NAME', 'Zonas de Cultivos')
-    DEFAULT_ZONES_PREFIX = os.getenv('DEFAULT_ZONES_PREFIX', 'Zona_')
+    DEFAULT_CROP_LAYER_NAME = Setting('Zonas de Cultivos')
+    DEFAULT_ZONES_PREFIX = Setting('Zona_')
     
     # =============================================================================
     # QGIS CONFIGURATION
     # =============================================================================
-    QGIS_PREFIX_PATH = os.getenv('QGIS_PREFIX_PATH', '/usr')
-    QGIS_PLUGIN_PATH = os.getenv(
-        'QGIS_PLUGIN_PATH',
-        '~/.local/share/QGIS/QGIS3/profiles/default/python/plugins'
-    )
+    QGIS_PREFIX_PATH = Setting('/usr')
+    QGIS_PLUGIN_PATH = Setting('~/.local/share/QGIS/QGIS3/profiles/default/python/plugins')
     
     # Plugin metadata
-    PLUGIN_AUTHOR = os.getenv('PLUGIN_AUTHOR', 'Your Name')
-    PLUGIN_EMAIL = os.getenv('PLUGIN_EMAIL', 'your.email@example.com')
-    PLUGIN_HOMEPAGE = os.getenv(
-        'PLUGIN_HOMEPAGE',
-        'https://github.com/yourusername/visualizacion_de_cultivos'
-    )
+    PLUGIN_AUTHOR = Setting('Your Name')
+    PLUGIN_EMAIL = Setting('your.email@example.com')
+    PLUGIN_HOMEPAGE = Setting('https://github.com/yourusername/visualizacion_de_cultivos')
     
     # =============================================================================
     # TESTING CONFIGURATION
     # =============================================================================
-    COVERAGE_MINIMUM = int(os.getenv('COVERAGE_MINIMUM', '60'))
-    COVERAGE_UNIT_MINIMUM = int(os.getenv('COVERAGE_UNIT_MINIMUM', '40'))
-    COVERAGE_FUNCTIONAL_MINIMUM = int(os.getenv('COVERAGE_FUNCTIONAL_MINIMUM', '30'))
+    COVERAGE_MINIMUM = Setting('60', int)
+    COVERAGE_UNIT_MINIMUM = Setting('40', int)
+    COVERAGE_FUNCTIONAL_MINIMUM = Setting('30', int)
     
     # Test timeouts (in seconds)
-    UNIT_TEST_TIMEOUT = int(os.getenv('UNIT_TEST_TIMEOUT', '300'))
-    FUNCTIONAL_TEST_TIMEOUT = int(os.getenv('FUNCTIONAL_TEST_TIMEOUT', '600'))
-    INTEGRATION_TEST_TIMEOUT = int(os.getenv('INTEGRATION_TEST_TIMEOUT', '900'))
+    UNIT_TEST_TIMEOUT = Setting('300', int)
+    FUNCTIONAL_TEST_TIMEOUT = Setting('600', int)
+    INTEGRATION_TEST_TIMEOUT = Setting('900', int)
+    
+    # Performance benchmarks (run_tests.py --type perf)
+    PERF_TOLERANCE = Setting('0.50', float)  # Allowed throughput drop vs. baseline
+    PERF_ZONES = Setting('20000', int)
+    
+    # Parallel test workers with pytest-xdist ('auto' = one per CPU, '0' = serial)
+    TEST_WORKERS = Setting('auto')
     
     # Test configuration
-    USE_MOCK_DATA = os.getenv('USE_MOCK_DATA', 'True').lower() in ('true', '1', 'yes', 'on')
-    GENERATE_TEST_REPORTS = os.getenv('GENERATE_TEST_REPORTS', 'True').lower() in ('true', '1', 'yes', 'on')
-    SAVE_TEST_ARTIFACTS = os.getenv('SAVE_TEST_ARTIFACTS', 'True').lower() in ('true', '1', 'yes', 'on')
+    USE_MOCK_DATA = Setting('True', env_bool)
+    GENERATE_TEST_REPORTS = Setting('True', env_bool)
+    SAVE_TEST_ARTIFACTS = Setting('True', env_bool)
     
     # =============================================================================
     # CI/CD CONFIGURATION
     # =============================================================================
-    GITHUB_REPOSITORY = os.getenv('GITHUB_REPOSITORY', 'yourusername/visualizacion_de_cultivos')
-    GITHUB_BRANCH = os.getenv('GITHUB_BRANCH', 'develop')
+    GITHUB_REPOSITORY = Setting('yourusername/visualizacion_de_cultivos')
+    GITHUB_BRANCH = Setting('develop')
     
     # Test matrix
-    PYTHON_VERSIONS = os.getenv('PYTHON_VERSIONS', '3.8,3.9,3.10,3.11').split(',')
-    TEST_OS = os.getenv('TEST_OS', 'ubuntu-latest')
+    PYTHON_VERSIONS = Setting('3.8,3.9,3.10,3.11', env_list)
+    TEST_OS = Setting('ubuntu-latest')
     
     # Quality checks
-    RUN_LINT_CHECKS = os.getenv('RUN_LINT_CHECKS', 'True').lower() in ('true', '1', 'yes', 'on')
-    RUN_SECURITY_CHECKS = os.getenv('RUN_SECURITY_CHECKS', 'True').lower() in ('true', '1', 'yes', 'on')
-    RUN_TYPE_CHECKS = os.getenv('RUN_TYPE_CHECKS', 'True').lower() in ('true', '1', 'yes', 'on')
+    RUN_LINT_CHECKS = Setting('True', env_bool)
+    RUN_SECURITY_CHECKS = Setting('True', env_bool)
+    RUN_TYPE_CHECKS = Setting('True', env_bool)
     
     # =============================================================================
     # LOGGING CONFIGURATION
     # =============================================================================
-    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
-    LOG_FORMAT = os.getenv(
-        'LOG_FORMAT',
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    LOG_FILE_PATH = os.getenv('LOG_FILE_PATH', str(BASE_DIR / 'logs' / 'plugin.log'))
-    ENABLE_CONSOLE_LOGGING = os.getenv('ENABLE_CONSOLE_LOGGING', 'True').lower() in ('true', '1', 'yes', 'on')
+    LOG_LEVEL = Setting('INFO', str.upper)
+    LOG_FORMAT = Setting('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    LOG_FILE_PATH = Setting(str(BASE_DIR / 'logs' / 'plugin.log'))
+    ENABLE_CONSOLE_LOGGING = Setting('True', env_bool)
     
     # =============================================================================
     # DEVELOPMENT CONFIGURATION
     # =============================================================================
-    ENABLE_HOT_RELOAD = os.getenv('ENABLE_HOT_RELOAD', 'True').lower() in ('true', '1', 'yes', 'on')
-    AUTO_COMPILE_RESOURCES = os.getenv('AUTO_COMPILE_RESOURCES', 'True').lower() in ('true', '1', 'yes', 'on')
+    ENABLE_HOT_RELOAD = Setting('True', env_bool)
+    AUTO_COMPILE_RESOURCES = Setting('True', env_bool)
     
     # Development paths
-    DEV_DATA_DIR = os.getenv('DEV_DATA_DIR', str(BASE_DIR / 'dev_data'))
-    BACKUP_DATA_DIR = os.getenv('BACKUP_DATA_DIR', str(BASE_DIR / 'backups'))
+    DEV_DATA_DIR = Setting(str(BASE_DIR / 'dev_data'))
+    BACKUP_DATA_DIR = Setting(str(BASE_DIR / 'backups'))
     
     # =============================================================================
     # PERFORMANCE CONFIGURATION
     # =============================================================================
-    MAX_FEATURES_IN_MEMORY = int(os.getenv('MAX_FEATURES_IN_MEMORY', '10000'))
-    ENABLE_FEATURE_CACHING = os.getenv('ENABLE_FEATURE_CACHING', 'True').lower() in ('true', '1', 'yes', 'on')
-    CACHE_SIZE_MB = int(os.getenv('CACHE_SIZE_MB', '256'))
+    # low_memory, balanced or max_throughput: defaults of the settings below
+    # that are not set explicitly (see PERFORMANCE_PROFILES)
+    PERFORMANCE_PROFILE = Setting(DEFAULT_PROFILE, env_profile)
+    # Larger query results are spooled to disk instead of kept in memory
+    MAX_FEATURES_IN_MEMORY = ProfileSetting(int)
+    ENABLE_FEATURE_CACHING = Setting('True', env_bool)
+    # Memory budget of an attribute snapshot held in RAM
+    CACHE_SIZE_MB = ProfileSetting(int)
+    # Per-crop totals kept by the "Datos" panel cache (least recently used dropped)
+    RESULT_CACHE_ENTRIES = ProfileSetting(int)
+    # Memory-map persisted snapshots instead of reading them into RAM
+    SNAPSHOT_MEMORY_MAP = ProfileSetting(env_bool)
+    # Selections with more changed ids are applied in chunks from the event loop
+    SELECTION_CHUNK_SIZE = ProfileSetting(int)
+    # Worker processes of the partitioned batch queries (0 = one per CPU)
+    SCAN_WORKERS = ProfileSetting(int)
+    # Read GeoPackage layers directly with sqlite3 for attribute-only queries
+    ENABLE_GPKG_FAST_PATH = Setting('True', env_bool)
+    # Create the attribute indexes on first use of a GeoPackage (see maintain_gpkg.py)
+    AUTO_CREATE_GPKG_INDEXES = Setting('False', env_bool)
+    # Persist the attribute snapshot between sessions (memory-mapped on warm start)
+    PERSIST_ATTRIBUTE_SNAPSHOT = Setting('True', env_bool)
+    SNAPSHOT_CACHE_DIR = Setting(str(BASE_DIR / 'cache'))
+    SNAPSHOT_VALIDATE_HASH = Setting('False', env_bool)
+    # Filter departments by the zone -> department spatial join once it is stored
+    # in the GeoPackage ('python maintain_gpkg.py join'), instead of NOM_DPTO
+    USE_SPATIAL_DEPARTMENT_JOIN = Setting('True', env_bool)
     
     # =============================================================================
     # UI CONFIGURATION
     # =============================================================================
-    DEFAULT_WINDOW_WIDTH = int(os.getenv('DEFAULT_WINDOW_WIDTH', '800'))
-    DEFAULT_WINDOW_HEIGHT = int(os.getenv('DEFAULT_WINDOW_HEIGHT', '600'))
-    DEFAULT_MAP_ZOOM = int(os.getenv('DEFAULT_MAP_ZOOM', '10'))
-    ENABLE_TOOLTIPS = os.getenv('ENABLE_TOOLTIPS', 'True').lower() in ('true', '1', 'yes', 'on')
+    DEFAULT_WINDOW_WIDTH = Setting('800', int)
+    DEFAULT_WINDOW_HEIGHT = Setting('600', int)
+    DEFAULT_MAP_ZOOM = Setting('10', int)
+    ENABLE_TOOLTIPS = Setting('True', env_bool)
+    # Zoom the map canvas to the zones found by a query
+    ZOOM_TO_QUERY_RESULTS = Setting('True', env_bool)
     
     # Theme configuration
-    UI_THEME = os.getenv('UI_THEME', 'default')
-    ICON_SIZE = int(os.getenv('ICON_SIZE', '24'))
-    ENABLE_ANIMATIONS = os.getenv('ENABLE_ANIMATIONS', 'True').lower() in ('true', '1', 'yes', 'on')
+    UI_THEME = Setting('default')
+    ICON_SIZE = Setting('24', int)
+    ENABLE_ANIMATIONS = Setting('True', env_bool)
+    
+    @classmethod
+    def reload(cls) -> None:
+        """Re-read every setting from the environment and the .env file"""
+        cls._settings.reload()
+    
+    @classmethod
+    def configure(cls, **values: Any) -> None:
+        """
+        Override settings at runtime (they survive reload())
+
+        Args:
+            values: Setting name to value, already of the setting's type;
+                None removes the override
+
+        Raises:
+            AttributeError: If a name is not a setting
+        """
+        for name in values:
+            if not isinstance(cls.__dict__.get(name), Setting):
+                raise AttributeError(f"Unknown setting: {name}")
+        with cls._settings.lock:
+            for name, value in values.items():
+                if value is None:
+                    cls._settings.overrides.pop(name, None)
+                else:
+                    cls._settings.overrides[name] = value
+            cls._settings.values.clear()
+    
+    @classmethod
+    def set_profile(cls, name: str) -> None:
+        """
+        Switch the performance profile at runtime
+
+        Settings set through the environment or configure() keep their value.
+
+        Raises:
+            ValueError: If the profile does not exist
+        """
+        if name not in PERFORMANCE_PROFILES:
+            raise ValueError(f"Unknown performance profile: {name} "
+                             f"(expected one of {', '.join(PERFORMANCE_PROFILES)})")
+        cls.configure(PERFORMANCE_PROFILE=name)
+    
+    @classmethod
+    def profile_settings(cls) -> Dict[str, Any]:
+        """Current value of every setting tuned by the performance profile"""
+        return {name: getattr(cls, name) for name in PERFORMANCE_PROFILES[cls.PERFORMANCE_PROFILE]}
+    
+    @classmethod
+    def settings(cls) -> Dict[str, Any]:
+        """Current value of every setting"""
+        return {name: getattr(cls, name) for name, value in vars(cls).items() if isinstance(value, Setting)}
     
     @classmethod
     def get_data_path(cls, environment: str = None) -> str:
@@ -202,6 +451,9 @@ class Config:
         print(f"Data Path: {cls.get_data_path()}")
         print(f"Coverage Minimum: {cls.COVERAGE_MINIMUM}%")
         print(f"Log Level: {cls.LOG_LEVEL}")
+        print(f"Performance Profile: {cls.PERFORMANCE_PROFILE}")
+        for name, value in cls.profile_settings().items():
+            print(f"  {name}: {value}")
         print("=" * 50)
 
 
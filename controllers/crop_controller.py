@@ -1,32 +1,73 @@
-from qgis.core import QgsVectorLayer, QgsProject, QgsLayerTreeLayer
+from qgis.core import (Qgis, QgsVectorLayer, QgsProject, QgsLayerTreeLayer, QgsCoordinateTransform, QgsRectangle,
+                       QgsGeometry, QgsMessageLog)
+from config import Config
 from models.crop_model import CropModel
+from models.query_engine import CropQueryEngine
 from views.crop_view import CropView
-import unicodedata
+from controllers.layer_visibility import LayerVisibilityManager
+from controllers.department_highlight import DepartmentHighlighter
+from controllers.polygon_capture import PolygonCaptureTool
+from controllers.selection_applier import SelectionApplier
+from models.spatial_filter import SPATIAL_MODE_EXTENT, SPATIAL_MODE_POLYGON, intersecting_zones
+
+# Grupos del árbol de capas con las capas de departamentos
+ZONE_GROUPS = ["Zona_Occidental", "Zona_Central", "Zona_Oriental"]
+# Pestaña del registro de mensajes de QGIS con los detalles de cada consulta
+LOG_TAG = "Visualización de Cultivos"
 
 class CropController:
     def __init__(self, iface):
         self.iface = iface
         self.model = CropModel()
-        self.view = CropView()
+        self.engine = CropQueryEngine()
+        self.view = CropView(query_engine=self.engine)
+        self.visibility = LayerVisibilityManager(iface)
+        self.highlighter = DepartmentHighlighter(iface)
+        self.selection = SelectionApplier(iface)
+        self.polygon_tool = None
+        self.drawn_region = None  # (geometría, SRC del lienzo)
         
         # Connect signals
-        self.view.btnConsultar.clicked.connect(self.handle_query)
-        self.view.btnLimpiar.clicked.connect(self.handle_clear)
-        self.view.cmbZona.currentIndexChanged.connect(self.handle_zone_change)
+        signals = self.view.signals
+        signals.connect(self.view.btnConsultar, 'clicked', self.handle_query)
+        signals.connect(self.view.btnLimpiar, 'clicked', self.handle_clear)
+        signals.connect(self.view.btnDibujarPoligono, 'clicked', self.start_polygon_capture)
+        signals.connect(self.view.cmbZona, 'currentIndexChanged', self.handle_zone_change)
         for radio in self.view.radio_departamentos:
-            radio.toggled.connect(self.handle_departments_change)
+            signals.connect(radio, 'toggled', self.handle_departments_change)
         
         # Connect table tab signals
-        self.view.btnConsultarTabla.clicked.connect(self.handle_table_query)
-        self.view.btnLimpiarTabla.clicked.connect(self.handle_table_clear)
+        signals.connect(self.view.btnConsultarTabla, 'clicked', self.handle_table_query)
+        signals.connect(self.view.btnLimpiarTabla, 'clicked', self.handle_table_clear)
         
         # Initialize view
-        self.view.set_available_crops(self.model.get_available_crops())
+        self.view.set_available_crops(self.available_crops())
         self.view.set_departments_by_zone(self.view.get_selected_zone())
         
+    def available_crops(self):
+        """Crops of the 'Zonas de Cultivos' layer, or the default list if it is not loaded"""
+        for lyr in QgsProject.instance().mapLayers().values():
+            if lyr.name() == "Zonas de Cultivos":
+                # Columnas CUL_* con datos; cultivos nuevos aparecen sin cambiar código
+                crops = list(self.engine.discover_crops(lyr))
+                for column, values in self.engine.unexpected_levels(lyr).items():
+                    QgsMessageLog.logMessage(
+                        f"{column}: niveles de producción desconocidos ({', '.join(values)}); "
+                        f"esas zonas no aparecen en las consultas", LOG_TAG, Qgis.Warning)
+                if crops:
+                    return crops
+                break
+        return self.model.get_available_crops()
+
     def show_dialog(self):
         """Show the dialog"""
         self.view.exec_()
+
+    def unload(self):
+        """Remove the map canvas items created by the plugin"""
+        self.highlighter.unload()
+        if self.polygon_tool:
+            self.polygon_tool.reset()
         
     def handle_query(self):
         """Handle the query button click"""
@@ -55,50 +96,115 @@ class CropController:
             return
 
         # Mapear el nombre del cultivo a la columna correspondiente
-        cultivo_col_map = {
-            "Maíz": "CUL_MAIZ",
-            "Frijol": "CUL_FRIJOL",
-            "Caña de azúcar": "CUL_CAÑA_DE_AZUCAR",
-            "Papa": "CUL_PAPA",
-            "Café": "CUL_CAFE",
-            "Tomate": "CUL_TOMATE"
-        }
-        col_cultivo = cultivo_col_map.get(cultivo)
+        col_cultivo = self.engine.crop_column(layer, cultivo)
         if not col_cultivo:
             self.view.show_error("Tipo de cultivo no válido.")
             return
 
-        # Normalizar departamentos seleccionados (mayúsculas, sin tildes, excepto SANTA ANA)
-        def normalize(text):
-            if text == 'SANTA ANA':
-                return 'SANTA ANA'
-            text = text.upper()
-            text = ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
-            return text
-        departamentos_norm = [normalize(dep) for dep in departamentos]
-
-        # Contar zonas que cumplen los filtros y guardar sus IDs
-        count = 0
-        ids_a_resaltar = []
-        for feature in layer.getFeatures():
-            nom_dpto = feature["NOM_DPTO"]
-            nom_dpto_norm = normalize(nom_dpto)
-            if (
-                nom_dpto_norm in departamentos_norm and
-                feature[col_cultivo] and
-                str(feature[col_cultivo]).strip().upper() == produccion.strip().upper()
-            ):
-                count += 1
-                ids_a_resaltar.append(feature.id())
-
-        # Seleccionar y resaltar los features encontrados
-        layer.removeSelection()
-        if ids_a_resaltar:
-            layer.selectByIds(ids_a_resaltar)
-        # Mostrar resultado en el formulario
-        self.view.lblFeatureCount.setText(str(count))
-        self.view.status_label.setText("Consulta realizada con éxito")
+        # Región del mapa del modo espacial (antes de consultar: sin polígono no hay consulta)
+        mode = self.view.get_spatial_mode()
+        region = None
+        if mode in (SPATIAL_MODE_EXTENT, SPATIAL_MODE_POLYGON):
+            region = self.query_region(layer, mode)
+            if region is None:
+                self.view.show_error("Dibuje un polígono en el mapa antes de consultar.")
+                return
+
+        # Buscar las zonas que cumplen los filtros (SQL directo sobre el GeoPackage si es posible)
+        ids_a_resaltar = self.engine.find_zones(layer, departamentos, col_cultivo, produccion)
+
+        explain = self.engine.last_explain
+
+        # Restringir a la región del mapa si se eligió un modo espacial
+        if region is not None:
+            with explain.stage('filter'):
+                ids_a_resaltar = intersecting_zones(self.engine, layer, ids_a_resaltar, region)
+        count = len(ids_a_resaltar)
+
+        # Seleccionar y resaltar los features encontrados (solo los cambios)
+        with explain.stage('select'):
+            self.selection.apply(layer, ids_a_resaltar, on_progress=self.show_selection_progress)
+        with explain.stage('render'):
+            if Config.ZOOM_TO_QUERY_RESULTS:
+                self.zoom_to_results(layer, ids_a_resaltar)
+            # Mostrar resultado en el formulario
+            self.view.lblFeatureCount.setText(str(count))
+        self.view.status_label.setText(f"Consulta realizada con éxito: {explain.summary()}")
+        QgsMessageLog.logMessage(explain.details(), LOG_TAG, Qgis.Info)
         
+    def show_selection_progress(self, applied, total):
+        if applied < total:
+            self.view.status_label.setText(f"Aplicando selección... {applied * 100 // total}%")
+        else:
+            self.view.status_label.setText(f"Consulta realizada con éxito: {self.engine.last_explain.summary()}")
+
+    def start_polygon_capture(self):
+        """Activate the map tool to draw the query polygon"""
+        canvas = self.iface.mapCanvas()
+        if self.polygon_tool is None:
+            self.polygon_tool = PolygonCaptureTool(canvas, self.handle_polygon_drawn)
+        self.polygon_tool.reset()
+        self.drawn_region = None
+        canvas.setMapTool(self.polygon_tool)
+        self.view.status_label.setText("Dibuje el polígono en el mapa (clic derecho para terminar)")
+
+    def handle_polygon_drawn(self, geometry):
+        self.drawn_region = (geometry, self.iface.mapCanvas().mapSettings().destinationCrs())
+        self.view.status_label.setText("Polígono de búsqueda definido")
+
+    def query_region(self, layer, mode):
+        """
+        Region of the spatial query mode, in layer CRS
+
+        Returns:
+            The region geometry, or None if no polygon has been drawn
+        """
+        canvas = self.iface.mapCanvas()
+        if mode == SPATIAL_MODE_EXTENT:
+            region = QgsGeometry.fromRect(canvas.extent())
+            crs = canvas.mapSettings().destinationCrs()
+        elif self.drawn_region is not None:
+            region = QgsGeometry(self.drawn_region[0])
+            crs = self.drawn_region[1]
+        else:
+            return None
+        region.transform(QgsCoordinateTransform(crs, layer.crs(), QgsProject.instance()))
+        return region
+
+    def zoom_to_results(self, layer, ids):
+        """
+        Zoom the map canvas to the zones found by a query
+
+        The extent comes from the cached per-feature bounding boxes; without
+        results, the cached outlines of the highlighted departments are used.
+        """
+        extents = []
+        extent = self.engine.result_extent(layer, ids)
+        if extent is not None:
+            extents.append((layer, extent))
+        else:
+            for department_layer in self.highlighter.highlighted_layers():
+                extent = self.highlighter.extent(department_layer)
+                if extent is not None:
+                    extents.append((department_layer, extent))
+        if not extents:
+            return
+
+        canvas = self.iface.mapCanvas()
+        destination = canvas.mapSettings().destinationCrs()
+        target = None
+        for source_layer, (xmin, ymin, xmax, ymax) in extents:
+            transform = QgsCoordinateTransform(source_layer.crs(), destination, QgsProject.instance())
+            rect = transform.transformBoundingBox(QgsRectangle(xmin, ymin, xmax, ymax))
+            if target is None:
+                target = rect
+            else:
+                target.combineExtentWith(rect)
+        # Dejar un margen alrededor de las zonas
+        target.scale(1.1)
+        canvas.setExtent(target)
+        canvas.refresh()
+
     def handle_zone_change(self):
         zona = self.view.get_selected_zone()
         self.view.set_departments_by_zone(zona)
@@ -114,30 +220,16 @@ class CropController:
         group = root.findGroup(zona)
         if not group:
             return
-        found = False
-        # Primero, apagar todas las capas del grupo
-        for child in group.children():
-            try:
-                # Try to call setItemVisibilityChecked - this will work for QgsLayerTreeLayer objects
-                child.setItemVisibilityChecked(False)
-            except AttributeError:
-                # Skip if this child doesn't have the method
-                continue
-        # Luego, encender solo la seleccionada
-        for child in group.children():
-            try:
-                if hasattr(child, 'name') and child.name() in departamentos:
-                    child.setItemVisibilityChecked(True)
-                    layer = child.layer()
-                    if layer:
-                        self.iface.setActiveLayer(layer)
-                        # Seleccionar todos los features para sombrear
-                        layer.removeSelection()
-                        layer.selectAll()
-                    found = True
-            except AttributeError:
-                # Skip if this child doesn't have the methods we need
-                continue
+        # Encender solo las capas seleccionadas y sombrearlas con un único repintado
+        with self.visibility.batch():
+            matched = self.visibility.show_only(group, departamentos)
+            layers = [child.layer() for child in matched if hasattr(child, 'layer') and child.layer()]
+            for layer in layers:
+                self.iface.setActiveLayer(layer)
+            # Sombrear con el contorno del departamento en lugar de seleccionar todos los features
+            self.highlighter.highlight(layers)
+            self.visibility.mark_dirty()
+        found = bool(matched)
         if not found:
             self.view.status_label.setText(f"No se encontraron las capas seleccionadas en el grupo '{zona}'")
         else:
@@ -156,15 +248,18 @@ class CropController:
         self.view.status_label.setText("")
         # Apagar visibilidad de todas las capas de todas las zonas
         root = QgsProject.instance().layerTreeRoot()
-        for zona in ["Zona_Occidental", "Zona_Central", "Zona_Oriental"]:
-            group = root.findGroup(zona)
-            if group:
-                for child in group.children():
-                    child.setItemVisibilityChecked(False)
-        # Limpiar selección y restaurar color por defecto en la capa 'Zonas de Cultivos'
-        for lyr in QgsProject.instance().mapLayers().values():
-            if lyr.name() == "Zonas de Cultivos":
-                lyr.removeSelection()
+        with self.visibility.batch():
+            self.visibility.hide_groups(root, ZONE_GROUPS)
+            self.highlighter.clear()
+            self.visibility.mark_dirty()
+            # Limpiar selección y restaurar color por defecto en la capa 'Zonas de Cultivos'
+            for lyr in QgsProject.instance().mapLayers().values():
+                if lyr.name() == "Zonas de Cultivos":
+                    self.selection.clear(lyr)
+                    self.visibility.mark_dirty()
+        self.drawn_region = None
+        if self.polygon_tool:
+            self.polygon_tool.reset()
         self.view.status_label.setText("Formulario limpiado")
 
     def handle_table_query(self):
@@ -195,53 +290,16 @@ class CropController:
             return
 
         # Mapear el nombre del cultivo a la columna correspondiente
-        cultivo_col_map = {
-            "Maíz": "CUL_MAIZ",
-            "Frijol": "CUL_FRIJOL",
-            "Caña de azúcar": "CUL_CAÑA_DE_AZUCAR",
-            "Papa": "CUL_PAPA",
-            "Café": "CUL_CAFE",
-            "Tomate": "CUL_TOMATE"
-        }
-        col_cultivo = cultivo_col_map.get(cultivo)
+        col_cultivo = self.engine.crop_column(layer, cultivo)
         if not col_cultivo:
             self.view.show_error("Tipo de cultivo no válido.")
             return
 
-        # Recopilar datos de todas las zonas
-        zonas_data = []
-        for feature in layer.getFeatures():
-            nom_dpto = feature["NOM_DPTO"]
-            nom_mun = feature["NOM_MUN"]
-            area_km2 = feature["AREA_KM2"]
-            nivel_produccion = feature[col_cultivo]
-            
-            # Solo incluir si tiene datos válidos y cumple con el rango de área
-            if (nom_dpto and nom_mun and area_km2 and nivel_produccion and 
-                area_min <= float(area_km2) <= area_max):
-                zonas_data.append({
-                    'departamento': nom_dpto,
-                    'municipio': nom_mun,
-                    'area': float(area_km2),
-                    'produccion': str(nivel_produccion).strip()
-                })
-
-        # Ordenar por área de mayor a menor y tomar el TOP N
-        zonas_data.sort(key=lambda x: x['area'], reverse=True)
-        top_zonas = zonas_data[:top_count]
-
-        # Preparar datos para la tabla
-        table_data = []
-        for zona in top_zonas:
-            table_data.append([
-                zona['departamento'],
-                zona['municipio'],
-                f"{zona['area']:.2f}",
-                zona['produccion']
-            ])
-
-        # Actualizar la tabla
-        self.view.update_table_data(table_data)
+        # Obtener las TOP N zonas de mayor área dentro del rango
+        top_zonas = self.engine.top_zones(layer, col_cultivo, area_min, area_max, top_count)
+
+        # Actualizar la tabla (las celdas se formatean al mostrarse)
+        self.view.update_table_data(top_zonas)
         self.view.status_label.setText(f"TOP {top_count} zonas mostradas para {cultivo} (área: {area_min}-{area_max} km²)")
 
     def handle_table_clear(self):
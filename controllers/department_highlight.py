@@ -0,0 +1,116 @@
+"""
+Department shading with map canvas rubber bands.
+
+Selecting every feature of a department layer builds a selection set of all
+its feature ids and triggers a selection repaint. Instead, the dissolved
+outline of each department is computed once and drawn by a rubber band that
+is kept per layer, so highlighting a department again only shows an
+existing canvas item.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from qgis.core import QgsGeometry, QgsWkbTypes
+from qgis.gui import QgsRubberBand
+
+# Opacidad del relleno: la banda se dibuja sobre todas las capas y no debe ocultar las zonas
+HIGHLIGHT_FILL_ALPHA = 60
+
+
+class DepartmentHighlighter:
+    """Draws cached department outlines on the map canvas"""
+
+    def __init__(self, iface):
+        self.iface = iface
+        self._outlines: Dict[str, object] = {}  # layer id -> dissolved QgsGeometry
+        self._bands: Dict[str, object] = {}     # layer id -> QgsRubberBand
+        self._shown: List = []
+        self._watched = set()  # layer ids whose dataChanged is connected
+
+    def outline(self, layer):
+        """Dissolved geometry of a layer, in layer CRS (computed once per layer)"""
+        key = layer.id()
+        geometry = self._outlines.get(key)
+        if geometry is None:
+            geometries = [f.geometry() for f in layer.getFeatures() if f.hasGeometry()]
+            geometry = QgsGeometry.unaryUnion(geometries) if geometries else QgsGeometry()
+            self._outlines[key] = geometry
+            if key not in self._watched:
+                # Recalcular el contorno si cambian los datos de la capa (una conexión por capa)
+                layer.dataChanged.connect(lambda key=key: self.invalidate(key))
+                self._watched.add(key)
+        return geometry
+
+    def highlight(self, layers: Iterable) -> int:
+        """
+        Shade the given layers and hide the highlight of any other layer
+
+        Returns:
+            Number of layers highlighted
+        """
+        shown = set()
+        self._shown = []
+        for layer in layers:
+            key = layer.id()
+            band = self._bands.get(key)
+            if band is None:
+                band = self._create_band(layer)
+                self._bands[key] = band
+            band.show()
+            shown.add(key)
+            self._shown.append(layer)
+        for key, band in self._bands.items():
+            if key not in shown:
+                band.hide()
+        return len(shown)
+
+    def clear(self) -> None:
+        """Hide every highlight (cached outlines and bands are kept)"""
+        self._shown = []
+        for band in self._bands.values():
+            band.hide()
+
+    def highlighted_layers(self) -> List:
+        """Layers currently highlighted"""
+        return list(self._shown)
+
+    def extent(self, layer) -> Optional[Tuple[float, float, float, float]]:
+        """(xmin, ymin, xmax, ymax) of a layer's cached outline, in layer CRS"""
+        geometry = self.outline(layer)
+        if geometry.isEmpty():
+            return None
+        box = geometry.boundingBox()
+        return (box.xMinimum(), box.yMinimum(), box.xMaximum(), box.yMaximum())
+
+    def invalidate(self, layer_id: str = None) -> None:
+        """Drop the cached outline and band of a layer, or of all layers"""
+        keys = [layer_id] if layer_id is not None else list(self._bands.keys() | self._outlines.keys())
+        for key in keys:
+            self._outlines.pop(key, None)
+            self._shown = [layer for layer in self._shown if layer.id() != key]
+            band = self._bands.pop(key, None)
+            if band is not None:
+                self._remove_band(band)
+
+    def unload(self) -> None:
+        """Remove every rubber band from the canvas"""
+        for band in self._bands.values():
+            self._remove_band(band)
+        self._bands.clear()
+        self._outlines.clear()
+        self._shown = []
+
+    def _create_band(self, layer):
+        canvas = self.iface.mapCanvas()
+        band = QgsRubberBand(canvas, QgsWkbTypes.PolygonGeometry)
+        # selectionColor() devuelve una copia: el relleno translúcido no altera el contorno
+        fill = canvas.selectionColor()
+        fill.setAlpha(HIGHLIGHT_FILL_ALPHA)
+        band.setFillColor(fill)
+        band.setStrokeColor(canvas.selectionColor())
+        band.setWidth(1)
+        band.setToGeometry(self.outline(layer), layer)
+        return band
+
+    def _remove_band(self, band) -> None:
+        band.reset(QgsWkbTypes.PolygonGeometry)
+        self.iface.mapCanvas().scene().removeItem(band)
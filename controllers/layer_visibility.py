@@ -0,0 +1,99 @@
+"""
+Batched layer tree visibility updates.
+
+Every setItemVisibilityChecked() call emits layer tree signals and
+schedules a canvas refresh. The manager computes the target visibility of
+the affected nodes, touches only the ones that actually change and wraps
+the whole update in a single canvas freeze/refresh.
+"""
+from contextlib import contextmanager
+from typing import Iterable, List, Tuple
+
+
+class LayerVisibilityManager:
+    """Applies layer tree visibility changes with a single canvas repaint"""
+
+    def __init__(self, iface):
+        self.iface = iface
+        self._depth = 0
+        self._dirty = False
+
+    @contextmanager
+    def batch(self):
+        """
+        Freeze the map canvas while changes are applied
+
+        Batches can be nested; the canvas is refreshed once, when the
+        outermost batch ends and something was changed.
+        """
+        canvas = self.iface.mapCanvas()
+        if self._depth == 0:
+            self._dirty = False
+            canvas.freeze(True)
+        self._depth += 1
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                canvas.freeze(False)
+                if self._dirty:
+                    canvas.refresh()
+
+    def mark_dirty(self) -> None:
+        """Request a refresh at the end of the batch (e.g. after a selection change)"""
+        self._dirty = True
+
+    def apply(self, targets: Iterable[Tuple[object, bool]]) -> int:
+        """
+        Set the visibility of layer tree nodes, skipping those already in the target state
+
+        Args:
+            targets: (node, visible) pairs
+
+        Returns:
+            Number of nodes whose visibility changed
+        """
+        changes = [
+            (node, visible) for node, visible in targets
+            if hasattr(node, 'setItemVisibilityChecked') and node.itemVisibilityChecked() != visible
+        ]
+        if not changes:
+            return 0
+        with self.batch():
+            for node, visible in changes:
+                node.setItemVisibilityChecked(visible)
+            self.mark_dirty()
+        return len(changes)
+
+    def show_only(self, group, names: Iterable[str]) -> List:
+        """
+        Make visible only the children of a group with the given names
+
+        Returns:
+            The children that matched one of the names
+        """
+        names = set(names)
+        targets = []
+        matched = []
+        for child in group.children():
+            visible = hasattr(child, 'name') and child.name() in names
+            targets.append((child, visible))
+            if visible:
+                matched.append(child)
+        self.apply(targets)
+        return matched
+
+    def hide_groups(self, root, group_names: Iterable[str]) -> int:
+        """
+        Hide every child of the named groups
+
+        Returns:
+            Number of nodes whose visibility changed
+        """
+        targets = []
+        for group_name in group_names:
+            group = root.findGroup(group_name)
+            if group:
+                targets.extend((child, False) for child in group.children())
+        return self.apply(targets)
@@ -0,0 +1,39 @@
+"""
+Map tool to draw the polygon used by the spatial query mode.
+"""
+from qgis.PyQt.QtCore import Qt
+from qgis.core import QgsGeometry, QgsWkbTypes
+from qgis.gui import QgsMapToolEmitPoint, QgsRubberBand
+
+
+class PolygonCaptureTool(QgsMapToolEmitPoint):
+    """Left click adds a vertex, right click closes the polygon"""
+
+    def __init__(self, canvas, on_finished):
+        super().__init__(canvas)
+        self.canvas = canvas
+        self.on_finished = on_finished
+        self.points = []
+        self.band = QgsRubberBand(canvas, QgsWkbTypes.PolygonGeometry)
+        self.band.setStrokeColor(canvas.selectionColor())
+        self.band.setWidth(2)
+
+    def canvasReleaseEvent(self, event):
+        if event.button() == Qt.RightButton:
+            self.finish()
+            return
+        point = self.toMapCoordinates(event.pos())
+        self.points.append(point)
+        self.band.addPoint(point)
+
+    def finish(self):
+        """Emit the drawn polygon (in canvas CRS) if it has at least three vertices"""
+        if len(self.points) >= 3:
+            self.on_finished(QgsGeometry.fromPolygonXY([self.points]))
+        self.points = []
+        self.canvas.unsetMapTool(self)
+
+    def reset(self):
+        """Remove the drawn polygon from the canvas"""
+        self.points = []
+        self.band.reset(QgsWkbTypes.PolygonGeometry)
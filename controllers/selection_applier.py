@@ -0,0 +1,116 @@
+"""
+Incremental application of query results to the layer selection.
+
+removeSelection() followed by selectByIds() repaints the selection twice
+and rebuilds it from scratch. The applier diffs the current and the new
+selection and hands only the additions and removals to modifySelection().
+Large diffs are applied in chunks from the Qt event loop, with the map
+canvas frozen until the last chunk, so the UI stays responsive and the
+selection is rendered once. Results spooled to disk (IdSpool) are streamed
+chunk by chunk instead of being loaded as a whole.
+"""
+from itertools import islice
+from typing import Callable, Iterable, Optional
+
+from config import Config
+from models.id_spool import IdSpool
+
+
+def schedule_in_event_loop(step: Callable) -> None:
+    """Run a step on the next iteration of the Qt event loop"""
+    from qgis.PyQt.QtCore import QTimer
+    QTimer.singleShot(0, step)
+
+
+class SelectionApplier:
+    """Applies selections as diffs, asynchronously for large id sets"""
+
+    def __init__(self, iface, chunk_size: Optional[int] = None, schedule: Optional[Callable] = None):
+        self.iface = iface
+        self._chunk_size = chunk_size
+        self._schedule = schedule or schedule_in_event_loop
+        self._job = 0
+        self._frozen = False
+
+    @property
+    def chunk_size(self) -> int:
+        """Ids applied per event loop step (Config.SELECTION_CHUNK_SIZE unless given)"""
+        return self._chunk_size or Config.SELECTION_CHUNK_SIZE
+
+    def apply(self, layer, ids: Iterable[int], on_progress: Optional[Callable] = None,
+              on_finished: Optional[Callable] = None) -> int:
+        """
+        Make the layer selection equal to the given ids
+
+        Args:
+            layer: Layer whose selection is updated
+            ids: Feature ids to select (a list or an IdSpool)
+            on_progress: Called with (applied, total) after each chunk
+            on_finished: Called once the whole selection is applied
+
+        Returns:
+            Number of ids added or removed
+        """
+        self.cancel()
+        current = set(layer.selectedFeatureIds())
+        if isinstance(ids, IdSpool):
+            # Resultado fuera de memoria: las altas se leen del almacén por bloques
+            to_remove = sorted(ids.missing(current))
+            add_count = len(ids) - (len(current) - len(to_remove))
+            additions = (fid for fid in ids if fid not in current)
+        else:
+            target = set(ids)
+            to_add = sorted(target - current)
+            to_remove = sorted(current - target)
+            add_count = len(to_add)
+            additions = iter(to_add)
+        total = add_count + len(to_remove)
+
+        if total <= self.chunk_size:
+            if total:
+                layer.modifySelection(list(additions), to_remove)
+            if on_finished:
+                on_finished()
+            return total
+
+        job = self._job
+        canvas = self.iface.mapCanvas()
+        canvas.freeze(True)
+        self._frozen = True
+
+        def step(added=0, remove_start=0):
+            if job != self._job:
+                return
+            to_add = list(islice(additions, self.chunk_size))
+            remove_end = min(remove_start + self.chunk_size - len(to_add), len(to_remove))
+            layer.modifySelection(to_add, to_remove[remove_start:remove_end])
+            added += len(to_add)
+            applied = added + remove_end
+            if on_progress:
+                on_progress(applied, total)
+            if applied < total:
+                self._schedule(lambda: step(added, remove_end))
+                return
+            self._thaw()
+            if on_finished:
+                on_finished()
+
+        self._schedule(step)
+        return total
+
+    def cancel(self) -> None:
+        """Stop a pending chunked application (chunks already applied are kept)"""
+        self._job += 1
+        self._thaw()
+
+    def clear(self, layer) -> None:
+        """Cancel any pending application and clear the layer selection"""
+        self.cancel()
+        layer.removeSelection()
+
+    def _thaw(self) -> None:
+        if self._frozen:
+            self._frozen = False
+            canvas = self.iface.mapCanvas()
+            canvas.freeze(False)
+            canvas.refresh()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+GeoPackage maintenance commands for Visualización de Cultivos
+
+Examples:
+  python maintain_gpkg.py indexes                 # Index Config.CULTIVOS_GPKG_PATH
+  python maintain_gpkg.py indexes otro.gpkg       # Index another GeoPackage
+  python maintain_gpkg.py indexes --no-analyze    # Skip ANALYZE
+  python maintain_gpkg.py departments             # Materialize DPTO_NORM / DPTO_ID
+  python maintain_gpkg.py join                    # Zone -> department spatial join with Occidente.gpkg
+  python maintain_gpkg.py report --crop Maíz      # Level counts and TOP zones, one process per CPU
+"""
+import argparse
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add project root to Python path
+PROJECT_ROOT = Path(__file__).parent.absolute()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import Config
+from models.crop_schema import crop_column
+from models.departments import normalize_department
+from models.gpkg_maintenance import create_attribute_indexes, materialize_department_columns
+from models.partitioned_scan import PartitionedScanner
+from models.spatial_join import build_department_join
+
+
+def run_indexes(args):
+    """Create the attribute indexes used by the plugin queries"""
+    print(f"🔧 Indexing {args.gpkg}...")
+    result = create_attribute_indexes(args.gpkg, args.table, analyze=not args.no_analyze)
+    if not result['success']:
+        print(f"❌ {result['message']}")
+        return 1
+
+    for name in result['created']:
+        print(f"✅ Created index {name}")
+    for name in result['skipped']:
+        print(f"⏭️  Index already present: {name}")
+    for name in result['dropped']:
+        print(f"🗑️  Dropped superseded index {name}")
+    print(f"⏱️  Queries before: {result['time_before'] * 1000:.2f} ms")
+    print(f"⏱️  Queries after:  {result['time_after'] * 1000:.2f} ms")
+    print(f"🚀 Speedup: {result['speedup']:.1f}x")
+    return 0
+
+
+def run_departments(args):
+    """Materialize the normalized department name and id columns"""
+    print(f"🔧 Materializing department columns in {args.gpkg}...")
+    result = materialize_department_columns(args.gpkg, args.table)
+    if not result['success']:
+        print(f"❌ {result['message']}")
+        return 1
+
+    for dept_id, name in result['departments'].items():
+        print(f"  {dept_id:>3}  {name}")
+    print(f"✅ {result['updated']} zones updated")
+    print("💡 Run 'python maintain_gpkg.py indexes' to index the new DPTO_ID column")
+    return 0
+
+
+def run_join(args):
+    """Store the zone to department spatial join"""
+    print(f"🔧 Joining zones of {args.gpkg} with the departments of {args.departments}...")
+    result = build_department_join(args.gpkg, args.departments, args.table, args.departments_table)
+    if not result['success']:
+        print(f"❌ {result['message']}")
+        return 1
+
+    print(f"✅ {result['matched']} zones assigned to a department")
+    if result['unmatched']:
+        print(f"⚠️  {result['unmatched']} zones outside every department")
+    if result['mismatched']:
+        print(f"⚠️  NOM_DPTO differs from the containing department for fids: "
+              f"{', '.join(str(fid) for fid in result['mismatched'])}")
+    return 0
+
+
+def run_report(args):
+    """Print the per-department level counts and TOP zones of a crop"""
+    col_cultivo = crop_column(args.crop) or args.crop
+    scanner = PartitionedScanner(args.gpkg, args.table, workers=args.workers)
+    try:
+        departments = sorted({normalize_department(name) for name in scanner.reader.distinct_values('NOM_DPTO')})
+        print(f"📊 {col_cultivo} in {args.gpkg} ({len(scanner.partitions())} partitions)")
+        for department, counts in scanner.level_counts_by_department(departments, col_cultivo).items():
+            print(f"  {department:<20} Alto {counts['Alto']:>6}  Medio {counts['Medio']:>6}  Bajo {counts['Bajo']:>6}")
+        print(f"🏆 TOP {args.top} zones ({args.area_min}-{args.area_max} km²)")
+        top_zonas = scanner.top_zones(col_cultivo, args.area_min, args.area_max, args.top)
+        for departamento, municipio, area, produccion in top_zonas.as_tuples():
+            print(f"  {departamento:<20} {municipio:<24} {area:>10.2f}  {produccion}")
+    except (ValueError, sqlite3.Error) as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        scanner.close()
+    return 0
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description="GeoPackage maintenance for the QGIS plugin",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    indexes = subparsers.add_parser('indexes', help='Create attribute indexes and run ANALYZE')
+    indexes.add_argument('gpkg', nargs='?', default=Config.CULTIVOS_GPKG_PATH,
+                         help='GeoPackage file (default: Config.CULTIVOS_GPKG_PATH)')
+    indexes.add_argument('--table', help='Feature table (default: first feature table)')
+    indexes.add_argument('--no-analyze', action='store_true', help='Skip ANALYZE')
+    indexes.set_defaults(func=run_indexes)
+
+    departments = subparsers.add_parser('departments',
+                                        help='Materialize normalized department name and id columns')
+    departments.add_argument('gpkg', nargs='?', default=Config.CULTIVOS_GPKG_PATH,
+                             help='GeoPackage file (default: Config.CULTIVOS_GPKG_PATH)')
+    departments.add_argument('--table', help='Feature table (default: first feature table)')
+    departments.set_defaults(func=run_departments)
+
+    join = subparsers.add_parser('join', help='Store the zone to department spatial join')
+    join.add_argument('gpkg', nargs='?', default=Config.CULTIVOS_GPKG_PATH,
+                      help='Zones GeoPackage (default: Config.CULTIVOS_GPKG_PATH)')
+    join.add_argument('--departments', default=Config.OCCIDENTE_GPKG_PATH,
+                      help='Department polygons GeoPackage (default: Config.OCCIDENTE_GPKG_PATH)')
+    join.add_argument('--table', help='Zones table (default: first feature table)')
+    join.add_argument('--departments-table', help='Departments table (default: first feature table)')
+    join.set_defaults(func=run_join)
+
+    report = subparsers.add_parser('report', help='Level counts and TOP zones of a crop, scanned in parallel')
+    report.add_argument('gpkg', nargs='?', default=Config.CULTIVOS_GPKG_PATH,
+                        help='GeoPackage file (default: Config.CULTIVOS_GPKG_PATH)')
+    report.add_argument('--crop', required=True, help='Crop name or production level column (e.g. Maíz or CUL_MAIZ)')
+    report.add_argument('--table', help='Feature table (default: first feature table)')
+    report.add_argument('--workers', type=int, help='Worker processes (default: Config.SCAN_WORKERS or one per CPU)')
+    report.add_argument('--top', type=int, default=10, help='Number of TOP zones (default: 10)')
+    report.add_argument('--area-min', type=float, default=0.0, help='Minimum zone area in km² (default: 0)')
+    report.add_argument('--area-max', type=float, default=float('inf'), help='Maximum zone area in km²')
+    report.set_defaults(func=run_report)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
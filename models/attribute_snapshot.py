@@ -0,0 +1,350 @@
+"""
+Columnar attribute snapshot of the crop zones layer.
+
+Keeps the attributes the plugin filters on as compact NumPy arrays:
+production levels are dictionary-encoded as uint8 codes and departments
+as small integer ids, so a query is a vectorized comparison instead of a
+per-feature string normalization.
+
+Snapshots can be persisted to a versioned binary sidecar file and memory
+mapped on the next session, so the full scan only happens when the
+GeoPackage changes.
+"""
+import hashlib
+import json
+import os
+import struct
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from models.departments import DEPARTMENT_ID_COLUMN, DEPARTMENT_JOIN_TABLE, DepartmentCatalog
+from models.gpkg_reader import GeoPackageReader, quote_identifier
+from models.id_spool import IdSpool, collect_ids
+
+# Production level codes (uint8)
+LEVEL_CODES = {'BAJO': 0, 'MEDIO': 1, 'ALTO': 2}
+LEVEL_NAMES = {0: 'Bajo', 1: 'Medio', 2: 'Alto'}
+NULL_LEVEL = 255
+
+FETCH_SIZE = 50000
+
+# Sidecar file layout: magic, format version, header length, JSON header,
+# then every array aligned to ARRAY_ALIGNMENT bytes
+SNAPSHOT_MAGIC = b'VCSNAP\x00\x00'
+SNAPSHOT_VERSION = 2
+SNAPSHOT_SUFFIX = '.vcsnap'
+ARRAY_ALIGNMENT = 64
+# Spare header bytes so a later signature can be rewritten in place
+HEADER_SLACK = 64
+_PREAMBLE = struct.Struct('<8sII')
+_ARRAYS = ('fids', 'areas', 'department_ids', 'levels')
+
+
+def content_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-1 of a file's contents"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_path(cache_dir: str, source_path: str, table: str) -> str:
+    """Sidecar file used to persist the snapshot of a GeoPackage table"""
+    key = hashlib.sha1(f"{os.path.abspath(source_path)}|{table}".encode('utf-8')).hexdigest()[:12]
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(cache_dir, f"{stem}_{key}{SNAPSHOT_SUFFIX}")
+
+
+def department_source(reader: GeoPackageReader, use_join: bool = False) -> str:
+    """
+    Where the department of each zone is read from
+
+    Materialized ids are used only while every zone with a NOM_DPTO has
+    one; otherwise the raw names are read.
+
+    Returns:
+        'join' (spatial join table), DEPARTMENT_ID_COLUMN (materialized ids)
+        or 'NOM_DPTO' (raw names)
+    """
+    if use_join and reader.has_department_join():
+        return 'join'
+    if (reader.has_columns(DEPARTMENT_ID_COLUMN) and reader.department_catalog() is not None
+            and not reader.has_unmapped_departments()):
+        return DEPARTMENT_ID_COLUMN
+    return 'NOM_DPTO'
+
+
+def encode_level(value) -> int:
+    """uint8 code of a production level value (NULL_LEVEL for empty or unknown values)"""
+    if not value:
+        return NULL_LEVEL
+    return LEVEL_CODES.get(str(value).strip().upper(), NULL_LEVEL)
+
+
+class AttributeSnapshot:
+    """In-memory columnar copy of the zone attributes used by the queries"""
+
+    def __init__(self, fids: np.ndarray, areas: np.ndarray, department_ids: np.ndarray,
+                 levels: np.ndarray, crop_columns: List[str], departments: DepartmentCatalog,
+                 source: str = 'NOM_DPTO'):
+        self.fids = fids                      # int64, sorted
+        self.areas = areas                    # float64, NaN for NULL
+        self.department_ids = department_ids  # uint16, 0 for NULL
+        self.levels = levels                  # uint8, one row per crop column
+        self.crop_columns = list(crop_columns)
+        self.departments = departments
+        self.source = source
+        self._crop_index = {column: i for i, column in enumerate(self.crop_columns)}
+        self._joined_ids = None
+
+    def __len__(self) -> int:
+        return len(self.fids)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the arrays"""
+        return self.fids.nbytes + self.areas.nbytes + self.department_ids.nbytes + self.levels.nbytes
+
+    def in_memory(self) -> 'AttributeSnapshot':
+        """Copy of a memory-mapped snapshot with its arrays read into RAM"""
+        return AttributeSnapshot(np.array(self.fids), np.array(self.areas), np.array(self.department_ids),
+                                 np.array(self.levels), self.crop_columns, self.departments, self.source)
+
+    @classmethod
+    def from_reader(cls, reader: GeoPackageReader, crop_columns: List[str],
+                    use_join: bool = False) -> 'AttributeSnapshot':
+        """
+        Build a snapshot with one SQL scan of a GeoPackage table
+
+        Args:
+            reader: Reader of the zones table
+            crop_columns: Production level columns to encode (must exist)
+            use_join: Take departments from the spatial join when it exists
+        """
+        source = department_source(reader, use_join)
+        if source == 'NOM_DPTO':
+            catalog = DepartmentCatalog.from_values(reader.distinct_values('NOM_DPTO'))
+            department_ids = {raw: catalog.id_for(raw) for raw in reader.distinct_values('NOM_DPTO')}
+            department_expr = 'z."NOM_DPTO"'
+        else:
+            catalog = reader.department_catalog()
+            department_ids = {dept_id: dept_id for dept_id, _ in catalog.items()}
+            department_expr = 'j.dpto_id' if source == 'join' else f'z."{DEPARTMENT_ID_COLUMN}"'
+
+        conn = reader.connect()
+        table = quote_identifier(reader.table)
+        count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+        fids = np.empty(count, dtype=np.int64)
+        areas = np.empty(count, dtype=np.float64)
+        departments = np.zeros(count, dtype=np.uint16)
+        levels = np.full((len(crop_columns), count), NULL_LEVEL, dtype=np.uint8)
+
+        fid = 'z.' + quote_identifier(reader.fid_column)
+        selected = ', '.join([fid, department_expr] +
+                             ['z.' + quote_identifier(col) for col in ['AREA_KM2'] + list(crop_columns)])
+        join = f" LEFT JOIN {DEPARTMENT_JOIN_TABLE} j ON j.fid = {fid}" if source == 'join' else ''
+        cursor = conn.execute(f"SELECT {selected} FROM {table} z{join} ORDER BY {fid}")
+        row_index = 0
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                fids[row_index] = row[0]
+                departments[row_index] = department_ids.get(row[1]) or 0
+                areas[row_index] = row[2] if row[2] is not None else np.nan
+                for crop_index, value in enumerate(row[3:]):
+                    levels[crop_index, row_index] = encode_level(value)
+                row_index += 1
+
+        return cls(fids[:row_index], areas[:row_index], departments[:row_index],
+                   levels[:, :row_index], crop_columns, catalog, source)
+
+    def has_crop(self, column: str) -> bool:
+        """Whether a production level column is part of the snapshot"""
+        return column in self._crop_index
+
+    def covers(self, departamentos: Iterable[str]) -> bool:
+        """
+        Whether the snapshot knows where the zones of the departments are
+
+        Always true unless departments come from the spatial join, which
+        only knows the departments of the boundary layer.
+        """
+        if self.source != 'join':
+            return True
+        if self._joined_ids is None:
+            self._joined_ids = set(np.unique(self.department_ids).tolist())
+        return all(self.departments.id_for(name) in self._joined_ids for name in departamentos)
+
+    def find_zones(self, departamentos: List[str], col_cultivo: str,
+                   produccion: str) -> Optional[Union[List[int], IdSpool]]:
+        """
+        Ids of the zones in the given departments with the given production level
+
+        Returns:
+            Sorted fids (a list, or an IdSpool above Config.MAX_FEATURES_IN_MEMORY),
+            or None if the crop, level or departments cannot be answered from the
+            snapshot (the caller then falls back to another path)
+        """
+        code = LEVEL_CODES.get(produccion.strip().upper())
+        if code is None or not self.has_crop(col_cultivo) or not self.covers(departamentos):
+            return None
+        dept_ids = self.departments.ids_for(departamentos)
+        if not dept_ids:
+            return []
+        mask = self.levels[self._crop_index[col_cultivo]] == code
+        mask &= np.isin(self.department_ids, dept_ids)
+        return collect_ids(_iter_ids(self.fids[mask]))
+
+    def level_counts(self, departamento: str, col_cultivo: str) -> Optional[Dict[str, int]]:
+        """
+        Number of zones of a department per production level of a crop
+
+        Returns:
+            Dict with 'Alto', 'Medio' and 'Bajo' counts, or None if the crop
+            is not part of the snapshot or the department is not covered
+        """
+        if not self.has_crop(col_cultivo) or not self.covers([departamento]):
+            return None
+        counts = {'Alto': 0, 'Medio': 0, 'Bajo': 0}
+        dept_id = self.departments.id_for(departamento)
+        if dept_id is None:
+            return counts
+        levels = self.levels[self._crop_index[col_cultivo]][self.department_ids == dept_id]
+        per_code = np.bincount(levels, minlength=NULL_LEVEL + 1)
+        for code, name in LEVEL_NAMES.items():
+            counts[name] = int(per_code[code])
+        return counts
+
+    def level_totals(self, col_cultivo: str) -> Optional[Dict[str, Tuple[int, float]]]:
+        """
+        Number of zones and total area per production level of a crop
+
+        Returns:
+            Dict of 'Alto', 'Medio' and 'Bajo' to (zones, area in km²), or None
+            if the crop is not part of the snapshot
+        """
+        if not self.has_crop(col_cultivo):
+            return None
+        levels = self.levels[self._crop_index[col_cultivo]]
+        counts = np.bincount(levels, minlength=NULL_LEVEL + 1)
+        areas = np.bincount(levels, weights=np.nan_to_num(self.areas), minlength=NULL_LEVEL + 1)
+        return {name: (int(counts[code]), float(areas[code])) for code, name in
+                sorted(LEVEL_NAMES.items(), reverse=True)}
+
+    def save(self, path: str, signature: tuple, source_hash: Optional[str] = None) -> None:
+        """
+        Persist the snapshot to a sidecar file
+
+        Args:
+            path: Sidecar file to write (replaced atomically)
+            signature: GeoPackage signature the snapshot was built from
+            source_hash: Optional content hash of the GeoPackage, used to
+                validate the file when only the modification time changed
+        """
+        arrays = {name: np.ascontiguousarray(getattr(self, name)) for name in _ARRAYS}
+        header = {
+            'signature': list(signature),
+            'source_hash': source_hash,
+            'crop_columns': self.crop_columns,
+            'departments': self.departments.items(),
+            'department_source': self.source,
+            'arrays': {},
+        }
+        # Offsets relativos al inicio de la sección de datos (tras el encabezado)
+        offset = 0
+        for name, array in arrays.items():
+            header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset = _align(offset + array.nbytes)
+        header_bytes = json.dumps(header).encode('utf-8') + b' ' * HEADER_SLACK
+        data_start = _align(_PREAMBLE.size + len(header_bytes))
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            for name, array in arrays.items():
+                f.seek(data_start + header['arrays'][name]['offset'])
+                f.write(array.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, signature: tuple, source_path: Optional[str] = None,
+             source: Optional[str] = None, validate_hash: bool = False) -> Optional['AttributeSnapshot']:
+        """
+        Memory-map a persisted snapshot if it is still valid
+
+        The snapshot is valid when it was written by the same format version,
+        reads departments from the expected source (if given) and the
+        GeoPackage signature matches. If only the signature differs,
+        validate_hash is set and a content hash was stored, the GeoPackage at
+        source_path is hashed and compared instead; on a match the header is
+        updated to the new signature so the next load skips the hash.
+
+        Returns:
+            The memory-mapped snapshot, or None if missing, stale or unreadable
+        """
+        try:
+            with open(path, 'rb') as f:
+                magic, version, header_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+                if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                    return None
+                header = json.loads(f.read(header_len).decode('utf-8'))
+            data_start = _align(_PREAMBLE.size + header_len)
+            if source is not None and header.get('department_source') != source:
+                return None
+
+            if tuple(header['signature']) != tuple(signature):
+                if not (validate_hash and header.get('source_hash') and source_path and
+                        content_hash(source_path) == header['source_hash']):
+                    return None
+                header['signature'] = list(signature)
+                _rewrite_header(path, header, data_start)
+
+            arrays = {}
+            for name in _ARRAYS:
+                spec = header['arrays'][name]
+                shape = tuple(spec['shape'])
+                if 0 in shape:
+                    arrays[name] = np.empty(shape, dtype=np.dtype(spec['dtype']))
+                else:
+                    arrays[name] = np.memmap(path, dtype=np.dtype(spec['dtype']), mode='r',
+                                             offset=data_start + spec['offset'], shape=shape)
+        except (OSError, ValueError, KeyError, struct.error):
+            return None
+
+        catalog = DepartmentCatalog({dept_id: name for dept_id, name in header['departments']})
+        return cls(arrays['fids'], arrays['areas'], arrays['department_ids'], arrays['levels'],
+                   header['crop_columns'], catalog, header['department_source'])
+
+
+def _iter_ids(ids: np.ndarray) -> Iterator[int]:
+    """Python ints of an id array, converted FETCH_SIZE at a time"""
+    for start in range(0, len(ids), FETCH_SIZE):
+        yield from ids[start:start + FETCH_SIZE].tolist()
+
+
+def _rewrite_header(path: str, header: dict, data_start: int) -> None:
+    """Replace the JSON header in place, if it still fits before the arrays"""
+    header_bytes = json.dumps(header).encode('utf-8')
+    room = data_start - _PREAMBLE.size
+    if len(header_bytes) > room:
+        return
+    header_bytes += b' ' * (room - len(header_bytes))
+    try:
+        with open(path, 'r+b') as f:
+            f.write(_PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+    except OSError:
+        # Sin permisos de escritura: la próxima carga vuelve a calcular el hash
+        pass
+
+
+def _align(offset: int) -> int:
+    """Round an offset up to the array alignment"""
+    return (offset + ARRAY_ALIGNMENT - 1) // ARRAY_ALIGNMENT * ARRAY_ALIGNMENT
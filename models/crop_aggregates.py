@@ -0,0 +1,66 @@
+"""
+Session cache of the per-crop totals shown in the "Datos" panel.
+
+Totals are computed on first request for each crop and kept for the whole
+session. GeoPackage layers are recomputed only when the file signature
+changes; other layers are invalidated through their dataChanged signal.
+Only the crops requested again after a change are recomputed.
+
+At most Config.RESULT_CACHE_ENTRIES totals are kept (least recently used
+first out), and nothing is cached with ENABLE_FEATURE_CACHING off. Both
+are read on every request, so a performance profile change applies at once.
+"""
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config import Config
+from models.query_engine import CropQueryEngine
+
+
+class CropAggregateService:
+    """Cached per-crop, per-level zone counts and areas"""
+
+    def __init__(self, query_engine: Optional[CropQueryEngine] = None):
+        self.query_engine = query_engine or CropQueryEngine()
+        self._totals = OrderedDict()  # (source key, crop column) -> (signature, totals)
+        self._watched = set()
+
+    def totals(self, layer, col_cultivo: str) -> Dict[str, Tuple[int, float]]:
+        """
+        Number of zones and total area per production level of a crop
+
+        Returns:
+            Dict of 'Alto', 'Medio' and 'Bajo' to (zones, area in km²)
+        """
+        if not Config.ENABLE_FEATURE_CACHING:
+            self._totals.clear()
+            return self.query_engine.level_totals(layer, col_cultivo)
+
+        key, signature = self.query_engine.source_key(layer)
+        cached = self._totals.get((key, col_cultivo))
+        if cached is not None and cached[0] == signature:
+            self._totals.move_to_end((key, col_cultivo))
+            self._trim()
+            return cached[1]
+
+        if signature is None and key not in self._watched:
+            layer.dataChanged.connect(lambda key=key: self.invalidate(key))
+            self._watched.add(key)
+        totals = self.query_engine.level_totals(layer, col_cultivo)
+        self._totals[(key, col_cultivo)] = (signature, totals)
+        self._totals.move_to_end((key, col_cultivo))
+        self._trim()
+        return totals
+
+    def invalidate(self, key=None) -> None:
+        """Drop the cached totals of one data source, or of all of them"""
+        if key is None:
+            self._totals.clear()
+            return
+        for cached_key in [cached_key for cached_key in self._totals if cached_key[0] == key]:
+            del self._totals[cached_key]
+
+    def _trim(self) -> None:
+        """Drop the least recently used totals above Config.RESULT_CACHE_ENTRIES"""
+        while len(self._totals) > max(Config.RESULT_CACHE_ENTRIES, 1):
+            self._totals.popitem(last=False)
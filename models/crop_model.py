@@ -1,10 +1,11 @@
 from qgis.core import QgsVectorLayer, QgsFeatureRequest
 from typing import List, Dict, Optional
 from datetime import datetime
+from models.crop_schema import CROP_NAMES
 
 class CropModel:
     def __init__(self):
-        self.available_crops = ['Maíz', 'Frijol', 'Caña de azúcar', 'Papa', 'Café', 'Tomate']
+        self.available_crops = list(CROP_NAMES)
         
     def get_available_crops(self) -> List[str]:
         """Returns a copy of the list of available crops"""
@@ -0,0 +1,97 @@
+"""
+Schema descriptor of the crop zones layer.
+
+Single source of truth for the crop name -> production level column
+mapping. Crop columns not listed here ('CUL_*' fields added to the layer)
+are discovered from the schema and named after the column. A CropSchema
+is built once from the layer's fields() and resolves every column the
+plugin reads to its field index, so feature scans use
+feature.attribute(index) instead of a name lookup per feature.
+"""
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+from models.attribute_snapshot import LEVEL_CODES
+from models.gpkg_maintenance import CROP_COLUMN_PREFIX
+
+# Nombre del cultivo en la interfaz -> columna de nivel de producción
+CROP_COLUMNS = {
+    "Maíz": "CUL_MAIZ",
+    "Frijol": "CUL_FRIJOL",
+    "Caña de azúcar": "CUL_CAÑA_DE_AZUCAR",
+    "Papa": "CUL_PAPA",
+    "Café": "CUL_CAFE",
+    "Tomate": "CUL_TOMATE",
+}
+CROP_NAMES = list(CROP_COLUMNS)
+
+
+def crop_column(crop: str) -> Optional[str]:
+    """Production level column of a crop name, or None if unknown"""
+    return CROP_COLUMNS.get(crop)
+
+
+def crop_display_name(column: str) -> str:
+    """Name shown in the interface for a crop column ('CUL_ARROZ' -> 'Arroz')"""
+    for crop, known in CROP_COLUMNS.items():
+        if known == column:
+            return crop
+    return column[len(CROP_COLUMN_PREFIX):].replace('_', ' ').capitalize()
+
+
+class CropSchema:
+    """Field indexes of the columns read from the crop zones layer"""
+
+    def __init__(self, field_names: List[str]):
+        self.field_names = list(field_names)
+        self._indexes = {name: i for i, name in enumerate(self.field_names)}
+        self.version = hashlib.sha1('|'.join(self.field_names).encode('utf-8')).hexdigest()[:12]
+
+    @classmethod
+    def from_layer(cls, layer) -> 'CropSchema':
+        """Build the descriptor from a layer's fields()"""
+        return cls(layer.fields().names())
+
+    def has(self, *columns: str) -> bool:
+        """Whether all the given columns exist in the layer"""
+        return all(column in self._indexes for column in columns)
+
+    def index_of(self, column: str) -> int:
+        """Field index of a column, or -1 if it does not exist (like QgsFields.indexOf)"""
+        return self._indexes.get(column, -1)
+
+    def crop_columns(self) -> Dict[str, str]:
+        """
+        Every crop column of the layer ('CUL_*'), keyed by display name
+
+        Known crops come first in their usual order, then any other crop
+        column found in the layer in field order.
+        """
+        columns = {crop: column for crop, column in CROP_COLUMNS.items() if column in self._indexes}
+        for name in self.field_names:
+            if name.upper().startswith(CROP_COLUMN_PREFIX) and name not in columns.values():
+                columns[crop_display_name(name)] = name
+        return columns
+
+    def validate(self, layer) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+        """
+        Check the production level values stored in each crop column
+
+        Uses the provider's distinct values (uniqueValues), not a feature scan,
+        once per crop column.
+
+        Returns:
+            (crops, problems): the crop columns holding at least one known
+            production level, keyed by display name, and the values of each
+            column that are not a known production level (only columns with
+            unexpected values are listed)
+        """
+        crops, problems = {}, {}
+        for crop, column in self.crop_columns().items():
+            values = [value for value in layer.uniqueValues(self._indexes[column]) if value]
+            if any(str(value).strip().upper() in LEVEL_CODES for value in values):
+                crops[crop] = column
+            unexpected = sorted(str(value) for value in values if str(value).strip().upper() not in LEVEL_CODES)
+            if unexpected:
+                problems[column] = unexpected
+        return crops, problems
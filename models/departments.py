@@ -0,0 +1,89 @@
+"""
+Department name helpers shared by the query paths of the plugin.
+"""
+import sqlite3
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def normalize_department(text) -> str:
+    """
+    Normalize a department name for comparisons
+
+    Names are uppercased and stripped of accents ('Ahuachapán' -> 'AHUACHAPAN').
+    'SANTA ANA' is kept as-is, matching the values stored in the layer.
+    Empty or NULL values normalize to an empty string.
+    """
+    if not text:
+        return ''
+    text = str(text)
+    if text == 'SANTA ANA':
+        return 'SANTA ANA'
+    text = text.upper()
+    return ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
+
+
+# Columns materialized by 'python maintain_gpkg.py departments'
+DEPARTMENT_CODE_COLUMN = 'DPTO_NORM'
+DEPARTMENT_ID_COLUMN = 'DPTO_ID'
+DEPARTMENT_TABLE = 'vc_departamentos'
+# Raw NOM_DPTO value -> (DPTO_NORM, DPTO_ID), read by the triggers that fill
+# the columns on features inserted or edited afterwards
+DEPARTMENT_VALUES_TABLE = 'vc_departamentos_valores'
+# Zone -> department mapping written by 'python maintain_gpkg.py join'
+DEPARTMENT_JOIN_TABLE = 'vc_zona_departamento'
+# Zone count and maximum fid when the join was built, to detect zones added later
+DEPARTMENT_JOIN_STATE_TABLE = 'vc_zona_departamento_estado'
+
+
+class DepartmentCatalog:
+    """Bidirectional mapping between normalized department names and integer ids"""
+
+    def __init__(self, names: Dict[int, str]):
+        self._names = dict(names)
+        self._ids = {name: dept_id for dept_id, name in self._names.items()}
+
+    @classmethod
+    def from_values(cls, values: Iterable) -> 'DepartmentCatalog':
+        """Build a catalog from raw NOM_DPTO values (ids follow alphabetical order)"""
+        return cls({}).extended(values)
+
+    @classmethod
+    def from_connection(cls, conn) -> Optional['DepartmentCatalog']:
+        """Load the catalog stored in a GeoPackage, or None if it was never materialized"""
+        try:
+            rows = conn.execute(f"SELECT id, nombre FROM {DEPARTMENT_TABLE}").fetchall()
+        except sqlite3.Error:
+            return None
+        return cls(dict(rows))
+
+    def extended(self, values: Iterable) -> 'DepartmentCatalog':
+        """Copy of the catalog with new departments appended (existing ids are kept)"""
+        names = dict(self._names)
+        next_id = max(names, default=0) + 1
+        for name in sorted({normalize_department(value) for value in values} - {''}):
+            if name not in self._ids:
+                names[next_id] = name
+                next_id += 1
+        return DepartmentCatalog(names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def items(self) -> List[Tuple[int, str]]:
+        """(id, normalized name) pairs sorted by id"""
+        return sorted(self._names.items())
+
+    def id_for(self, name) -> Optional[int]:
+        """Id of a department given its raw or normalized name"""
+        return self._ids.get(normalize_department(name))
+
+    def ids_for(self, names: Iterable) -> List[int]:
+        """Ids of the known departments among the given names"""
+        ids = {self.id_for(name) for name in names}
+        ids.discard(None)
+        return sorted(ids)
+
+    def name_for(self, dept_id: int) -> Optional[str]:
+        """Normalized name of a department id"""
+        return self._names.get(dept_id)
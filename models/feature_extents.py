@@ -0,0 +1,130 @@
+"""
+Per-feature bounding boxes of the crop zones layer.
+
+Zooming to the zones found by a query only needs the union of their
+bounding boxes. The boxes of every feature are kept in a NumPy array
+(read from the GeoPackage R-tree when available), so the extent of any
+result is a vectorized min/max instead of fetching and merging geometries.
+
+Rectangle lookups (layers without an R-tree) use a packed one-level tree:
+the boxes are grouped into blocks of nearby features (sort-tile-recursive
+packing) and only the blocks whose envelope meets the rectangle are scanned.
+"""
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from models.gpkg_reader import GeoPackageReader
+
+# Columnas del arreglo de extensiones
+MINX, MAXX, MINY, MAXY = range(4)
+
+# Cajas por bloque del árbol empaquetado
+BLOCK_SIZE = 256
+
+
+class FeatureExtentIndex:
+    """Bounding box of every feature of a layer, indexed by feature id"""
+
+    def __init__(self, fids: np.ndarray, bounds: np.ndarray):
+        order = np.argsort(fids, kind='stable')
+        self.fids = np.asarray(fids, dtype=np.int64)[order]
+        self.bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)[order]
+        self._packed = None  # (posiciones en orden de bloques, envolventes de bloque)
+
+    def __len__(self) -> int:
+        return len(self.fids)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> 'FeatureExtentIndex':
+        """Build the index from (fid, minx, maxx, miny, maxy) rows"""
+        rows = list(rows)
+        if not rows:
+            return cls(np.empty(0, dtype=np.int64), np.empty((0, 4)))
+        data = np.asarray(rows, dtype=np.float64)
+        return cls(data[:, 0].astype(np.int64), data[:, 1:])
+
+    @classmethod
+    def from_reader(cls, reader: GeoPackageReader) -> Optional['FeatureExtentIndex']:
+        """Build the index from the R-tree of a GeoPackage table (None without R-tree)"""
+        if reader.rtree_table() is None:
+            return None
+        return cls.from_rows(reader.feature_bounds())
+
+    @classmethod
+    def from_layer(cls, layer) -> 'FeatureExtentIndex':
+        """Build the index with one pass over the layer's feature geometries"""
+        rows = []
+        for feature in layer.getFeatures():
+            if not feature.hasGeometry():
+                continue
+            box = feature.geometry().boundingBox()
+            rows.append((feature.id(), box.xMinimum(), box.xMaximum(), box.yMinimum(), box.yMaximum()))
+        return cls.from_rows(rows)
+
+    def union_extent(self, ids: Iterable[int]) -> Optional[Tuple[float, float, float, float]]:
+        """
+        Extent covering the given features
+
+        Returns:
+            (xmin, ymin, xmax, ymax) in layer CRS, or None if none of the ids
+            has a bounding box
+        """
+        ids = np.asarray(list(ids), dtype=np.int64)
+        if not len(ids) or not len(self.fids):
+            return None
+        positions = np.minimum(np.searchsorted(self.fids, ids), len(self.fids) - 1)
+        positions = positions[self.fids[positions] == ids]
+        if not len(positions):
+            return None
+        boxes = self.bounds[positions]
+        return (float(boxes[:, MINX].min()), float(boxes[:, MINY].min()),
+                float(boxes[:, MAXX].max()), float(boxes[:, MAXY].max()))
+
+    def ids_in_rect(self, xmin: float, ymin: float, xmax: float, ymax: float) -> List[int]:
+        """Sorted ids of the features whose bounding box intersects a rectangle"""
+        if not len(self.fids):
+            return []
+        positions, envelopes = self._packed_tree()
+        hit = np.flatnonzero((envelopes[:, MINX] <= xmax) & (envelopes[:, MAXX] >= xmin) &
+                             (envelopes[:, MINY] <= ymax) & (envelopes[:, MAXY] >= ymin))
+        if not len(hit):
+            return []
+        # Solo se examinan las cajas de los bloques cuya envolvente toca el rectángulo
+        candidates = positions[(hit[:, None] * BLOCK_SIZE + np.arange(BLOCK_SIZE)).ravel()]
+        candidates = candidates[candidates >= 0]
+        boxes = self.bounds[candidates]
+        mask = ((boxes[:, MINX] <= xmax) & (boxes[:, MAXX] >= xmin) &
+                (boxes[:, MINY] <= ymax) & (boxes[:, MAXY] >= ymin))
+        return self.fids[np.sort(candidates[mask])].tolist()
+
+    def _packed_tree(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Block layout of the boxes, built on first use
+
+        Returns:
+            Box positions in block order (padded with -1 to whole blocks)
+            and the envelope of every block
+        """
+        if self._packed is None:
+            count = len(self.fids)
+            centers_x = (self.bounds[:, MINX] + self.bounds[:, MAXX]) / 2
+            centers_y = (self.bounds[:, MINY] + self.bounds[:, MAXY]) / 2
+            # Franjas verticales de cajas por X, ordenadas por Y dentro de cada franja
+            blocks = -(-count // BLOCK_SIZE)
+            strip_size = -(-blocks // max(int(np.ceil(np.sqrt(blocks))), 1)) * BLOCK_SIZE
+            by_x = np.argsort(centers_x, kind='stable')
+            strips = np.empty(count, dtype=np.int64)
+            strips[by_x] = np.arange(count) // strip_size
+            order = np.lexsort((centers_y, strips))
+
+            positions = np.full(blocks * BLOCK_SIZE, -1, dtype=np.int64)
+            positions[:count] = order
+            boxes = self.bounds[order]
+            starts = np.arange(0, count, BLOCK_SIZE)
+            envelopes = np.column_stack([
+                np.minimum.reduceat(boxes[:, MINX], starts), np.maximum.reduceat(boxes[:, MAXX], starts),
+                np.minimum.reduceat(boxes[:, MINY], starts), np.maximum.reduceat(boxes[:, MAXY], starts),
+            ])
+            self._packed = (positions, envelopes)
+        return self._packed
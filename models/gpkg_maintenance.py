@@ -0,0 +1,289 @@
+"""
+Maintenance tasks for the GeoPackages used by the plugin.
+
+The attribute columns filtered by the plugin have no SQLite indexes in the
+shipped data, so every query is a full table scan. This module creates
+indexes matching the query shapes of CropQueryEngine and refreshes the
+planner statistics with ANALYZE.
+"""
+import sqlite3
+import struct
+import time
+from typing import Dict, List, Optional, Tuple
+
+from models.departments import (
+    DEPARTMENT_CODE_COLUMN, DEPARTMENT_ID_COLUMN, DEPARTMENT_TABLE, DEPARTMENT_VALUES_TABLE, DepartmentCatalog,
+    normalize_department
+)
+from models.gpkg_reader import GeoPackageReader, quote_identifier
+
+INDEX_PREFIX = 'idx_vc_'
+CROP_COLUMN_PREFIX = 'CUL_'
+
+
+def _gpkg_envelope(blob) -> Optional[Tuple[float, float, float, float]]:
+    """(minx, maxx, miny, maxy) stored in a GeoPackage geometry header, if any"""
+    if not blob or blob[:2] != b'GP' or not (blob[3] >> 1) & 0x07:
+        return None
+    order = '<' if blob[3] & 0x01 else '>'
+    return struct.unpack_from(f'{order}4d', blob, 8)
+
+
+def connect_for_update(path: str) -> sqlite3.Connection:
+    """
+    Open a writable connection to a GeoPackage
+
+    The R-tree triggers created by GDAL call the SpatiaLite-style ST_*
+    functions, which plain sqlite3 lacks. They are registered here from the
+    GeoPackage geometry header so attribute updates can run.
+    """
+    conn = sqlite3.connect(path)
+    conn.create_function('ST_IsEmpty', 1, lambda blob: None if blob is None else int(bool(blob[3] & 0x10)),
+                         deterministic=True)
+    for index, name in enumerate(('ST_MinX', 'ST_MaxX', 'ST_MinY', 'ST_MaxY')):
+        conn.create_function(
+            name, 1,
+            lambda blob, i=index: (_gpkg_envelope(blob) or (None,) * 4)[i],
+            deterministic=True
+        )
+    return conn
+
+
+def crop_columns(columns: List[str]) -> List[str]:
+    """Production level columns ('CUL_*') among the given column names"""
+    return [column for column in columns if column.upper().startswith(CROP_COLUMN_PREFIX)]
+
+
+def plan_attribute_indexes(table: str, columns: List[str]) -> List[Tuple[str, Tuple[str, ...]]]:
+    """
+    Indexes matching the plugin's query shapes
+
+    - (CUL_x, department) per crop: department + level filters, DISTINCT on
+      the level column and per-department level counts are answered from the
+      index. The department is DPTO_ID once materialized, NOM_DPTO otherwise.
+    - (NOM_DPTO) and (DPTO_ID): DISTINCT department names and id lookups.
+    - (AREA_KM2): area range + ORDER BY area for the TOP N table.
+
+    Returns:
+        List of (index name, indexed columns) for the columns present in the table
+    """
+    available = set(columns)
+    plan = []
+    if 'NOM_DPTO' in available:
+        plan.append((f"{INDEX_PREFIX}{table}_nom_dpto", ('NOM_DPTO',)))
+    if DEPARTMENT_ID_COLUMN in available:
+        plan.append((f"{INDEX_PREFIX}{table}_{DEPARTMENT_ID_COLUMN.lower()}", (DEPARTMENT_ID_COLUMN,)))
+    if 'AREA_KM2' in available:
+        plan.append((f"{INDEX_PREFIX}{table}_area_km2", ('AREA_KM2',)))
+    department = next((col for col in (DEPARTMENT_ID_COLUMN, 'NOM_DPTO') if col in available), None)
+    for column in crop_columns(columns):
+        indexed = (column, department) if department else (column,)
+        suffix = '_id' if department == DEPARTMENT_ID_COLUMN else ''
+        plan.append((f"{INDEX_PREFIX}{table}_{column.lower()}{suffix}", indexed))
+    return plan
+
+
+def superseded_indexes(table: str, columns: List[str], present: Dict[Tuple[str, ...], str]) -> List[str]:
+    """
+    Plugin indexes no query uses any more
+
+    Once DPTO_ID is materialized, the (CUL_x, NOM_DPTO) composites are
+    replaced by (CUL_x, DPTO_ID). Only indexes created by this module
+    (INDEX_PREFIX) are listed.
+    """
+    if DEPARTMENT_ID_COLUMN not in columns:
+        return []
+    return [present[(column, 'NOM_DPTO')] for column in crop_columns(columns)
+            if present.get((column, 'NOM_DPTO'), '').startswith(INDEX_PREFIX)]
+
+
+def existing_indexes(conn: sqlite3.Connection, table: str) -> Dict[Tuple[str, ...], str]:
+    """Indexed column tuples of a table, mapped to the index name"""
+    indexes = {}
+    for row in conn.execute(f"PRAGMA index_list({quote_identifier(table)})").fetchall():
+        name = row[1]
+        info = conn.execute(f"PRAGMA index_info({quote_identifier(name)})").fetchall()
+        indexes[tuple(col[2] for col in sorted(info))] = name
+    return indexes
+
+
+def benchmark_queries(path: str, table: Optional[str] = None, repeat: int = 5) -> float:
+    """
+    Time the plugin's query shapes on a GeoPackage
+
+    Runs, for every crop column, the department/level lookup and the TOP N
+    area query the way CropQueryEngine issues them.
+
+    Returns:
+        Best wall time in seconds over the repetitions
+    """
+    best = None
+    for _ in range(max(1, repeat)):
+        reader = GeoPackageReader(path, table)
+        try:
+            start = time.perf_counter()
+            # Filtro de departamento como el del motor: ids enteros si están materializados
+            department = DEPARTMENT_ID_COLUMN if reader.has_columns(DEPARTMENT_ID_COLUMN) else 'NOM_DPTO'
+            departments = reader.distinct_values(department)[:1]
+            for column in crop_columns(reader.columns()):
+                levels = reader.distinct_values(column)[:1]
+                reader.fids_where_in({department: departments, column: levels})
+                reader.top_by_area(column, 0, float('inf'), 10)
+            elapsed = time.perf_counter() - start
+        finally:
+            reader.close()
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def create_attribute_indexes(path: str, table: Optional[str] = None, analyze: bool = True,
+                             benchmark: bool = True) -> Dict:
+    """
+    Create the missing attribute indexes on a GeoPackage feature table
+
+    Plugin indexes superseded by the DPTO_ID variants are dropped.
+
+    Args:
+        path: GeoPackage file
+        table: Feature table (first one registered if None)
+        analyze: Whether to run ANALYZE after creating the indexes
+        benchmark: Whether to time the plugin queries before and after
+
+    Returns:
+        Dict with 'success', 'created', 'skipped', 'dropped' and, when benchmarking,
+        'time_before', 'time_after' and 'speedup'
+    """
+    try:
+        reader = GeoPackageReader(path, table)
+        table = reader.table
+        columns = reader.columns()
+        reader.close()
+        if not {'NOM_DPTO', 'AREA_KM2'} & set(columns):
+            return {'success': False, 'message': f"Table '{table}' has no plugin query columns"}
+
+        result = {'success': True, 'table': table, 'created': [], 'skipped': [], 'dropped': []}
+        if benchmark:
+            result['time_before'] = benchmark_queries(path, table)
+
+        conn = sqlite3.connect(path)
+        try:
+            present = existing_indexes(conn, table)
+            with conn:
+                for name, indexed in plan_attribute_indexes(table, columns):
+                    if indexed in present:
+                        result['skipped'].append(present[indexed])
+                        continue
+                    cols = ', '.join(quote_identifier(col) for col in indexed)
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS {quote_identifier(name)} "
+                                 f"ON {quote_identifier(table)} ({cols})")
+                    result['created'].append(name)
+                for name in superseded_indexes(table, columns, present):
+                    conn.execute(f"DROP INDEX IF EXISTS {quote_identifier(name)}")
+                    result['dropped'].append(name)
+            if analyze:
+                conn.execute(f"ANALYZE {quote_identifier(table)}")
+                conn.commit()
+        finally:
+            conn.close()
+
+        if benchmark:
+            result['time_after'] = benchmark_queries(path, table)
+            after = result['time_after']
+            result['speedup'] = result['time_before'] / after if after > 0 else float('inf')
+        return result
+
+    except (sqlite3.Error, ValueError) as e:
+        return {'success': False, 'message': str(e)}
+
+
+def has_attribute_indexes(path: str, table: Optional[str] = None) -> bool:
+    """Check whether all the planned attribute indexes exist and none is superseded"""
+    reader = GeoPackageReader(path, table)
+    try:
+        present = existing_indexes(reader.connect(), reader.table)
+        columns = reader.columns()
+        return (all(indexed in present for _, indexed in plan_attribute_indexes(reader.table, columns))
+                and not superseded_indexes(reader.table, columns, present))
+    finally:
+        reader.close()
+
+
+def create_department_triggers(conn: sqlite3.Connection, table: str, fid_column: str) -> None:
+    """Keep DPTO_NORM and DPTO_ID current on inserted and edited features"""
+    quoted = quote_identifier(table)
+    lookup = (f"{DEPARTMENT_CODE_COLUMN} = (SELECT dpto_norm FROM {DEPARTMENT_VALUES_TABLE} "
+              f"WHERE nom_dpto = NEW.NOM_DPTO), "
+              f"{DEPARTMENT_ID_COLUMN} = (SELECT dpto_id FROM {DEPARTMENT_VALUES_TABLE} "
+              f"WHERE nom_dpto = NEW.NOM_DPTO)")
+    where = f"{quote_identifier(fid_column)} = NEW.{quote_identifier(fid_column)}"
+    for event, suffix in (('INSERT', 'insert'), ('UPDATE OF NOM_DPTO', 'update')):
+        name = quote_identifier(f"vc_{table}_dpto_{suffix}")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {quoted} "
+                     f"BEGIN UPDATE {quoted} SET {lookup} WHERE {where}; END")
+
+
+def materialize_department_columns(path: str, table: Optional[str] = None) -> Dict:
+    """
+    Store the normalized department name and id on every zone
+
+    Adds the DPTO_NORM (text) and DPTO_ID (integer) columns to the feature
+    table, plus a vc_departamentos lookup table with the id of every
+    normalized name. Queries can then compare integer ids instead of
+    normalizing NOM_DPTO for each feature. Running it again refreshes the
+    columns and keeps the ids already assigned.
+
+    Triggers fill both columns on features inserted or whose NOM_DPTO is
+    edited later, from the vc_departamentos_valores table of the raw values
+    seen so far; unseen spellings are left NULL (and queries then filter by
+    NOM_DPTO until this is run again).
+
+    Returns:
+        Dict with 'success', 'departments' (id -> name) and 'updated' row count
+    """
+    try:
+        reader = GeoPackageReader(path, table)
+        table = reader.table
+        columns = reader.columns()
+        fid_column = reader.fid_column
+        reader.close()
+        if 'NOM_DPTO' not in columns:
+            return {'success': False, 'message': f"Table '{table}' has no NOM_DPTO column"}
+
+        conn = connect_for_update(path)
+        try:
+            quoted = quote_identifier(table)
+            raw_values = [row[0] for row in conn.execute(f"SELECT DISTINCT NOM_DPTO FROM {quoted}")]
+            catalog = (DepartmentCatalog.from_connection(conn) or DepartmentCatalog({})).extended(raw_values)
+
+            updated = 0
+            with conn:
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {DEPARTMENT_TABLE} "
+                             f"(id INTEGER PRIMARY KEY, nombre TEXT NOT NULL UNIQUE)")
+                conn.executemany(f"INSERT OR IGNORE INTO {DEPARTMENT_TABLE} (id, nombre) VALUES (?, ?)",
+                                 catalog.items())
+                if DEPARTMENT_CODE_COLUMN not in columns:
+                    conn.execute(f"ALTER TABLE {quoted} ADD COLUMN {DEPARTMENT_CODE_COLUMN} TEXT(254)")
+                if DEPARTMENT_ID_COLUMN not in columns:
+                    conn.execute(f"ALTER TABLE {quoted} ADD COLUMN {DEPARTMENT_ID_COLUMN} INTEGER")
+                # Una actualización por valor distinto de NOM_DPTO (pocos valores)
+                for raw in raw_values:
+                    code = normalize_department(raw) or None
+                    cursor = conn.execute(
+                        f"UPDATE {quoted} SET {DEPARTMENT_CODE_COLUMN} = ?, {DEPARTMENT_ID_COLUMN} = ? "
+                        f"WHERE NOM_DPTO IS ?",
+                        (code, catalog.id_for(raw), raw)
+                    )
+                    updated += cursor.rowcount
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {DEPARTMENT_VALUES_TABLE} "
+                             f"(nom_dpto TEXT PRIMARY KEY, dpto_norm TEXT, dpto_id INTEGER)")
+                conn.executemany(f"INSERT OR REPLACE INTO {DEPARTMENT_VALUES_TABLE} VALUES (?, ?, ?)",
+                                 [(raw, normalize_department(raw) or None, catalog.id_for(raw))
+                                  for raw in raw_values if raw is not None])
+                create_department_triggers(conn, table, fid_column)
+        finally:
+            conn.close()
+
+        return {'success': True, 'table': table, 'departments': dict(catalog.items()), 'updated': updated}
+
+    except (sqlite3.Error, ValueError) as e:
+        return {'success': False, 'message': str(e)}
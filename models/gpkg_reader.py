@@ -0,0 +1,410 @@
+"""
+Read-only SQLite access to GeoPackage layers.
+
+QGIS layers loaded from a GeoPackage through the 'ogr' provider are plain
+SQLite tables underneath. For attribute-only queries the plugin can skip
+the provider and run its filters as parameterized SQL on a read-only
+connection, which is considerably cheaper than iterating getFeatures().
+"""
+import os
+import sqlite3
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+from urllib.parse import quote
+
+from models.departments import (
+    DEPARTMENT_ID_COLUMN, DEPARTMENT_JOIN_STATE_TABLE, DEPARTMENT_JOIN_TABLE, DepartmentCatalog
+)
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a column or table name for use in SQL"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def parse_ogr_source(source: str) -> Dict[str, str]:
+    """
+    Split an OGR data source URI into its path and options
+
+    Args:
+        source: Layer source, e.g. '/data/Cultivos.gpkg|layername=zonas_de_cultivos'
+
+    Returns:
+        Dict with a 'path' key plus any 'key=value' options found in the URI
+    """
+    parts = source.split('|')
+    parsed = {'path': parts[0]}
+    for option in parts[1:]:
+        if '=' in option:
+            key, value = option.split('=', 1)
+            parsed[key.strip().lower()] = value.strip()
+    return parsed
+
+
+class GeoPackageReader:
+    """Read-only SQL access to a feature table inside a GeoPackage"""
+
+    def __init__(self, path: str, table: Optional[str] = None):
+        self.path = str(path)
+        self.layername = table
+        self._table = table
+        self._conn = None
+        self._columns = None
+        self._fid_column = None
+        self._catalog = None
+        self._geometry_column = None
+        self._has_join = None  # (signature, join stored and current)
+        self._joined_ids = None
+        self._unmapped = None  # (signature, zones with NOM_DPTO but no DPTO_ID)
+
+    @classmethod
+    def for_layer(cls, layer) -> Optional['GeoPackageReader']:
+        """
+        Create a reader for a QGIS layer when the fast path applies
+
+        The layer must use the 'ogr' provider, point at an existing .gpkg
+        file and have neither a subset filter nor pending edits, so that
+        the SQL results match what getFeatures() would return.
+
+        Returns:
+            A reader for the layer table, or None if the layer is not eligible
+        """
+        try:
+            if layer.providerType() != 'ogr':
+                return None
+            source = parse_ogr_source(layer.source())
+            if layer.subsetString() or source.get('subset'):
+                return None
+            if layer.isEditable() and layer.isModified():
+                return None
+        except AttributeError:
+            return None
+
+        path = source['path']
+        if Path(path).suffix.lower() != '.gpkg' or not os.path.isfile(path):
+            return None
+        return cls(path, source.get('layername'))
+
+    def connect(self) -> sqlite3.Connection:
+        """Open (once) a read-only connection to the GeoPackage"""
+        if self._conn is None:
+            uri = f"file:{quote(Path(self.path).as_posix())}?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        return self._conn
+
+    def close(self) -> None:
+        """Close the underlying connection"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+            self._columns = None
+            self._fid_column = None
+            self._catalog = None
+            self._geometry_column = None
+            self._has_join = None
+            self._joined_ids = None
+            self._unmapped = None
+
+    def signature(self) -> tuple:
+        """
+        Modification signature of the GeoPackage file
+
+        Includes the -wal file, where SQLite keeps recent writes until they
+        are checkpointed into the main file.
+        """
+        signature = []
+        for path in (self.path, self.path + '-wal'):
+            try:
+                stat = os.stat(path)
+                signature.extend((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.extend((None, None))
+        return tuple(signature)
+
+    @property
+    def table(self) -> str:
+        """Name of the feature table (first one registered if not given)"""
+        if self._table is None:
+            row = self.connect().execute(
+                "SELECT table_name FROM gpkg_contents WHERE data_type = 'features' ORDER BY rowid LIMIT 1"
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"No feature tables found in {self.path}")
+            self._table = row[0]
+        return self._table
+
+    def columns(self) -> List[str]:
+        """Column names of the feature table"""
+        if self._columns is None:
+            rows = self.connect().execute(f"PRAGMA table_info({quote_identifier(self.table)})").fetchall()
+            self._columns = [row[1] for row in rows]
+            self._fid_column = next((row[1] for row in rows if row[5]), 'fid')
+        return list(self._columns)
+
+    @property
+    def fid_column(self) -> str:
+        """Integer primary key column, which QGIS exposes as the feature id"""
+        if self._fid_column is None:
+            self.columns()
+        return self._fid_column
+
+    @property
+    def geometry_column(self) -> Optional[str]:
+        """Geometry column registered for the feature table, or None"""
+        if self._geometry_column is None:
+            row = self.connect().execute(
+                "SELECT column_name FROM gpkg_geometry_columns WHERE table_name = ?", (self.table,)
+            ).fetchone()
+            self._geometry_column = row[0] if row else ''
+        return self._geometry_column or None
+
+    def rtree_table(self) -> Optional[str]:
+        """Name of the R-tree spatial index of the feature table, if it has one"""
+        if not self.geometry_column:
+            return None
+        name = f"rtree_{self.table}_{self.geometry_column}"
+        row = self.connect().execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).fetchone()
+        return name if row else None
+
+    def feature_bounds(self) -> List[tuple]:
+        """
+        Bounding box of every feature, read from the R-tree spatial index
+
+        Returns:
+            List of (fid, minx, maxx, miny, maxy) tuples sorted by fid, or an
+            empty list if the table has no R-tree
+        """
+        rtree = self.rtree_table()
+        if rtree is None:
+            return []
+        sql = f"SELECT id, minx, maxx, miny, maxy FROM {quote_identifier(rtree)} ORDER BY id"
+        return self.connect().execute(sql).fetchall()
+
+    def fids_in_rect(self, xmin: float, ymin: float, xmax: float, ymax: float) -> Optional[List[int]]:
+        """
+        Ids of the features whose bounding box intersects a rectangle
+
+        The lookup is answered by the R-tree spatial index of the table.
+
+        Returns:
+            Sorted list of fids, or None if the table has no R-tree
+        """
+        rtree = self.rtree_table()
+        if rtree is None:
+            return None
+        sql = (f"SELECT id FROM {quote_identifier(rtree)} "
+               f"WHERE minx <= ? AND maxx >= ? AND miny <= ? AND maxy >= ? ORDER BY id")
+        return [row[0] for row in self.connect().execute(sql, (xmax, xmin, ymax, ymin))]
+
+    def has_columns(self, *names: str) -> bool:
+        """Check that all the given columns exist in the feature table"""
+        available = set(self.columns())
+        return all(name in available for name in names)
+
+    def srs_id(self) -> Optional[int]:
+        """Spatial reference system id registered for the geometry column, or None"""
+        row = self.connect().execute(
+            "SELECT srs_id FROM gpkg_geometry_columns WHERE table_name = ?", (self.table,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def zone_state(self) -> Tuple[int, Optional[int]]:
+        """(row count, maximum fid) of the feature table"""
+        row = self.connect().execute(
+            f"SELECT COUNT(*), MAX({quote_identifier(self.fid_column)}) FROM {quote_identifier(self.table)}"
+        ).fetchone()
+        return row[0], row[1]
+
+    def has_department_join(self) -> bool:
+        """
+        Whether a current zone to department spatial join is stored in the GeoPackage
+
+        The join is current while the table keeps the row count and maximum
+        fid recorded when it was built; zones added or removed afterwards
+        make it stale until 'maintain_gpkg.py join' is run again.
+        Rechecked when the file changes.
+        """
+        signature = self.signature()
+        if self._has_join is None or self._has_join[0] != signature:
+            conn = self.connect()
+            tables = {row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN (?, ?)",
+                (DEPARTMENT_JOIN_TABLE, DEPARTMENT_JOIN_STATE_TABLE))}
+            current = False
+            if tables == {DEPARTMENT_JOIN_TABLE, DEPARTMENT_JOIN_STATE_TABLE}:
+                stored = conn.execute(f"SELECT zonas, max_fid FROM {DEPARTMENT_JOIN_STATE_TABLE}").fetchone()
+                current = stored is not None and tuple(stored) == self.zone_state()
+            self._has_join = (signature, current)
+            self._joined_ids = None
+        return self._has_join[1]
+
+    def joined_department_ids(self) -> Set[int]:
+        """Ids of the departments that contain at least one zone in the stored spatial join"""
+        # has_department_join() descarta los ids guardados cuando cambia el archivo
+        current = self.has_department_join()
+        if self._joined_ids is None:
+            self._joined_ids = {row[0] for row in self.connect().execute(
+                f"SELECT DISTINCT dpto_id FROM {DEPARTMENT_JOIN_TABLE}")} if current else set()
+        return self._joined_ids
+
+    def has_unmapped_departments(self) -> bool:
+        """
+        Whether some zone has a NOM_DPTO but no materialized DPTO_ID
+
+        Such zones were added or edited with a department spelling unknown
+        to 'maintain_gpkg.py departments'. Rechecked when the file changes.
+        """
+        signature = self.signature()
+        if self._unmapped is None or self._unmapped[0] != signature:
+            row = self.connect().execute(
+                f"SELECT 1 FROM {quote_identifier(self.table)} "
+                f"WHERE {DEPARTMENT_ID_COLUMN} IS NULL AND NOM_DPTO IS NOT NULL LIMIT 1"
+            ).fetchone()
+            self._unmapped = (signature, row is not None)
+        return self._unmapped[1]
+
+    def department_catalog(self) -> Optional[DepartmentCatalog]:
+        """
+        Department id catalog materialized in the GeoPackage
+
+        Returns:
+            The catalog, or None if neither the DPTO_ID column nor the
+            spatial join were ever materialized
+        """
+        if self._catalog is None and (self.has_columns(DEPARTMENT_ID_COLUMN) or self.has_department_join()):
+            self._catalog = DepartmentCatalog.from_connection(self.connect())
+        return self._catalog
+
+    def distinct_values(self, column: str) -> List:
+        """Distinct values stored in a column (NULLs excluded)"""
+        sql = (f"SELECT DISTINCT {quote_identifier(column)} FROM {quote_identifier(self.table)} "
+               f"WHERE {quote_identifier(column)} IS NOT NULL")
+        return [row[0] for row in self.connect().execute(sql)]
+
+    def matching_values(self, column: str, predicate: Callable) -> List:
+        """Distinct values of a column for which predicate(value) is true"""
+        return [value for value in self.distinct_values(column) if predicate(value)]
+
+    def fid_range(self) -> Optional[Tuple[int, int]]:
+        """Smallest and largest feature id of the table, or None if it is empty"""
+        fid = quote_identifier(self.fid_column)
+        row = self.connect().execute(f"SELECT MIN({fid}), MAX({fid}) FROM {quote_identifier(self.table)}").fetchone()
+        return None if row[0] is None else (row[0], row[1])
+
+    def _where(self, filters: Dict[str, Sequence], departments: Optional[Sequence[int]],
+               fid_range: Optional[Tuple[int, int]] = None):
+        """WHERE clause and parameters for IN filters, joined department ids and a fid range"""
+        clauses = []
+        params = []
+        if fid_range is not None:
+            clauses.append(f"{quote_identifier(self.fid_column)} BETWEEN ? AND ?")
+            params.extend(fid_range)
+        for column, values in filters.items():
+            clauses.append(f"{quote_identifier(column)} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        if departments is not None:
+            clauses.append(f"{quote_identifier(self.fid_column)} IN (SELECT fid FROM {DEPARTMENT_JOIN_TABLE} "
+                           f"WHERE dpto_id IN ({', '.join('?' * len(departments))}))")
+            params.extend(departments)
+        return ' AND '.join(clauses) or '1', params
+
+    def fids_where_in(self, filters: Dict[str, Sequence], departments: Optional[Sequence[int]] = None,
+                      fid_range: Optional[Tuple[int, int]] = None) -> List[int]:
+        """
+        Feature ids whose columns take one of the given values
+
+        Args:
+            filters: Mapping of column name to the accepted raw values
+            departments: Department ids of the spatial join to restrict to
+            fid_range: Inclusive (first, last) fid range to restrict to
+
+        Returns:
+            Sorted list of matching fids (empty if any value list is empty)
+        """
+        return list(self.iter_fids_where_in(filters, departments, fid_range))
+
+    def iter_fids_where_in(self, filters: Dict[str, Sequence], departments: Optional[Sequence[int]] = None,
+                           fid_range: Optional[Tuple[int, int]] = None) -> Iterator[int]:
+        """Like fids_where_in(), streaming the fids from the cursor instead of building a list"""
+        if any(not values for values in filters.values()) or departments is not None and not departments:
+            return
+        sql, params = self._fids_sql(filters, departments, fid_range)
+        for row in self.connect().execute(sql, params):
+            yield row[0]
+
+    def query_plan(self, filters: Dict[str, Sequence], departments: Optional[Sequence[int]] = None) -> List[str]:
+        """
+        SQLite query plan of fids_where_in() for the given filters
+
+        Returns:
+            The plan steps (e.g. 'SEARCH zonas USING INDEX ...' or
+            'SCAN zonas'), empty if the query would not run at all
+        """
+        if any(not values for values in filters.values()) or departments is not None and not departments:
+            return []
+        sql, params = self._fids_sql(filters, departments)
+        return [row[-1] for row in self.connect().execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+    def _fids_sql(self, filters: Dict[str, Sequence], departments: Optional[Sequence[int]],
+                  fid_range: Optional[Tuple[int, int]] = None):
+        where, params = self._where(filters, departments, fid_range)
+        fid = quote_identifier(self.fid_column)
+        return f"SELECT {fid} FROM {quote_identifier(self.table)} WHERE {where} ORDER BY {fid}", params
+
+    def value_counts(self, column: str, filters: Dict[str, Sequence],
+                     departments: Optional[Sequence[int]] = None,
+                     fid_range: Optional[Tuple[int, int]] = None) -> Dict:
+        """
+        Number of rows per value of a column among the rows matching the filters
+
+        Args:
+            column: Column whose values are counted
+            filters: Mapping of column name to the accepted raw values
+            departments: Department ids of the spatial join to restrict to
+            fid_range: Inclusive (first, last) fid range to restrict to
+        """
+        if any(not values for values in filters.values()) or departments is not None and not departments:
+            return {}
+        where, params = self._where(filters, departments, fid_range)
+        quoted = quote_identifier(column)
+        sql = f"SELECT {quoted}, COUNT(*) FROM {quote_identifier(self.table)} WHERE {where} GROUP BY {quoted}"
+        return dict(self.connect().execute(sql, params).fetchall())
+
+    def totals_by_value(self, column: str, area_column: str = 'AREA_KM2') -> Dict:
+        """
+        Row count and summed area per value of a column
+
+        Returns:
+            Dict of raw value to (rows, total area); NULL areas count as 0
+        """
+        quoted = quote_identifier(column)
+        sql = (f"SELECT {quoted}, COUNT(*), TOTAL({quote_identifier(area_column)}) "
+               f"FROM {quote_identifier(self.table)} GROUP BY {quoted}")
+        return {value: (count, area) for value, count, area in self.connect().execute(sql)}
+
+    def top_by_area(self, level_column: str, area_min: float, area_max: float, limit: int,
+                    fid_range: Optional[Tuple[int, int]] = None) -> List[tuple]:
+        """
+        Largest zones with complete data within an area range
+
+        Zones need a department, a municipality, a non-zero area and a
+        production level, mirroring the checks done on QGIS features.
+
+        Returns:
+            List of (NOM_DPTO, NOM_MUN, AREA_KM2, level) tuples, largest first
+            (ties in fid order)
+        """
+        level = quote_identifier(level_column)
+        fid = quote_identifier(self.fid_column)
+        params = [area_min, area_max]
+        in_range = ''
+        if fid_range is not None:
+            in_range = f"AND {fid} BETWEEN ? AND ? "
+            params.extend(fid_range)
+        sql = (f"SELECT NOM_DPTO, NOM_MUN, AREA_KM2, {level} FROM {quote_identifier(self.table)} "
+               f"WHERE NOM_DPTO <> '' AND NOM_MUN <> '' AND AREA_KM2 <> 0 AND {level} <> '' "
+               f"AND AREA_KM2 BETWEEN ? AND ? {in_range}"
+               f"ORDER BY AREA_KM2 DESC, {fid} LIMIT ?")
+        return self.connect().execute(sql, params + [limit]).fetchall()
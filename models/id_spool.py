@@ -0,0 +1,108 @@
+"""
+Memory-bounded collection of query result ids.
+
+Queries on huge layers can match millions of zones. Results up to
+Config.MAX_FEATURES_IN_MEMORY ids are kept as a plain list; larger results
+are spooled into a private temporary SQLite database, which keeps only a
+small page cache in memory and spills the rest to disk. The spool is read
+back in fid order and in chunks, so the selection can be applied without
+materializing the whole result.
+"""
+import sqlite3
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Union
+
+from config import Config
+
+# Caché de páginas del almacén temporal (KiB, valor negativo para SQLite)
+SPOOL_CACHE_KIB = 2048
+READ_CHUNK = 10000
+
+
+class IdSpool:
+    """Set of feature ids stored in a temporary SQLite database"""
+
+    def __init__(self, ids: Iterable[int] = ()):
+        # Una ruta vacía crea una base temporal privada que SQLite borra al cerrar
+        self._conn = sqlite3.connect('', check_same_thread=False)
+        self._conn.execute(f"PRAGMA cache_size = -{SPOOL_CACHE_KIB}")
+        self._conn.execute("PRAGMA journal_mode = OFF")
+        self._conn.execute("CREATE TABLE ids (fid INTEGER PRIMARY KEY)")
+        self._count = 0
+        self.extend(ids)
+
+    def extend(self, ids: Iterable[int]) -> None:
+        """Add ids to the spool (duplicates are ignored)"""
+        iterator = iter(ids)
+        while True:
+            chunk = list(islice(iterator, READ_CHUNK))
+            if not chunk:
+                break
+            with self._conn:
+                before = self._conn.total_changes
+                self._conn.executemany("INSERT OR IGNORE INTO ids (fid) VALUES (?)", ((fid,) for fid in chunk))
+                self._count += self._conn.total_changes - before
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __bool__(self) -> bool:
+        return self._count > 0
+
+    def __iter__(self) -> Iterator[int]:
+        """Ids in ascending order, read back in chunks"""
+        for chunk in self.chunks(READ_CHUNK):
+            yield from chunk
+
+    def chunks(self, size: int) -> Iterator[List[int]]:
+        """Ids in ascending order, as lists of at most size ids"""
+        last = None
+        while True:
+            if last is None:
+                rows = self._conn.execute("SELECT fid FROM ids ORDER BY fid LIMIT ?", (size,))
+            else:
+                rows = self._conn.execute("SELECT fid FROM ids WHERE fid > ? ORDER BY fid LIMIT ?", (last, size))
+            chunk = [row[0] for row in rows]
+            if not chunk:
+                return
+            last = chunk[-1]
+            yield chunk
+
+    def missing(self, ids: Iterable[int]) -> List[int]:
+        """Those of the given ids that are not in the spool"""
+        missing = []
+        iterator = iter(ids)
+        while True:
+            chunk = list(islice(iterator, READ_CHUNK))
+            if not chunk:
+                return missing
+            found = {row[0] for row in self._conn.execute(
+                f"SELECT fid FROM ids WHERE fid IN ({', '.join('?' * len(chunk))})", chunk)}
+            missing.extend(fid for fid in chunk if fid not in found)
+
+    def close(self) -> None:
+        """Drop the temporary database"""
+        self._conn.close()
+
+
+def collect_ids(ids: Iterable[int], limit: Optional[int] = None) -> Union[List[int], IdSpool]:
+    """
+    Gather query result ids within the memory budget
+
+    Args:
+        ids: Matching ids, in any order
+        limit: Maximum ids kept in memory (Config.MAX_FEATURES_IN_MEMORY if None)
+
+    Returns:
+        The ids as a list if there are at most limit of them, otherwise an
+        IdSpool holding them
+    """
+    if limit is None:
+        limit = Config.MAX_FEATURES_IN_MEMORY
+    iterator = iter(ids)
+    head = list(islice(iterator, limit + 1))
+    if len(head) <= limit:
+        return head
+    spool = IdSpool(head)
+    spool.extend(iterator)
+    return spool
@@ -0,0 +1,157 @@
+"""
+Partitioned execution of the crop queries for batch and headless use.
+
+The zones table is split into contiguous fid ranges and each range is
+queried in a separate worker process through its own read-only GeoPackage
+connection. The filters are planned once in the calling process exactly as
+CropQueryEngine plans them, and the partial results are merged so that ids,
+counts and TOP zones are identical to a single-process query. The worker
+pool is started once per scanner, and several queries (e.g. the counts of
+every department of a report) travel to each partition in one submission.
+"""
+import heapq
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import Config
+from models.departments import normalize_department
+from models.gpkg_reader import GeoPackageReader
+from models.query_engine import department_filters, level_counts_from_values
+from models.zone_records import ZoneResults
+
+
+def fid_partitions(first: int, last: int, count: int) -> List[Tuple[int, int]]:
+    """
+    Split an inclusive fid range into up to count contiguous ranges
+
+    Ranges have the same width (not the same number of rows), which keeps
+    partitions balanced for the dense fids of GeoPackage tables.
+    """
+    span = last - first + 1
+    count = max(1, min(count, span))
+    bounds = [first + span * i // count for i in range(count + 1)]
+    return [(bounds[i], bounds[i + 1] - 1) for i in range(count)]
+
+
+def _run_partition_local(reader: GeoPackageReader, calls: Sequence[Tuple[str, tuple]],
+                         fid_range: Tuple[int, int]) -> List:
+    """Run a batch of queries on a fid range with an open reader (single partition)"""
+    return [getattr(reader, method)(*args, fid_range=fid_range) for method, args in calls]
+
+
+def _run_partition(path: str, table: str, calls: Sequence[Tuple[str, tuple]], fid_range: Tuple[int, int]) -> List:
+    """Run a batch of GeoPackageReader queries on a fid range (executed in a worker process)"""
+    reader = GeoPackageReader(path, table)
+    try:
+        return _run_partition_local(reader, calls, fid_range)
+    finally:
+        reader.close()
+
+
+class PartitionedScanner:
+    """Runs the crop queries over fid partitions of a GeoPackage in worker processes"""
+
+    def __init__(self, path: str, table: Optional[str] = None, workers: Optional[int] = None,
+                 use_spatial_join: Optional[bool] = None):
+        if workers is None:
+            workers = Config.SCAN_WORKERS or os.cpu_count() or 1
+        if use_spatial_join is None:
+            use_spatial_join = Config.USE_SPATIAL_DEPARTMENT_JOIN
+        self.reader = GeoPackageReader(path, table)
+        self.workers = max(1, workers)
+        self.use_spatial_join = use_spatial_join
+        self._pool = None
+
+    def partitions(self) -> List[Tuple[int, int]]:
+        """Fid ranges scanned by the workers (empty for an empty table)"""
+        bounds = self.reader.fid_range()
+        if bounds is None:
+            return []
+        return fid_partitions(bounds[0], bounds[1], self.workers)
+
+    def _map_batch(self, calls: Sequence[Tuple[str, tuple]]) -> List[List]:
+        """
+        Partial results of several reader queries
+
+        Returns:
+            One list per call with its partial results, one per partition
+            in fid order
+        """
+        partitions = self.partitions()
+        if len(partitions) <= 1:
+            per_partition = [_run_partition_local(self.reader, calls, fid_range) for fid_range in partitions]
+        else:
+            if self._pool is None:
+                # El pool se crea una vez: arrancar procesos cuesta más que escanear una partición
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            count = len(partitions)
+            per_partition = list(self._pool.map(_run_partition, [self.reader.path] * count,
+                                                [self.reader.table] * count, [calls] * count, partitions))
+        return [[partial[i] for partial in per_partition] for i in range(len(calls))]
+
+    def _map(self, method: str, *args) -> List:
+        """Partial results of a reader query, one per partition in fid order"""
+        return self._map_batch([(method, args)])[0]
+
+    def _require(self, *columns: str) -> None:
+        missing = [column for column in columns if not self.reader.has_columns(column)]
+        if missing:
+            raise ValueError(f"Missing columns in '{self.reader.table}': {', '.join(missing)}")
+
+    def find_zones(self, departamentos: List[str], col_cultivo: str, produccion: str) -> List[int]:
+        """Ids of the zones in the given departments with the given production level (sorted)"""
+        self._require('NOM_DPTO', col_cultivo)
+        nivel = produccion.strip().upper()
+        departamentos_norm = {normalize_department(dep) for dep in departamentos}
+        filters, dept_ids = department_filters(self.reader, departamentos_norm, self.use_spatial_join)
+        filters[col_cultivo] = self.reader.matching_values(
+            col_cultivo, lambda value: bool(value) and str(value).strip().upper() == nivel)
+        ids = []
+        # Las particiones están en orden de fid: concatenar conserva el orden
+        for partial in self._map('fids_where_in', filters, dept_ids):
+            ids.extend(partial)
+        return ids
+
+    def level_counts(self, departamento: str, col_cultivo: str) -> Dict[str, int]:
+        """Number of zones of a department per production level of a crop"""
+        return self.level_counts_by_department([departamento], col_cultivo)[departamento]
+
+    def level_counts_by_department(self, departamentos: Iterable[str], col_cultivo: str) -> Dict[str, Dict[str, int]]:
+        """
+        Level counts of several departments, in one submission per partition
+
+        Returns:
+            Mapping of each department name to its 'Alto', 'Medio' and 'Bajo' counts
+        """
+        self._require('NOM_DPTO', col_cultivo)
+        departamentos = list(departamentos)
+        calls = []
+        for departamento in departamentos:
+            filters, dept_ids = department_filters(
+                self.reader, {normalize_department(departamento)}, self.use_spatial_join)
+            calls.append(('value_counts', (col_cultivo, filters, dept_ids)))
+        counts = {}
+        for departamento, partials in zip(departamentos, self._map_batch(calls)):
+            values = Counter()
+            for partial in partials:
+                values.update(partial)
+            counts[departamento] = level_counts_from_values(values)
+        return counts
+
+    def top_zones(self, col_cultivo: str, area_min: float, area_max: float, top_count: int) -> ZoneResults:
+        """Largest zones for a crop within an area range, largest first"""
+        self._require('NOM_DPTO', 'NOM_MUN', 'AREA_KM2', col_cultivo)
+        partials = self._map('top_by_area', col_cultivo, area_min, area_max, top_count)
+        # merge() es estable: a igual área gana la partición de fids menores, como en SQL
+        merged = heapq.merge(*partials, key=lambda row: -row[2])
+        return ZoneResults.from_rows(islice(merged, top_count))
+
+    def close(self) -> None:
+        """Stop the worker processes and close the planning connection"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self.reader.close()
@@ -0,0 +1,479 @@
+"""
+Query engine for the crop zones layer.
+
+Runs the attribute filters used by the plugin either as SQL on the
+GeoPackage backing the layer (fast path) or by iterating the layer's
+features through the QGIS provider (any other data source).
+"""
+import heapq
+from typing import Dict, List, Optional, Tuple, Union
+
+from config import Config
+from models.attribute_snapshot import (
+    LEVEL_CODES, LEVEL_NAMES, NULL_LEVEL, AttributeSnapshot, content_hash, department_source, encode_level,
+    snapshot_path
+)
+from models.crop_schema import CropSchema, crop_column
+from models.departments import DEPARTMENT_CODE_COLUMN, DEPARTMENT_ID_COLUMN, normalize_department
+from models.feature_extents import FeatureExtentIndex
+from models.gpkg_maintenance import create_attribute_indexes, crop_columns, has_attribute_indexes
+from models.gpkg_reader import GeoPackageReader
+from models.id_spool import IdSpool, collect_ids
+from models.query_explain import PATH_PUSHDOWN, PATH_SCAN, PATH_SNAPSHOT, QueryExplain
+from models.zone_records import ZoneResults
+
+
+def department_filters(reader: GeoPackageReader, departamentos_norm, use_join: bool = False):
+    """
+    SQL filters selecting the zones of the given departments
+
+    Args:
+        reader: GeoPackage reader of the zones table
+        departamentos_norm: Normalized department names
+        use_join: Prefer the stored zone -> department spatial join
+
+    Returns:
+        (filters, department ids) for GeoPackageReader.fids_where_in() and
+        value_counts(); the ids are None unless the spatial join is used.
+        The join is used only when it contains zones of every requested
+        department (departments outside the boundary layer are filtered
+        by name instead).
+    """
+    source = department_source(reader, use_join)
+    if source == 'join':
+        dept_ids = reader.department_catalog().ids_for(departamentos_norm)
+        if len(dept_ids) == len(departamentos_norm) and reader.joined_department_ids().issuperset(dept_ids):
+            # Contención espacial precalculada: unir por id de departamento
+            return {}, dept_ids
+        source = department_source(reader)
+    if source == DEPARTMENT_ID_COLUMN:
+        # Departamentos materializados: comparar ids enteros
+        return {DEPARTMENT_ID_COLUMN: reader.department_catalog().ids_for(departamentos_norm)}, None
+    return {'NOM_DPTO': reader.matching_values(
+        'NOM_DPTO', lambda value: normalize_department(value) in departamentos_norm)}, None
+
+
+def level_counts_from_values(values: Dict) -> Dict[str, int]:
+    """Fold raw level value counts into 'Alto', 'Medio' and 'Bajo' counts"""
+    counts = {'Alto': 0, 'Medio': 0, 'Bajo': 0}
+    for value, count in values.items():
+        code = encode_level(value)
+        if code != NULL_LEVEL:
+            counts[LEVEL_NAMES[code]] += count
+    return counts
+
+
+class CropQueryEngine:
+    """Executes the crop zone queries against a QGIS vector layer"""
+
+    def __init__(self, use_fast_path: Optional[bool] = None, auto_index: Optional[bool] = None,
+                 use_snapshot: Optional[bool] = None, snapshot_dir: Optional[str] = None,
+                 use_spatial_join: Optional[bool] = None):
+        if use_fast_path is None:
+            use_fast_path = Config.ENABLE_GPKG_FAST_PATH
+        if auto_index is None:
+            auto_index = Config.AUTO_CREATE_GPKG_INDEXES
+        if use_snapshot is None:
+            use_snapshot = Config.ENABLE_FEATURE_CACHING
+        if snapshot_dir is None and Config.PERSIST_ATTRIBUTE_SNAPSHOT:
+            snapshot_dir = Config.SNAPSHOT_CACHE_DIR
+        if use_spatial_join is None:
+            use_spatial_join = Config.USE_SPATIAL_DEPARTMENT_JOIN
+        self.use_fast_path = use_fast_path
+        self.auto_index = auto_index
+        self.use_snapshot = use_snapshot
+        self.snapshot_dir = snapshot_dir
+        self.use_spatial_join = use_spatial_join
+        self.index_reports = {}
+        self.last_explain: Optional[QueryExplain] = None
+        self._readers = {}
+        self._snapshots = {}
+        self._snapshot_settings = None  # (CACHE_SIZE_MB, SNAPSHOT_MEMORY_MAP) of the cached snapshots
+        self._extents = {}
+        self._schemas = {}
+        self._crops = {}
+
+    def get_reader(self, layer) -> Optional[GeoPackageReader]:
+        """Return a (cached) GeoPackage reader for the layer, or None to use getFeatures()"""
+        if not self.use_fast_path:
+            return None
+        reader = GeoPackageReader.for_layer(layer)
+        if reader is None:
+            return None
+        key = (reader.path, reader.layername)
+        if key not in self._readers:
+            if self.auto_index and not has_attribute_indexes(reader.path, reader.layername):
+                # Primer uso del GeoPackage: crear los índices de atributos (sin medir
+                # tiempos en el hilo de la interfaz; eso queda para 'maintain_gpkg.py indexes')
+                self.index_reports[key] = create_attribute_indexes(reader.path, reader.layername,
+                                                                   benchmark=False)
+            self._readers[key] = reader
+        return self._readers[key]
+
+    def get_snapshot(self, layer) -> Optional[AttributeSnapshot]:
+        """
+        Return the attribute snapshot of a GeoPackage-backed layer
+
+        The snapshot is built on first use and rebuilt whenever the
+        GeoPackage file changes on disk. With a snapshot directory, it is
+        also persisted there and memory-mapped on the next session instead
+        of scanning the GeoPackage again. Cached snapshots are reloaded when
+        Config.CACHE_SIZE_MB or SNAPSHOT_MEMORY_MAP change (e.g. through
+        Config.set_profile()).
+
+        Returns:
+            The snapshot, or None when snapshots are disabled, the layer
+            is not read through the GeoPackage fast path or the snapshot
+            exceeds Config.CACHE_SIZE_MB and cannot be memory-mapped
+        """
+        if not self.use_snapshot:
+            return None
+        reader = self.get_reader(layer)
+        if reader is None or not reader.has_columns('NOM_DPTO', 'AREA_KM2'):
+            return None
+        settings = (Config.CACHE_SIZE_MB, Config.SNAPSHOT_MEMORY_MAP)
+        if settings != self._snapshot_settings:
+            # Cambió el perfil de rendimiento: volver a cargar las instantáneas con el nuevo presupuesto
+            self._snapshots.clear()
+            self._snapshot_settings = settings
+        key = (reader.path, reader.layername)
+        signature = reader.signature()
+        cached = self._snapshots.get(key)
+        if cached is None or cached[0] != signature:
+            cached = (signature, self._load_or_build_snapshot(reader, signature))
+            self._snapshots[key] = cached
+        return cached[1]
+
+    def _load_or_build_snapshot(self, reader: GeoPackageReader, signature: tuple) -> Optional[AttributeSnapshot]:
+        """
+        Memory-map the persisted snapshot if still valid, otherwise scan and persist it
+
+        Snapshots are kept in RAM only within Config.CACHE_SIZE_MB; larger
+        ones are memory-mapped from the snapshot directory, or not used at
+        all (queries go through SQL) when they cannot be persisted.
+        """
+        budget = Config.CACHE_SIZE_MB * 1024 * 1024
+        if not self.snapshot_dir:
+            snapshot = AttributeSnapshot.from_reader(reader, crop_columns(reader.columns()), self.use_spatial_join)
+            return snapshot if snapshot.nbytes <= budget else None
+
+        path = snapshot_path(self.snapshot_dir, reader.path, reader.table)
+        source = department_source(reader, self.use_spatial_join)
+        snapshot = AttributeSnapshot.load(path, signature, reader.path, source, Config.SNAPSHOT_VALIDATE_HASH)
+        if snapshot is None:
+            built = AttributeSnapshot.from_reader(reader, crop_columns(reader.columns()), self.use_spatial_join)
+            source_hash = content_hash(reader.path) if Config.SNAPSHOT_VALIDATE_HASH else None
+            try:
+                built.save(path, signature, source_hash)
+            except OSError:
+                # Sin permisos de escritura: se sigue usando la copia en memoria
+                return built if built.nbytes <= budget else None
+            if not Config.SNAPSHOT_MEMORY_MAP and built.nbytes <= budget:
+                return built
+            # Se libera la copia construida y se consulta el archivo mapeado
+            snapshot = AttributeSnapshot.load(path, signature, reader.path, source) or built
+            return snapshot
+
+        if not Config.SNAPSHOT_MEMORY_MAP and snapshot.nbytes <= budget:
+            return snapshot.in_memory()
+        return snapshot
+
+    def get_extent_index(self, layer) -> Optional[FeatureExtentIndex]:
+        """
+        Return the per-feature bounding boxes of a layer
+
+        GeoPackage layers read them from the R-tree and rebuild them when the
+        file changes; other layers scan their geometries once.
+
+        Returns:
+            The extent index, or None if the layer exposes no geometries
+        """
+        reader = self.get_reader(layer)
+        if reader is not None and reader.rtree_table() is not None:
+            key = (reader.path, reader.layername)
+            signature = reader.signature()
+            cached = self._extents.get(key)
+            if cached is None or cached[0] != signature:
+                cached = (signature, FeatureExtentIndex.from_reader(reader))
+                self._extents[key] = cached
+            return cached[1]
+
+        try:
+            key = layer.id()
+        except AttributeError:
+            return None
+        if key not in self._extents:
+            self._extents[key] = (None, FeatureExtentIndex.from_layer(layer))
+        return self._extents[key][1]
+
+    def result_extent(self, layer, ids: List[int]) -> Optional[tuple]:
+        """
+        Extent covering the given zones
+
+        Returns:
+            (xmin, ymin, xmax, ymax) in layer CRS, or None if there is nothing to zoom to
+        """
+        if not ids:
+            return None
+        index = self.get_extent_index(layer)
+        return index.union_extent(ids) if index is not None else None
+
+    def bbox_candidates(self, layer, rect: tuple) -> List[int]:
+        """
+        Ids of the zones whose bounding box intersects a rectangle
+
+        GeoPackage layers query their R-tree; other layers use the in-memory
+        extent index built on first use.
+
+        Args:
+            layer: 'Zonas de Cultivos' layer
+            rect: (xmin, ymin, xmax, ymax) in layer CRS
+
+        Returns:
+            Sorted list of candidate feature ids
+        """
+        reader = self.get_reader(layer)
+        if reader is not None:
+            ids = reader.fids_in_rect(*rect)
+            if ids is not None:
+                return ids
+        index = self.get_extent_index(layer)
+        return index.ids_in_rect(*rect) if index is not None else []
+
+    def close(self) -> None:
+        """Close every cached GeoPackage connection and drop the snapshots"""
+        for reader in self._readers.values():
+            reader.close()
+        self._readers.clear()
+        self._snapshots.clear()
+        self._extents.clear()
+        self._schemas.clear()
+        self._crops.clear()
+
+    def get_schema(self, layer) -> CropSchema:
+        """Return the (cached) schema descriptor of a layer, rebuilt if its fields change"""
+        names = list(layer.fields().names())
+        key = layer.id()
+        schema = self._schemas.get(key)
+        if schema is None or schema.field_names != names:
+            schema = CropSchema(names)
+            self._schemas[key] = schema
+        return schema
+
+    def discover_crops(self, layer) -> Dict[str, str]:
+        """
+        Crops available in a layer, keyed by display name
+
+        Reads the 'CUL_*' fields and keeps those holding at least one known
+        production level (CropSchema.validate). The result is cached until
+        the layer schema changes.
+
+        Returns:
+            Ordered mapping of crop name to production level column
+        """
+        return dict(self._validate_crops(layer)[0])
+
+    def unexpected_levels(self, layer) -> Dict[str, List[str]]:
+        """Values of each crop column that are not a known production level"""
+        return dict(self._validate_crops(layer)[1])
+
+    def _validate_crops(self, layer) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+        schema = self.get_schema(layer)
+        key = (layer.id(), schema.version)
+        if key not in self._crops:
+            self._crops[key] = schema.validate(layer)
+        return self._crops[key]
+
+    def crop_column(self, layer, crop: str) -> Optional[str]:
+        """Production level column of a crop name, including crops discovered in the layer"""
+        column = crop_column(crop)
+        if column is None and layer is not None:
+            column = self.discover_crops(layer).get(crop)
+        return column
+
+    def find_zones(self, layer, departamentos: List[str], col_cultivo: str,
+                   produccion: str) -> Union[List[int], IdSpool]:
+        """
+        Ids of the zones in the given departments with the given production level
+
+        Args:
+            layer: 'Zonas de Cultivos' layer
+            departamentos: Department names as shown in the form
+            col_cultivo: Production level column of the crop (e.g. 'CUL_MAIZ')
+            produccion: Production level ('Alto', 'Medio' or 'Bajo')
+
+        Returns:
+            List of matching feature ids, or an IdSpool when more than
+            Config.MAX_FEATURES_IN_MEMORY zones match. How the query ran is
+            recorded in last_explain.
+        """
+        explain = self.last_explain = QueryExplain(
+            f"{col_cultivo} = {produccion} en {', '.join(departamentos)}")
+        with explain.stage('lookup'):
+            snapshot = self.get_snapshot(layer)
+        if snapshot is not None:
+            with explain.stage('fetch'):
+                ids = snapshot.find_zones(departamentos, col_cultivo, produccion)
+            if ids is not None:
+                explain.path = PATH_SNAPSHOT
+                explain.examined = len(snapshot)
+                explain.matched = len(ids)
+                return ids
+
+        departamentos_norm = {normalize_department(dep) for dep in departamentos}
+        nivel = produccion.strip().upper()
+
+        def matches_level(value):
+            return bool(value) and str(value).strip().upper() == nivel
+
+        with explain.stage('lookup'):
+            reader = self.get_reader(layer)
+            pushdown = reader is not None and reader.has_columns('NOM_DPTO', col_cultivo)
+            if pushdown:
+                filters, dept_ids = department_filters(reader, departamentos_norm, self.use_spatial_join)
+                filters[col_cultivo] = reader.matching_values(col_cultivo, matches_level)
+        if pushdown:
+            explain.path = PATH_PUSHDOWN
+            explain.plan = reader.query_plan(filters, departments=dept_ids)
+            with explain.stage('fetch'):
+                ids = collect_ids(reader.iter_fids_where_in(filters, departments=dept_ids))
+            explain.matched = len(ids)
+            return ids
+
+        schema = self.get_schema(layer)
+        level_idx = schema.index_of(col_cultivo)
+        if schema.has(DEPARTMENT_CODE_COLUMN):
+            department_idx = schema.index_of(DEPARTMENT_CODE_COLUMN)
+
+            def department_of(feature):
+                return feature.attribute(department_idx)
+        else:
+            department_idx = schema.index_of('NOM_DPTO')
+
+            def department_of(feature):
+                return normalize_department(feature.attribute(department_idx))
+
+        explain.path = PATH_SCAN
+        explain.examined = 0
+
+        def examined(features):
+            for feature in features:
+                explain.examined += 1
+                yield feature
+
+        with explain.stage('fetch'):
+            ids = collect_ids(
+                feature.id() for feature in examined(layer.getFeatures())
+                if department_of(feature) in departamentos_norm and matches_level(feature.attribute(level_idx))
+            )
+        explain.matched = len(ids)
+        return ids
+
+    def level_counts(self, layer, departamento: str, col_cultivo: str) -> Dict[str, int]:
+        """
+        Number of zones of a department per production level of a crop
+
+        Returns:
+            Dict with 'Alto', 'Medio' and 'Bajo' counts
+        """
+        snapshot = self.get_snapshot(layer)
+        if snapshot is not None:
+            counts = snapshot.level_counts(departamento, col_cultivo)
+            if counts is not None:
+                return counts
+
+        counts = {'Alto': 0, 'Medio': 0, 'Bajo': 0}
+        names = {code: name.capitalize() for name, code in LEVEL_CODES.items()}
+        dep_norm = normalize_department(departamento)
+
+        reader = self.get_reader(layer)
+        if reader is not None and reader.has_columns('NOM_DPTO', col_cultivo):
+            filters, dept_ids = department_filters(reader, {dep_norm}, self.use_spatial_join)
+            return level_counts_from_values(reader.value_counts(col_cultivo, filters, departments=dept_ids))
+
+        schema = self.get_schema(layer)
+        level_idx = schema.index_of(col_cultivo)
+        department_idx = schema.index_of('NOM_DPTO')
+        for feature in layer.getFeatures():
+            name = names.get(encode_level(feature.attribute(level_idx)))
+            if name and normalize_department(feature.attribute(department_idx)) == dep_norm:
+                counts[name] += 1
+        return counts
+
+    def source_key(self, layer) -> Tuple[object, Optional[tuple]]:
+        """
+        Cache key and modification signature of a layer's data
+
+        GeoPackage layers are keyed by file and table and carry the file
+        signature; other layers are keyed by layer id with no signature.
+        """
+        reader = self.get_reader(layer)
+        if reader is not None:
+            return (reader.path, reader.layername), reader.signature()
+        return layer.id(), None
+
+    def level_totals(self, layer, col_cultivo: str) -> Dict[str, Tuple[int, float]]:
+        """
+        Number of zones and total area per production level of a crop
+
+        Returns:
+            Dict of 'Alto', 'Medio' and 'Bajo' to (zones, area in km²)
+        """
+        snapshot = self.get_snapshot(layer)
+        if snapshot is not None:
+            totals = snapshot.level_totals(col_cultivo)
+            if totals is not None:
+                return totals
+
+        totals = {'Alto': [0, 0.0], 'Medio': [0, 0.0], 'Bajo': [0, 0.0]}
+        names = {code: name.capitalize() for name, code in LEVEL_CODES.items()}
+
+        reader = self.get_reader(layer)
+        if reader is not None and reader.has_columns('AREA_KM2', col_cultivo):
+            for value, (count, area) in reader.totals_by_value(col_cultivo).items():
+                name = names.get(encode_level(value))
+                if name:
+                    totals[name][0] += count
+                    totals[name][1] += area
+        else:
+            schema = self.get_schema(layer)
+            level_idx = schema.index_of(col_cultivo)
+            area_idx = schema.index_of('AREA_KM2')
+            for feature in layer.getFeatures():
+                name = names.get(encode_level(feature.attribute(level_idx)))
+                if name:
+                    totals[name][0] += 1
+                    totals[name][1] += float(feature.attribute(area_idx) or 0)
+        return {name: (count, area) for name, (count, area) in totals.items()}
+
+    def top_zones(self, layer, col_cultivo: str, area_min: float, area_max: float,
+                  top_count: int) -> ZoneResults:
+        """
+        Largest zones for a crop within an area range
+
+        Returns:
+            Up to top_count compact zone records, sorted by area from
+            largest to smallest
+        """
+        reader = self.get_reader(layer)
+        if reader is not None and reader.has_columns('NOM_DPTO', 'NOM_MUN', 'AREA_KM2', col_cultivo):
+            return ZoneResults.from_rows(reader.top_by_area(col_cultivo, area_min, area_max, top_count))
+
+        schema = self.get_schema(layer)
+        dpto_idx, mun_idx, area_idx, level_idx = (
+            schema.index_of(column) for column in ('NOM_DPTO', 'NOM_MUN', 'AREA_KM2', col_cultivo))
+
+        def candidates():
+            for feature in layer.getFeatures():
+                nom_dpto = feature.attribute(dpto_idx)
+                nom_mun = feature.attribute(mun_idx)
+                area_km2 = feature.attribute(area_idx)
+                nivel_produccion = feature.attribute(level_idx)
+
+                # Solo incluir si tiene datos válidos y cumple con el rango de área
+                if (nom_dpto and nom_mun and area_km2 and nivel_produccion and
+                        area_min <= float(area_km2) <= area_max):
+                    yield nom_dpto, nom_mun, float(area_km2), nivel_produccion
+
+        # Montículo acotado a top_count: memoria constante, mismo orden estable que sort()
+        return ZoneResults.from_rows(heapq.nlargest(top_count, candidates(), key=lambda row: row[2]))
@@ -0,0 +1,69 @@
+"""
+Execution report of a crop zone query.
+
+CropQueryEngine records, for the last query it ran, which path answered it
+(attribute snapshot, SQL pushdown to the GeoPackage or a full getFeatures()
+scan), the SQLite query plan when SQL was used, how many zones were
+examined and matched, and the time spent in each stage. The controller adds
+its own stages (spatial filter, selection, rendering) and shows a one-line
+summary in the dialog and the full report in the QGIS message log.
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+PATH_SNAPSHOT = 'snapshot'
+PATH_PUSHDOWN = 'pushdown'
+PATH_SCAN = 'scan'
+
+# Nombre de cada ruta de ejecución tal como se muestra al usuario
+PATH_LABELS = {
+    PATH_SNAPSHOT: 'índice en caché',
+    PATH_PUSHDOWN: 'SQL en GeoPackage',
+    PATH_SCAN: 'recorrido completo',
+}
+
+
+class QueryExplain:
+    """How a query was executed and where its time went"""
+
+    def __init__(self, query: str):
+        self.query = query
+        self.path: Optional[str] = None
+        self.plan: List[str] = []
+        self.examined: Optional[int] = None
+        self.matched: Optional[int] = None
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Add the time spent inside the block to a stage"""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def total(self) -> float:
+        """Time of all the stages, in seconds"""
+        return sum(self.stages.values())
+
+    def summary(self) -> str:
+        """One-line report for the status bar of the dialog"""
+        path = PATH_LABELS.get(self.path, self.path or '?')
+        matched = '?' if self.matched is None else self.matched
+        examined = '' if self.examined is None else f" de {self.examined}"
+        return f"{matched}{examined} zonas vía {path} en {self.total() * 1000:.0f} ms"
+
+    def details(self) -> str:
+        """Multi-line report for the message log"""
+        lines = [
+            f"Consulta: {self.query}",
+            f"Ruta: {PATH_LABELS.get(self.path, self.path or '?')}",
+            f"Zonas examinadas: {'n/d' if self.examined is None else self.examined}",
+            f"Zonas encontradas: {'n/d' if self.matched is None else self.matched}",
+        ]
+        lines.extend(f"Plan SQLite: {step}" for step in self.plan)
+        lines.extend(f"  {name}: {seconds * 1000:.1f} ms" for name, seconds in self.stages.items())
+        lines.append(f"Total: {self.total() * 1000:.1f} ms")
+        return '\n'.join(lines)
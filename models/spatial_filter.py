@@ -0,0 +1,56 @@
+"""
+Spatial restriction of the zone queries to a map region.
+
+Zones are first narrowed down with the bounding box index (GeoPackage
+R-tree or the in-memory extent index), then only those candidates are
+fetched and tested against the exact region geometry with a prepared
+geometry engine.
+"""
+from typing import List, Sequence
+
+import numpy as np
+from qgis.core import QgsFeatureRequest, QgsGeometry
+
+from models.id_spool import READ_CHUNK, IdSpool
+
+# Modos de filtro espacial de la consulta
+SPATIAL_MODE_NONE = 'none'
+SPATIAL_MODE_EXTENT = 'extent'
+SPATIAL_MODE_POLYGON = 'polygon'
+
+
+def intersecting_zones(engine, layer, ids: Sequence[int], region: QgsGeometry) -> List[int]:
+    """
+    Keep the zones whose geometry intersects a region
+
+    Args:
+        engine: CropQueryEngine providing the bounding box candidates
+        layer: 'Zonas de Cultivos' layer
+        ids: Zone ids found by the attribute filters (list or IdSpool)
+        region: Region geometry, in layer CRS
+
+    Returns:
+        Sorted list of the ids that intersect the region
+    """
+    if not ids or region is None or region.isEmpty():
+        return []
+    box = region.boundingBox()
+    candidates = engine.bbox_candidates(
+        layer, (box.xMinimum(), box.yMinimum(), box.xMaximum(), box.yMaximum()))
+    candidates = np.asarray(candidates, dtype=np.int64)
+    # Los resultados grandes (IdSpool) se cruzan por bloques sin cargarlos completos
+    chunks = ids.chunks(READ_CHUNK) if isinstance(ids, IdSpool) else [ids]
+    candidates = [fid for chunk in chunks
+                  for fid in np.intersect1d(np.asarray(chunk, dtype=np.int64), candidates).tolist()]
+    if not candidates:
+        return []
+
+    # Prueba exacta solo sobre los candidatos
+    region_engine = QgsGeometry.createGeometryEngine(region.constGet())
+    region_engine.prepareGeometry()
+    request = QgsFeatureRequest().setFilterFids(candidates).setNoAttributes()
+    matched = [
+        feature.id() for feature in layer.getFeatures(request)
+        if feature.hasGeometry() and region_engine.intersects(feature.geometry().constGet())
+    ]
+    return sorted(matched)
@@ -0,0 +1,260 @@
+"""
+Zone to department spatial join between Cultivos.gpkg and Occidente.gpkg.
+
+Each crop zone is assigned the department polygon that contains an
+interior point of the zone. The mapping is computed once from the
+GeoPackage geometries (no QGIS needed) and stored in the zones GeoPackage
+as the vc_zona_departamento table, so queries can filter by real spatial
+containment with an integer join instead of comparing NOM_DPTO strings.
+"""
+import sqlite3
+import struct
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models.departments import (
+    DEPARTMENT_JOIN_STATE_TABLE, DEPARTMENT_JOIN_TABLE, DEPARTMENT_TABLE, DepartmentCatalog, normalize_department
+)
+from models.gpkg_maintenance import connect_for_update
+from models.gpkg_reader import GeoPackageReader, quote_identifier
+
+# Tamaño del envelope del encabezado GeoPackage según su indicador
+_ENVELOPE_SIZES = {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}
+_WKB_POLYGON = 3
+_WKB_MULTIPOLYGON = 6
+POINT_CHUNK = 2048
+
+
+def parse_gpkg_polygons(blob) -> List[List[np.ndarray]]:
+    """
+    Polygons of a GeoPackage geometry blob
+
+    Returns:
+        List of polygons, each a list of rings as (n, 2) coordinate arrays
+        (exterior ring first). Empty for NULL, empty or non-polygonal geometries.
+    """
+    if not blob or blob[:2] != b'GP' or blob[3] & 0x10:
+        return []
+    envelope = _ENVELOPE_SIZES.get((blob[3] >> 1) & 0x07)
+    if envelope is None:
+        raise ValueError("Invalid GeoPackage envelope indicator")
+    polygons, _ = _read_wkb(bytes(blob), 8 + envelope)
+    return polygons
+
+
+def _read_wkb(buf: bytes, offset: int) -> Tuple[List[List[np.ndarray]], int]:
+    """Parse a (multi)polygon WKB geometry starting at offset"""
+    order = '<' if buf[offset] == 1 else '>'
+    geom_type, = struct.unpack_from(f'{order}I', buf, offset + 1)
+    offset += 5
+    # Dimensiones Z/M en ISO WKB (1000, 2000, 3000) o EWKB (banderas altas)
+    has_z = geom_type & 0x80000000 or (geom_type & 0xFFFF) // 1000 in (1, 3)
+    has_m = geom_type & 0x40000000 or (geom_type & 0xFFFF) // 1000 in (2, 3)
+    base = (geom_type & 0xFFFF) % 1000
+    ndims = 2 + bool(has_z) + bool(has_m)
+
+    if base == _WKB_POLYGON:
+        num_rings, = struct.unpack_from(f'{order}I', buf, offset)
+        offset += 4
+        rings = []
+        for _ in range(num_rings):
+            num_points, = struct.unpack_from(f'{order}I', buf, offset)
+            offset += 4
+            coords = np.frombuffer(buf, dtype=f'{order}f8', count=num_points * ndims, offset=offset)
+            rings.append(coords.reshape(num_points, ndims)[:, :2].astype(np.float64))
+            offset += num_points * ndims * 8
+        return ([rings] if rings else []), offset
+
+    if base == _WKB_MULTIPOLYGON:
+        num_polygons, = struct.unpack_from(f'{order}I', buf, offset)
+        offset += 4
+        polygons = []
+        for _ in range(num_polygons):
+            parsed, offset = _read_wkb(buf, offset)
+            polygons.extend(parsed)
+        return polygons, offset
+
+    return [], offset
+
+
+def _ring_area(ring: np.ndarray) -> float:
+    x, y = ring[:, 0], ring[:, 1]
+    return abs(float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))) / 2
+
+
+def interior_point(polygons: List[List[np.ndarray]]) -> Optional[Tuple[float, float]]:
+    """
+    A point guaranteed to lie inside the largest polygon
+
+    Scans the horizontal line through the middle of the polygon's bounding
+    box and returns the midpoint of the widest inside span.
+    """
+    if not polygons:
+        return None
+    rings = max(polygons, key=lambda polygon: _ring_area(polygon[0]))
+    ys = rings[0][:, 1]
+    y = (float(ys.min()) + float(ys.max())) / 2
+    crossings = []
+    for ring in rings:
+        x1, y1, x2, y2 = ring[:-1, 0], ring[:-1, 1], ring[1:, 0], ring[1:, 1]
+        cross = (y1 > y) != (y2 > y)
+        crossings.append(x1[cross] + (y - y1[cross]) * (x2[cross] - x1[cross]) / (y2[cross] - y1[cross]))
+    xs = np.sort(np.concatenate(crossings))
+    if len(xs) < 2:
+        return float(rings[0][0, 0]), float(rings[0][0, 1])
+    starts, ends = xs[0:-1:2], xs[1::2]
+    widest = int(np.argmax(ends - starts))
+    return (float(starts[widest] + ends[widest]) / 2, y)
+
+
+def points_in_polygon(xs: np.ndarray, ys: np.ndarray, rings: List[np.ndarray]) -> np.ndarray:
+    """
+    Even-odd point-in-polygon test of many points against one polygon
+
+    Returns:
+        Boolean array, True for the points inside the polygon (holes excluded)
+    """
+    inside = np.zeros(len(xs), dtype=bool)
+    for ring in rings:
+        x1, y1, x2, y2 = ring[:-1, 0], ring[:-1, 1], ring[1:, 0], ring[1:, 1]
+        dy = np.where(y2 == y1, np.inf, y2 - y1)
+        for start in range(0, len(xs), POINT_CHUNK):
+            px = xs[start:start + POINT_CHUNK, None]
+            py = ys[start:start + POINT_CHUNK, None]
+            cross = (y1 > py) != (y2 > py)
+            x_cross = x1 + (py - y1) * (x2 - x1) / dy
+            inside[start:start + POINT_CHUNK] ^= (np.count_nonzero(cross & (px < x_cross), axis=1) % 2).astype(bool)
+    return inside
+
+
+def _geometries(reader: GeoPackageReader, *columns: str):
+    """(fid, geometry blob, *columns) rows of a GeoPackage table"""
+    if not reader.geometry_column:
+        raise ValueError(f"Table '{reader.table}' has no geometry column")
+    selected = ', '.join(quote_identifier(col) for col in (reader.fid_column, reader.geometry_column) + columns)
+    return reader.connect().execute(f"SELECT {selected} FROM {quote_identifier(reader.table)}")
+
+
+def compute_zone_departments(zones: GeoPackageReader, departments: GeoPackageReader,
+                             name_column: str = 'NOM_DPTO') -> Dict[int, str]:
+    """
+    Department containing each zone
+
+    Returns:
+        Mapping of zone fid to the normalized name of the department polygon
+        containing the zone's interior point (zones outside every department
+        are left out)
+
+    Raises:
+        ValueError: If both layers do not share the same CRS (srs_id)
+    """
+    zones_srs, departments_srs = zones.srs_id(), departments.srs_id()
+    if zones_srs != departments_srs:
+        raise ValueError(f"CRS mismatch: '{zones.table}' uses srs_id {zones_srs}, "
+                         f"'{departments.table}' uses srs_id {departments_srs}")
+    fids, xs, ys = [], [], []
+    for fid, blob in _geometries(zones):
+        point = interior_point(parse_gpkg_polygons(blob))
+        if point is not None:
+            fids.append(fid)
+            xs.append(point[0])
+            ys.append(point[1])
+    fids = np.asarray(fids, dtype=np.int64)
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+
+    mapping = {}
+    assigned = np.zeros(len(fids), dtype=bool)
+    for _, blob, name in _geometries(departments, name_column):
+        name = normalize_department(name)
+        if not name:
+            continue
+        for rings in parse_gpkg_polygons(blob):
+            # Descarte rápido por caja envolvente antes de la prueba exacta
+            exterior = rings[0]
+            candidates = np.flatnonzero(
+                ~assigned &
+                (xs >= exterior[:, 0].min()) & (xs <= exterior[:, 0].max()) &
+                (ys >= exterior[:, 1].min()) & (ys <= exterior[:, 1].max())
+            )
+            if not len(candidates):
+                continue
+            inside = candidates[points_in_polygon(xs[candidates], ys[candidates], rings)]
+            assigned[inside] = True
+            for fid in fids[inside].tolist():
+                mapping[fid] = name
+    return mapping
+
+
+def build_department_join(path: str, departments_path: str, table: Optional[str] = None,
+                          departments_table: Optional[str] = None) -> Dict:
+    """
+    Store the zone to department spatial join in the zones GeoPackage
+
+    Writes the vc_zona_departamento (fid, dpto_id) table and adds the
+    departments found to the vc_departamentos catalog (ids already assigned
+    are kept). The zone count and maximum fid are recorded with it, so
+    queries stop using the join once zones are added or removed. Running it
+    again replaces the mapping.
+
+    Args:
+        path: Zones GeoPackage (Cultivos.gpkg)
+        departments_path: Department polygons GeoPackage (Occidente.gpkg)
+        table: Zones table (first one registered if None)
+        departments_table: Departments table (first one registered if None)
+
+    Returns:
+        Dict with 'success', 'matched', 'unmatched' and 'mismatched' (zones
+        whose NOM_DPTO disagrees with the containing polygon)
+    """
+    zones = GeoPackageReader(path, table)
+    departments = GeoPackageReader(departments_path, departments_table)
+    try:
+        mapping = compute_zone_departments(zones, departments)
+        table = zones.table
+        names = dict(zones.connect().execute(
+            f"SELECT {quote_identifier(zones.fid_column)}, NOM_DPTO FROM {quote_identifier(table)}"
+        ).fetchall()) if zones.has_columns('NOM_DPTO') else {}
+        total, max_fid = zones.zone_state()
+    except (sqlite3.Error, ValueError, struct.error) as e:
+        return {'success': False, 'message': str(e)}
+    finally:
+        zones.close()
+        departments.close()
+
+    try:
+        conn = connect_for_update(path)
+        try:
+            catalog = (DepartmentCatalog.from_connection(conn) or DepartmentCatalog({})).extended(mapping.values())
+            with conn:
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {DEPARTMENT_TABLE} "
+                             f"(id INTEGER PRIMARY KEY, nombre TEXT NOT NULL UNIQUE)")
+                conn.executemany(f"INSERT OR IGNORE INTO {DEPARTMENT_TABLE} (id, nombre) VALUES (?, ?)",
+                                 catalog.items())
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {DEPARTMENT_JOIN_TABLE} "
+                             f"(fid INTEGER PRIMARY KEY, dpto_id INTEGER NOT NULL)")
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{DEPARTMENT_JOIN_TABLE}_dpto_id "
+                             f"ON {DEPARTMENT_JOIN_TABLE} (dpto_id)")
+                conn.execute(f"DELETE FROM {DEPARTMENT_JOIN_TABLE}")
+                conn.executemany(f"INSERT INTO {DEPARTMENT_JOIN_TABLE} (fid, dpto_id) VALUES (?, ?)",
+                                 ((fid, catalog.id_for(name)) for fid, name in sorted(mapping.items())))
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {DEPARTMENT_JOIN_STATE_TABLE} "
+                             f"(zonas INTEGER NOT NULL, max_fid INTEGER)")
+                conn.execute(f"DELETE FROM {DEPARTMENT_JOIN_STATE_TABLE}")
+                conn.execute(f"INSERT INTO {DEPARTMENT_JOIN_STATE_TABLE} (zonas, max_fid) VALUES (?, ?)",
+                             (total, max_fid))
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        return {'success': False, 'message': str(e)}
+
+    mismatched = sorted(fid for fid, name in mapping.items()
+                        if fid in names and normalize_department(names[fid]) != name)
+    return {
+        'success': True,
+        'table': table,
+        'matched': len(mapping),
+        'unmatched': total - len(mapping),
+        'mismatched': mismatched,
+    }
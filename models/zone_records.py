@@ -0,0 +1,97 @@
+"""
+Compact result records of the TOP zones table.
+
+A dict with four string keys per zone, plus a second list of formatted
+rows, costs several hundred bytes per result. ZoneResults keeps each zone
+as a ZoneRecord with __slots__ holding small integer ids (department,
+municipality, production level) and the area; the names are interned once
+per result set. Strings such as the formatted area are only built when a
+row is rendered.
+"""
+from typing import Iterable, Iterator, List, Tuple
+
+
+class NameTable:
+    """Interns names as consecutive small integer ids"""
+
+    __slots__ = ('_ids', '_names')
+
+    def __init__(self):
+        self._ids = {}
+        self._names = []
+
+    def id_for(self, name: str) -> int:
+        """Id of a name, assigned on first use"""
+        name_id = self._ids.get(name)
+        if name_id is None:
+            name_id = self._ids[name] = len(self._names)
+            self._names.append(name)
+        return name_id
+
+    def name(self, name_id: int) -> str:
+        return self._names[name_id]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+class ZoneRecord:
+    """One zone of a TOP zones result"""
+
+    __slots__ = ('dept_id', 'mun_id', 'area', 'level')
+
+    def __init__(self, dept_id: int, mun_id: int, area: float, level: int):
+        self.dept_id = dept_id
+        self.mun_id = mun_id
+        self.area = area
+        self.level = level
+
+
+class ZoneResults:
+    """TOP zones result set, formatted only when rendered"""
+
+    def __init__(self):
+        self.departments = NameTable()
+        self.municipalities = NameTable()
+        self.levels = NameTable()
+        self.records: List[ZoneRecord] = []
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> 'ZoneResults':
+        """Build the results from (NOM_DPTO, NOM_MUN, AREA_KM2, level) rows"""
+        results = cls()
+        for row in rows:
+            results.add(*row)
+        return results
+
+    def add(self, nom_dpto, nom_mun, area_km2, nivel_produccion) -> None:
+        self.records.append(ZoneRecord(
+            self.departments.id_for(nom_dpto),
+            self.municipalities.id_for(nom_mun),
+            float(area_km2),
+            self.levels.id_for(str(nivel_produccion).strip()),
+        ))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[ZoneRecord]:
+        return iter(self.records)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ZoneResults):
+            return NotImplemented
+        return self.as_tuples() == other.as_tuples()
+
+    def values(self, record: ZoneRecord) -> Tuple[str, str, float, str]:
+        """(department, municipality, area, production level) of a record"""
+        return (self.departments.name(record.dept_id), self.municipalities.name(record.mun_id),
+                record.area, self.levels.name(record.level))
+
+    def as_tuples(self) -> List[Tuple[str, str, float, str]]:
+        return [self.values(record) for record in self.records]
+
+    def display_row(self, index: int) -> List[str]:
+        """Table cells of one result, formatted for display"""
+        departamento, municipio, area, produccion = self.values(self.records[index])
+        return [departamento, municipio, f"{area:.2f}", produccion]
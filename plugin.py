@@ -27,6 +27,8 @@ class VisualizacionCultivosPlugin:
         # Remove the plugin menu item and icon
         self.iface.removePluginMenu("Visualización de Cultivos", self.action)
         self.iface.removeToolBarIcon(self.action)
+        if self.controller:
+            self.controller.unload()
         
     def run(self):
         # Create and show the controller
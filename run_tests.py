@@ -6,6 +6,7 @@ This script provides an easy way to run tests locally with the same configuratio
 used in CI/CD. It supports different test types and coverage reporting.
 """
 import argparse
+import importlib.util
 import os
 import sys
 import subprocess
@@ -15,6 +16,8 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).parent.absolute()
 sys.path.insert(0, str(PROJECT_ROOT))
 
+from config import Config
+
 
 def setup_environment():
     """Setup environment variables for testing."""
@@ -47,12 +50,44 @@ def run_command(cmd, description):
         return False
 
 
-def run_tests(test_type='all', coverage=True, verbose=True, fast=False):
+def parallel_args(workers):
+    """
+    pytest-xdist arguments to shard the tests over several processes
+
+    Args:
+        workers: Number of worker processes, 'auto' (one per CPU) or
+            0/1 to run serially
+
+    Returns:
+        Extra pytest arguments (empty if running serially or if
+        pytest-xdist is not installed)
+    """
+    if workers is None or str(workers) in ('0', '1'):
+        return []
+    if importlib.util.find_spec('xdist') is None:
+        print("⚠️  pytest-xdist not installed, running tests serially (pip install pytest-xdist)")
+        return []
+    # loadfile: cada módulo va completo a un worker y sus fixtures de módulo se crean una vez
+    return ['-n', str(workers), '--dist', 'loadfile']
+
+
+def run_tests(test_type='all', coverage=True, verbose=True, fast=False, update_baseline=False, workers=None):
     """Run tests based on specified type."""
     setup_environment()
     
     base_cmd = ['python', '-m', 'pytest']
     
+    # Benchmarks: timings must not include coverage tracing nor share the CPU
+    if test_type == 'perf':
+        coverage = False
+        workers = None
+        os.environ['RUN_PERF_TESTS'] = '1'
+        if update_baseline:
+            os.environ['PERF_UPDATE_BASELINE'] = '1'
+    
+    # Shard across CPU cores (pytest-cov merges the coverage of every worker)
+    base_cmd.extend(parallel_args(workers))
+    
     # Add coverage if requested
     if coverage:
         base_cmd.extend(['--cov', '--cov-report=term-missing', '--cov-report=html'])
@@ -91,6 +126,11 @@ def run_tests(test_type='all', coverage=True, verbose=True, fast=False):
         test_files = ['tests/functional/']
         description = "Functional Tests"
         
+    elif test_type == 'perf':
+        # Throughput benchmarks against tests/perf/baseline.json
+        test_files = ['tests/perf/', '-m', 'perf', '-s']
+        description = "Performance Benchmarks"
+        
     elif test_type == 'all':
         # All tests
         test_files = [
@@ -171,18 +211,23 @@ Test Types:
   unit       - All unit tests (recommended: ~60s, 81% coverage)
   functional - Functional tests (slower: ~120s)
   all        - All available tests (comprehensive)
+  perf       - Throughput benchmarks vs. tests/perf/baseline.json (no coverage)
 
 Examples:
   python run_tests.py                    # Run all unit tests with coverage
   python run_tests.py --type core        # Quick core tests
   python run_tests.py --fast --no-cov    # Fast run without coverage
   python run_tests.py --clean             # Clean artifacts only
+  python run_tests.py --type perf         # Fail if a hot path got slower
+  python run_tests.py --type perf --update-baseline  # Record new baseline
+  python run_tests.py --workers 4         # Shard over 4 processes (pytest-xdist)
+  python run_tests.py --workers 0         # Run serially
         """
     )
     
     parser.add_argument(
         '--type', '-t',
-        choices=['core', 'unit', 'functional', 'all'],
+        choices=['core', 'unit', 'functional', 'all', 'perf'],
         default='unit',
         help='Type of tests to run (default: unit)'
     )
@@ -205,6 +250,19 @@ Examples:
         help='Quiet mode (less verbose output)'
     )
     
+    parser.add_argument(
+        '--workers', '-n',
+        default=None,
+        help="pytest-xdist workers: a number, 'auto' (one per CPU) or 0 for serial "
+             "(default: TEST_WORKERS, 'auto')"
+    )
+    
+    parser.add_argument(
+        '--update-baseline',
+        action='store_true',
+        help='With --type perf, store the measured throughput as the new baseline'
+    )
+    
     parser.add_argument(
         '--clean', '-c',
         action='store_true',
@@ -239,7 +297,9 @@ Examples:
         test_type=args.type,
         coverage=not args.no_coverage,
         verbose=not args.quiet,
-        fast=args.fast
+        fast=args.fast,
+        update_baseline=args.update_baseline,
+        workers=args.workers if args.workers is not None else Config.TEST_WORKERS
     )
     
     if success:
@@ -98,12 +98,8 @@ MOCKS_ENABLED = False
 MOCK_OBJECTS = {}
 
 if is_ci_environment() or not is_qgis_available():
-    print("[MOCK] Setting up QGIS/PyQt5 mocks for testing environment")
     MOCK_OBJECTS = setup_qgis_mocks()
     MOCKS_ENABLED = True
-    print("[MOCK] Mocks configured successfully")
-else:
-    print("[INFO] Using real QGIS/PyQt5 installation")
 
 
 def get_mock_qgis_layer():
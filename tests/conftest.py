@@ -5,6 +5,7 @@ This module sets up test fixtures and configurations that are shared
 across all test modules. It uses intelligent mocking for CI environments.
 """
 import os
+import shutil
 import sys
 import pytest
 from pathlib import Path
@@ -20,6 +21,9 @@ from tests import (
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+# Clase importada antes de que algún test recargue el módulo config: es la que usan los modelos
+from config import Config
+
 # Set test environment
 os.environ['ENVIRONMENT'] = 'test'
 
@@ -52,14 +56,15 @@ def pytest_configure(config):
     config.addinivalue_line(
         "markers", "requires_qgis: mark test as requiring real QGIS"
     )
-    
-    # Print environment info
-    print("\n" + "="*50)
-    print(f"🧪 Test Environment Setup")
-    print(f"CI Environment: {is_ci_environment()}")
-    print(f"QGIS Available: {is_qgis_available()}")
-    print(f"Mocks Enabled: {MOCKS_ENABLED}")
-    print("="*50)
+    config.addinivalue_line(
+        "markers", "perf: mark test as a performance benchmark (run_tests.py --type perf)"
+    )
+
+
+def pytest_report_header(config):
+    """One header line instead of a banner per process (xdist workers stay quiet)"""
+    return (f"visualizacion_de_cultivos: CI={is_ci_environment()}, "
+            f"QGIS={is_qgis_available()}, mocks={MOCKS_ENABLED}")
 
 
 def pytest_collection_modifyitems(config, items):
@@ -73,13 +78,18 @@ def pytest_collection_modifyitems(config, items):
 
 @pytest.fixture(scope='session')
 def qgis_app():
-    """Provide QGIS application for tests"""
+    """
+    Provide QGIS application for tests
+
+    Created once per session (once per worker under pytest-xdist) and shared
+    by every test that needs it.
+    """
     if MOCKS_ENABLED:
         # Return a mock QgsApplication
         app = MagicMock()
         app.initQgis.return_value = None
         app.exitQgis.return_value = None
-        return app
+        yield app
     else:
         try:
             from qgis.core import QgsApplication
@@ -136,6 +146,27 @@ def mock_config():
         yield mock_config
 
 
+@pytest.fixture
+def gpkg_path(tmp_path):
+    """Copy of Cultivos.gpkg so tests never touch the shipped data"""
+    path = tmp_path / 'Cultivos.gpkg'
+    shutil.copy(project_root / 'Cultivos.gpkg', path)
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def snapshot_cache(tmp_path, monkeypatch):
+    """
+    Keep persisted snapshots out of the project directory
+
+    Each test gets its own cache directory, so parallel workers never share
+    sidecar files.
+    """
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.setattr(Config, 'SNAPSHOT_CACHE_DIR', str(cache_dir))
+    return cache_dir
+
+
 @pytest.fixture
 def temp_gpkg_file(tmp_path):
     """Create a temporary GPKG file for testing"""
@@ -160,14 +191,14 @@ def setup_test_environment():
         os.environ.pop('ENVIRONMENT', None)
 
 
-@pytest.fixture
+@pytest.fixture(scope='session')
 def qt_application():
-    """Provide Qt application for GUI tests"""
+    """Provide Qt application for GUI tests, shared by the whole session"""
     if MOCKS_ENABLED:
         # Return mock QApplication
         app = MagicMock()
         app.exec_.return_value = 0
-        return app
+        yield app
     else:
         try:
             from PyQt5.QtWidgets import QApplication
@@ -185,7 +216,7 @@ def qt_application():
             # Fallback to mock
             app = MagicMock()
             app.exec_.return_value = 0
-            return app
+            yield app
 
 
 # Global test utilities
@@ -0,0 +1 @@
+# Synthetic test data package
@@ -0,0 +1,281 @@
+"""
+Deterministic synthetic GeoPackages shaped like the production data
+
+Writes a zones GeoPackage (zonas_de_cultivos, same columns as
+Cultivos.gpkg) and a matching departments GeoPackage (zona_occidental, like
+Occidente.gpkg). Both are valid GeoPackages: gpkg_contents, geometry
+columns, standard geometry blobs and an R-tree spatial index.
+
+The data imitates production rather than being uniform:
+- zones are irregular star-shaped polygons of 6 to 48 vertices, some of them
+  multipolygons, laid on a grid so they never overlap;
+- departments are strips of different widths, so a few departments hold
+  most zones, and every zone lies inside the department named in NOM_DPTO;
+- municipalities follow a Zipf-like distribution within each department;
+- production levels are skewed per crop (e.g. sugar cane is rarely 'Alto').
+
+The same seed and size always produce the same rows. Sizes from 1k to 5M
+zones are written in batches, so memory use stays flat.
+
+Usage:
+  python tests/fixtures/synthetic.py                  # 1000 zones into Config.TEST_*_GPKG_PATH
+  python tests/fixtures/synthetic.py --zones 5000000  # Production-sized stress fixture
+"""
+import argparse
+import math
+import random
+import sqlite3
+import struct
+import sys
+from pathlib import Path
+from typing import Iterator, List, Sequence, Tuple
+
+TABLE = 'zonas_de_cultivos'
+DEPARTMENTS_TABLE = 'zona_occidental'
+SRS_ID = 32616
+ORIGIN = (200000.0, 1480000.0)  # Esquina inferior izquierda de la malla (UTM 16N)
+CELL = 2000.0  # Lado de la celda de cada zona, en metros
+BATCH = 10000
+
+# Departamento -> peso relativo (franjas de distinto ancho: distribución sesgada)
+DEPARTMENT_WEIGHTS = {
+    'SANTA ANA': 0.30,
+    'SONSONATE': 0.22,
+    'AHUACHAPAN': 0.16,
+    'LA LIBERTAD': 0.14,
+    'SAN SALVADOR': 0.10,
+    'CHALATENANGO': 0.08,
+}
+DEPARTMENTS = list(DEPARTMENT_WEIGHTS)
+# Columna del cultivo -> frecuencia de cada nivel de producción (None = sin dato)
+CROP_LEVELS = {
+    'CUL_MAIZ': {'Alto': 0.20, 'Medio': 0.30, 'Bajo': 0.40, None: 0.10},
+    'CUL_FRIJOL': {'Alto': 0.10, 'Medio': 0.25, 'Bajo': 0.50, None: 0.15},
+    'CUL_CAÑA_DE_AZUCAR': {'Alto': 0.04, 'Medio': 0.11, 'Bajo': 0.25, None: 0.60},
+}
+CROP_COLUMNS = list(CROP_LEVELS)
+MUNICIPALITIES_PER_DEPARTMENT = 20
+VERTEX_COUNTS = [6, 8, 12, 16, 24, 32, 48]
+VERTEX_WEIGHTS = [10, 20, 25, 20, 12, 8, 5]
+MULTIPART_RATE = 0.1
+
+
+def gpkg_blob(polygons: Sequence[Sequence[Tuple[float, float]]]) -> bytes:
+    """
+    GeoPackage blob of a multipolygon (little endian, XY envelope)
+
+    Args:
+        polygons: Exterior rings, each a closed list of (x, y) points
+    """
+    xs = [x for ring in polygons for x, _ in ring]
+    ys = [y for ring in polygons for _, y in ring]
+    header = b'GP' + bytes([0, 0x03]) + struct.pack('<i4d', SRS_ID, min(xs), max(xs), min(ys), max(ys))
+    wkb = struct.pack('<BII', 1, 6, len(polygons))
+    for ring in polygons:
+        wkb += struct.pack('<BIII', 1, 3, 1, len(ring))
+        wkb += b''.join(struct.pack('<2d', x, y) for x, y in ring)
+    return header + wkb
+
+
+def ring_area(ring: Sequence[Tuple[float, float]]) -> float:
+    """Area of a closed ring (shoelace formula)"""
+    return abs(sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(ring, ring[1:]))) / 2
+
+
+def star_ring(rng: random.Random, cx: float, cy: float, radius: float) -> List[Tuple[float, float]]:
+    """Irregular star-shaped (hence simple) closed ring around a center"""
+    count = rng.choices(VERTEX_COUNTS, VERTEX_WEIGHTS)[0]
+    angles = sorted(rng.uniform(0, 2 * math.pi) for _ in range(count))
+    ring = [(round(cx + radius * rng.uniform(0.55, 1.0) * math.cos(a), 3),
+             round(cy + radius * rng.uniform(0.55, 1.0) * math.sin(a), 3)) for a in angles]
+    return ring + ring[:1]
+
+
+def department_strips(columns: int) -> List[Tuple[str, int, int]]:
+    """(name, first column, last column) of each department strip"""
+    strips = []
+    first = 0
+    total = sum(DEPARTMENT_WEIGHTS.values())
+    cumulative = 0.0
+    for i, name in enumerate(DEPARTMENTS):
+        cumulative += DEPARTMENT_WEIGHTS[name]
+        last = columns - 1 if i == len(DEPARTMENTS) - 1 else max(first, round(columns * cumulative / total) - 1)
+        strips.append((name, first, last))
+        first = last + 1
+    return [strip for strip in strips if strip[1] <= strip[2]]
+
+
+def grid_size(zones: int) -> Tuple[int, int]:
+    """Columns and rows of the zone grid"""
+    columns = max(len(DEPARTMENTS), math.ceil(math.sqrt(zones)))
+    return columns, math.ceil(zones / columns)
+
+
+def zone_rows(zones: int, seed: int) -> Iterator[tuple]:
+    """Rows (fid, blob, NOM_DPTO, NOM_MUN, PERIM_KM, AREA_KM2, *levels, bounds) of every zone"""
+    rng = random.Random(seed)
+    columns, _ = grid_size(zones)
+    department_of = {}
+    for name, first, last in department_strips(columns):
+        for column in range(first, last + 1):
+            department_of[column] = name
+    municipality_weights = [1 / (rank + 1) for rank in range(MUNICIPALITIES_PER_DEPARTMENT)]
+    level_choices = {column: (list(levels), list(levels.values())) for column, levels in CROP_LEVELS.items()}
+
+    for fid in range(1, zones + 1):
+        column, row = (fid - 1) % columns, (fid - 1) // columns
+        cx = ORIGIN[0] + (column + 0.5) * CELL
+        cy = ORIGIN[1] + (row + 0.5) * CELL
+        if rng.random() < MULTIPART_RATE:
+            polygons = [star_ring(rng, cx - 0.2 * CELL, cy, 0.25 * CELL),
+                        star_ring(rng, cx + 0.27 * CELL, cy, 0.18 * CELL)]
+        else:
+            polygons = [star_ring(rng, cx, cy, 0.45 * CELL)]
+
+        department = department_of[column]
+        municipality = rng.choices(range(1, MUNICIPALITIES_PER_DEPARTMENT + 1), municipality_weights)[0]
+        area = sum(ring_area(ring) for ring in polygons) / 1e6
+        perimeter = sum(math.dist(a, b) for ring in polygons for a, b in zip(ring, ring[1:])) / 1e3
+        levels = [rng.choices(*level_choices[column_name])[0] for column_name in CROP_COLUMNS]
+        xs = [x for ring in polygons for x, _ in ring]
+        ys = [y for ring in polygons for _, y in ring]
+        yield (fid, gpkg_blob(polygons), department, f"{department} {municipality:02d}",
+               round(perimeter, 4), round(area, 4), *levels, (min(xs), max(xs), min(ys), max(ys)))
+
+
+def _create_gpkg(conn: sqlite3.Connection) -> None:
+    """Core GeoPackage metadata tables"""
+    conn.execute("PRAGMA application_id = 1196444487")
+    conn.execute("PRAGMA user_version = 10200")
+    conn.execute("CREATE TABLE gpkg_spatial_ref_sys (srs_name TEXT NOT NULL, srs_id INTEGER PRIMARY KEY, "
+                 "organization TEXT NOT NULL, organization_coordsys_id INTEGER NOT NULL, "
+                 "definition TEXT NOT NULL, description TEXT)")
+    conn.executemany("INSERT INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, NULL)", [
+        ('Undefined cartesian SRS', -1, 'NONE', -1, 'undefined'),
+        ('Undefined geographic SRS', 0, 'NONE', 0, 'undefined'),
+        ('WGS 84 geodetic', 4326, 'EPSG', 4326, 'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,'
+                                                '298.257223563]],PRIMEM["Greenwich",0],UNIT["degree",0.0174532925199433]]'),
+        ('WGS 84 / UTM zone 16N', SRS_ID, 'EPSG', SRS_ID, 'undefined'),
+    ])
+    conn.execute("CREATE TABLE gpkg_contents (table_name TEXT NOT NULL PRIMARY KEY, data_type TEXT NOT NULL, "
+                 "identifier TEXT UNIQUE, description TEXT DEFAULT '', "
+                 "last_change DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')), "
+                 "min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE, srs_id INTEGER)")
+    conn.execute("CREATE TABLE gpkg_geometry_columns (table_name TEXT NOT NULL, column_name TEXT NOT NULL, "
+                 "geometry_type_name TEXT NOT NULL, srs_id INTEGER NOT NULL, z TINYINT NOT NULL, "
+                 "m TINYINT NOT NULL, CONSTRAINT pk_geom_cols PRIMARY KEY (table_name, column_name))")
+    conn.execute("CREATE TABLE gpkg_extensions (table_name TEXT, column_name TEXT, extension_name TEXT NOT NULL, "
+                 "definition TEXT NOT NULL, scope TEXT NOT NULL)")
+
+
+def _register_table(conn: sqlite3.Connection, table: str, bounds: Sequence[float]) -> None:
+    """Register a feature table, its geometry column and its R-tree"""
+    # Fecha fija: el archivo no depende del momento en que se genera
+    conn.execute("INSERT INTO gpkg_contents VALUES (?, 'features', ?, '', '2024-01-01T00:00:00.000Z', "
+                 "?, ?, ?, ?, ?)", (table, table, bounds[0], bounds[2], bounds[1], bounds[3], SRS_ID))
+    conn.execute("INSERT INTO gpkg_geometry_columns VALUES (?, 'geom', 'MULTIPOLYGON', ?, 0, 0)", (table, SRS_ID))
+    conn.execute("INSERT INTO gpkg_extensions VALUES (?, 'geom', 'gpkg_rtree_index', "
+                 "'http://www.geopackage.org/spec120/#extension_rtree', 'write-only')", (table,))
+
+
+def build_cultivos_gpkg(path, zones: int, seed: int = 42) -> str:
+    """
+    Write a synthetic zones GeoPackage
+
+    Args:
+        path: Output file (replaced if it exists)
+        zones: Number of zones
+        seed: Random seed; the same seed always produces the same data
+
+    Returns:
+        The path of the GeoPackage
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        path.unlink()
+    conn = sqlite3.connect(str(path))
+    try:
+        with conn:
+            _create_gpkg(conn)
+            crops = ', '.join(f'"{column}" TEXT(10)' for column in CROP_COLUMNS)
+            conn.execute(f'CREATE TABLE "{TABLE}" ("fid" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL, '
+                         f'"geom" MULTIPOLYGON, "NOM_DPTO" TEXT(254), "NOM_MUN" TEXT(254), '
+                         f'"PERIM_KM" REAL, "AREA_KM2" REAL, {crops})')
+            conn.execute(f'CREATE VIRTUAL TABLE "rtree_{TABLE}_geom" USING rtree(id, minx, maxx, miny, maxy)')
+
+            placeholders = ', '.join('?' * (6 + len(CROP_COLUMNS)))
+            extent = [math.inf, -math.inf, math.inf, -math.inf]
+            rows = zone_rows(zones, seed)
+            while True:
+                batch = [row for _, row in zip(range(BATCH), rows)]
+                if not batch:
+                    break
+                conn.executemany(f'INSERT INTO "{TABLE}" VALUES ({placeholders})', (row[:-1] for row in batch))
+                conn.executemany(f'INSERT INTO "rtree_{TABLE}_geom" VALUES (?, ?, ?, ?, ?)',
+                                 ((row[0], *row[-1]) for row in batch))
+                for row in batch:
+                    minx, maxx, miny, maxy = row[-1]
+                    extent = [min(extent[0], minx), max(extent[1], maxx), min(extent[2], miny), max(extent[3], maxy)]
+            _register_table(conn, TABLE, extent)
+    finally:
+        conn.close()
+    return str(path)
+
+
+def build_departments_gpkg(path, zones: int) -> str:
+    """
+    Write the department polygons matching a zones GeoPackage of the given size
+
+    Each department is the strip of grid columns its zones were placed in.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        path.unlink()
+    columns, rows = grid_size(zones)
+    top = ORIGIN[1] + rows * CELL
+    conn = sqlite3.connect(str(path))
+    try:
+        with conn:
+            _create_gpkg(conn)
+            conn.execute(f'CREATE TABLE "{DEPARTMENTS_TABLE}" ("fid" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL, '
+                         f'"geom" MULTIPOLYGON, "NOM_DPTO" TEXT(254), "COD_DPTO" TEXT(4))')
+            conn.execute(f'CREATE VIRTUAL TABLE "rtree_{DEPARTMENTS_TABLE}_geom" '
+                         f'USING rtree(id, minx, maxx, miny, maxy)')
+            for fid, (name, first, last) in enumerate(department_strips(columns), start=1):
+                left, right = ORIGIN[0] + first * CELL, ORIGIN[0] + (last + 1) * CELL
+                ring = [(left, ORIGIN[1]), (right, ORIGIN[1]), (right, top), (left, top), (left, ORIGIN[1])]
+                conn.execute(f'INSERT INTO "{DEPARTMENTS_TABLE}" VALUES (?, ?, ?, ?)',
+                             (fid, gpkg_blob([ring]), name, f"{fid:02d}"))
+                conn.execute(f'INSERT INTO "rtree_{DEPARTMENTS_TABLE}_geom" VALUES (?, ?, ?, ?, ?)',
+                             (fid, left, right, ORIGIN[1], top))
+            _register_table(conn, DEPARTMENTS_TABLE, (ORIGIN[0], ORIGIN[0] + columns * CELL, ORIGIN[1], top))
+    finally:
+        conn.close()
+    return str(path)
+
+
+def main():
+    """Write the test fixtures referenced by Config.TEST_CULTIVOS_GPKG_PATH and TEST_OCCIDENTE_GPKG_PATH"""
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Generate synthetic crop zone GeoPackages",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter, epilog=__doc__)
+    parser.add_argument('--zones', type=int, default=1000, help='Number of zones (default: 1000)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('--output', default=Config.TEST_CULTIVOS_GPKG_PATH, help='Zones GeoPackage')
+    parser.add_argument('--departments-output', default=Config.TEST_OCCIDENTE_GPKG_PATH,
+                        help='Departments GeoPackage')
+    args = parser.parse_args()
+
+    print(f"🔧 Writing {args.zones} zones to {args.output}...")
+    build_cultivos_gpkg(args.output, args.zones, args.seed)
+    build_departments_gpkg(args.departments_output, args.zones)
+    print(f"✅ Departments written to {args.departments_output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Performance benchmark harness
+
+Benchmarks only run through 'python run_tests.py --type perf' (which sets
+RUN_PERF_TESTS). Each one measures the throughput of a hot path, in zones
+processed per second, on a synthetic GeoPackage. Throughputs are compared
+as ratios to a fixed calibration loop timed in the same session, so a
+baseline recorded on one machine still applies on a faster or slower one;
+a benchmark fails when its ratio drops below the stored one by more than
+Config.PERF_TOLERANCE. With PERF_UPDATE_BASELINE set, the measured values
+replace the baseline instead.
+"""
+import json
+import os
+import platform
+import timeit
+import numpy as np
+import pytest
+from pathlib import Path
+from config import Config
+from tests.fixtures.synthetic import build_cultivos_gpkg
+
+BASELINE_PATH = Path(__file__).parent / 'baseline.json'
+REPEAT = 5
+
+if not os.getenv('RUN_PERF_TESTS'):
+    collect_ignore_glob = ['test_*.py']
+
+
+CALIBRATION_SIZE = 20000
+
+
+def _calibration_loop():
+    """Fixed mix of Python row handling and NumPy work, like the hot paths"""
+    values = np.arange(CALIBRATION_SIZE, dtype=np.int64)
+    rows = [(i, 'ALTO' if i % 3 else 'BAJO') for i in range(CALIBRATION_SIZE)]
+    counts = {}
+    for _, level in rows:
+        counts[level] = counts.get(level, 0) + 1
+    np.sort(values[::-1])
+    return counts
+
+
+def best_time(func) -> float:
+    """Best time of one call of func over REPEAT batches"""
+    # Como timeit.autorange: repetir las funciones rápidas hasta llenar un lote medible
+    timer = timeit.Timer(func)
+    loops, _ = timer.autorange()
+    return min(timer.repeat(repeat=REPEAT, number=loops)) / loops
+
+
+def host_info() -> dict:
+    """Machine description stored with the baseline (informative only)"""
+    return {
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'python': platform.python_version(),
+    }
+
+
+class Benchmark:
+    """Times hot paths and checks them against the baseline"""
+
+    def __init__(self, baseline: dict, tolerance: float, update: bool):
+        self.baseline = baseline
+        self.tolerance = tolerance
+        self.update = update
+        self.results = {}
+        # Operaciones de calibración por segundo en esta máquina y sesión
+        self.calibration = CALIBRATION_SIZE / best_time(_calibration_loop)
+
+    def run(self, name: str, func, zones: int) -> float:
+        """
+        Best throughput of func over REPEAT runs, in zones per second
+
+        Fails the test if its ratio to the calibration loop is below the
+        baseline ratio * (1 - tolerance).
+        """
+        func()  # Calentamiento: cachés, conexiones y snapshot
+        throughput = zones / max(best_time(func), 1e-9)
+        ratio = throughput / self.calibration
+        self.results[name] = (throughput, ratio)
+
+        expected = self.baseline.get('ratios', {}).get(name)
+        if not self.update and expected:
+            minimum = expected * (1 - self.tolerance)
+            assert ratio >= minimum, (
+                f"{name}: {ratio:.3f}x the calibration loop ({throughput:,.0f} zones/s) is below "
+                f"the baseline {expected:.3f}x (tolerance {self.tolerance:.0%})")
+        return throughput
+
+
+@pytest.fixture(scope='session')
+def perf_zones():
+    return Config.PERF_ZONES
+
+
+@pytest.fixture(scope='session')
+def synthetic_gpkg(tmp_path_factory, perf_zones):
+    """Synthetic zones GeoPackage shared by all the benchmarks"""
+    return build_cultivos_gpkg(tmp_path_factory.mktemp('perf') / 'Cultivos.gpkg', perf_zones)
+
+
+@pytest.fixture(scope='session')
+def benchmark(perf_zones):
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    update = bool(os.getenv('PERF_UPDATE_BASELINE'))
+    bench = Benchmark(baseline, Config.PERF_TOLERANCE, update)
+    yield bench
+
+    for name, (throughput, ratio) in sorted(bench.results.items()):
+        print(f"\n  {name:<24} {throughput:>14,.0f} zones/s {ratio:>10.3f}x calibration")
+    if update:
+        BASELINE_PATH.write_text(json.dumps({
+            'zones': perf_zones,
+            'host': host_info(),
+            'calibration': round(bench.calibration, 1),
+            'ratios': {name: round(ratio, 4) for name, (_, ratio) in sorted(bench.results.items())},
+        }, indent=2) + '\n')
@@ -0,0 +1,67 @@
+"""
+Throughput benchmarks of the query, table, statistics and export hot paths
+"""
+import pytest
+from unittest.mock import Mock
+from models.crop_model import CropModel
+from models.query_engine import CropQueryEngine
+from tests.fixtures.synthetic import DEPARTMENTS
+
+
+def make_layer(path):
+    layer = Mock()
+    layer.providerType.return_value = 'ogr'
+    layer.source.return_value = f'{path}|layername=zonas_de_cultivos'
+    layer.subsetString.return_value = ''
+    layer.isEditable.return_value = False
+    layer.id.return_value = 'zonas_perf'
+    return layer
+
+
+@pytest.fixture
+def engines(synthetic_gpkg, tmp_path):
+    pushdown = CropQueryEngine(use_fast_path=True, use_snapshot=False)
+    snapshot = CropQueryEngine(use_fast_path=True, use_snapshot=True, snapshot_dir=str(tmp_path))
+    yield pushdown, snapshot
+    pushdown.close()
+    snapshot.close()
+
+
+@pytest.mark.perf
+class TestBenchmarks:
+    """Hot path throughput compared to tests/perf/baseline.json"""
+
+    def test_query_pushdown(self, benchmark, engines, synthetic_gpkg, perf_zones):
+        layer = make_layer(synthetic_gpkg)
+        benchmark.run('query_pushdown', lambda: engines[0].find_zones(
+            layer, DEPARTMENTS[:2], 'CUL_MAIZ', 'Alto'), perf_zones)
+
+    def test_query_snapshot(self, benchmark, engines, synthetic_gpkg, perf_zones):
+        layer = make_layer(synthetic_gpkg)
+        benchmark.run('query_snapshot', lambda: engines[1].find_zones(
+            layer, DEPARTMENTS[:2], 'CUL_MAIZ', 'Alto'), perf_zones)
+
+    def test_table_top_zones(self, benchmark, engines, synthetic_gpkg, perf_zones):
+        layer = make_layer(synthetic_gpkg)
+        benchmark.run('table_top_zones', lambda: engines[0].top_zones(
+            layer, 'CUL_FRIJOL', 0, 700, 10), perf_zones)
+
+    def test_stats_level_counts(self, benchmark, engines, synthetic_gpkg, perf_zones):
+        layer = make_layer(synthetic_gpkg)
+
+        def counts():
+            for department in DEPARTMENTS:
+                engines[0].level_counts(layer, department, 'CUL_MAIZ')
+
+        benchmark.run('stats_level_counts', counts, perf_zones)
+
+    def test_stats_level_totals(self, benchmark, engines, synthetic_gpkg, perf_zones):
+        layer = make_layer(synthetic_gpkg)
+        benchmark.run('stats_level_totals', lambda: engines[1].level_totals(layer, 'CUL_MAIZ'), perf_zones)
+
+    def test_export(self, benchmark, synthetic_gpkg, perf_zones):
+        model = CropModel()
+        layer = make_layer(synthetic_gpkg)
+        if not model.export_data(layer, 'CSV', include_stats=False).get('success'):
+            pytest.skip("CropModel.export_data is not implemented yet; no export baseline")
+        benchmark.run('export_csv', lambda: model.export_data(layer, 'CSV', include_stats=False), perf_zones)
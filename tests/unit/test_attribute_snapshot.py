@@ -0,0 +1,103 @@
+"""
+Unit tests for the columnar attribute snapshot
+"""
+import shutil
+import pytest
+from pathlib import Path
+from models.attribute_snapshot import NULL_LEVEL, AttributeSnapshot, content_hash, encode_level
+from models.gpkg_reader import GeoPackageReader
+
+CULTIVOS_GPKG = Path(__file__).parent.parent.parent / 'Cultivos.gpkg'
+CROPS = ['CUL_MAIZ', 'CUL_FRIJOL', 'CUL_CAÑA_DE_AZUCAR']
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = tmp_path / 'Cultivos.gpkg'
+    shutil.copy(CULTIVOS_GPKG, path)
+    return AttributeSnapshot.from_reader(GeoPackageReader(str(path)), CROPS)
+
+
+class TestAttributeSnapshot:
+    """Test cases for AttributeSnapshot"""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('value,code', [
+        ('Alto', 2), ('MEDIO', 1), (' bajo ', 0), ('', NULL_LEVEL), (None, NULL_LEVEL), ('Alta', NULL_LEVEL),
+    ])
+    def test_encode_level(self, value, code):
+        assert encode_level(value) == code
+
+    @pytest.mark.unit
+    def test_snapshot_layout(self, snapshot):
+        assert len(snapshot) == 41
+        assert snapshot.levels.shape == (3, 41)
+        assert str(snapshot.levels.dtype) == 'uint8'
+        assert snapshot.fids.tolist() == list(range(1, 42))
+        # 3 crops encoded in 3 bytes per zone
+        assert snapshot.levels.nbytes == 3 * 41
+
+    @pytest.mark.unit
+    def test_find_zones(self, snapshot):
+        assert snapshot.find_zones(['Ahuachapán'], 'CUL_MAIZ', 'Alto') == [9, 12, 15, 21, 24]
+        assert snapshot.find_zones(['Morazán'], 'CUL_MAIZ', 'Alto') == []
+
+    @pytest.mark.unit
+    def test_find_zones_not_answerable(self, snapshot):
+        assert snapshot.find_zones(['Sonsonate'], 'CUL_PAPA', 'Alto') is None
+        assert snapshot.find_zones(['Sonsonate'], 'CUL_MAIZ', 'Muy alto') is None
+
+    @pytest.mark.unit
+    def test_level_counts(self, snapshot):
+        counts = snapshot.level_counts('Santa Ana', 'CUL_MAIZ')
+        assert counts == {'Alto': 5, 'Medio': 2, 'Bajo': 6}
+        assert snapshot.level_counts('Santa Ana', 'CUL_PAPA') is None
+
+    @pytest.mark.unit
+    def test_save_and_load_round_trip(self, snapshot, tmp_path):
+        import numpy as np
+        path = str(tmp_path / 'zonas.vcsnap')
+        snapshot.save(path, (1, 2, None, None))
+        loaded = AttributeSnapshot.load(path, (1, 2, None, None))
+
+        assert isinstance(loaded.fids, np.memmap)
+        for name in ('fids', 'areas', 'department_ids', 'levels'):
+            assert np.array_equal(getattr(loaded, name), getattr(snapshot, name))
+        assert loaded.crop_columns == snapshot.crop_columns
+        assert loaded.departments.items() == snapshot.departments.items()
+        assert loaded.find_zones(['Ahuachapán'], 'CUL_MAIZ', 'Alto') == [9, 12, 15, 21, 24]
+
+    @pytest.mark.unit
+    def test_load_rejects_stale_or_invalid_files(self, snapshot, tmp_path):
+        path = str(tmp_path / 'zonas.vcsnap')
+        assert AttributeSnapshot.load(path, (1, 2)) is None
+        snapshot.save(path, (1, 2))
+        assert AttributeSnapshot.load(path, (1, 3)) is None
+        with open(path, 'r+b') as f:
+            f.write(b'XXXXXXXX')
+        assert AttributeSnapshot.load(path, (1, 2)) is None
+
+    @pytest.mark.unit
+    def test_load_validates_content_hash(self, snapshot, tmp_path):
+        source = tmp_path / 'Cultivos.gpkg'
+        path = str(tmp_path / 'zonas.vcsnap')
+        snapshot.save(path, (1, 2), content_hash(str(source)))
+        # Sin validación por hash, un cambio de firma invalida el archivo
+        assert AttributeSnapshot.load(path, (5, 2), str(source)) is None
+        # Solo cambió la fecha de modificación: el hash sigue coincidiendo
+        assert AttributeSnapshot.load(path, (5, 2), str(source), validate_hash=True) is not None
+        source.write_bytes(b'otro contenido')
+        assert AttributeSnapshot.load(path, (6, 14), str(source), validate_hash=True) is None
+
+    @pytest.mark.unit
+    def test_load_records_new_signature_after_hash_match(self, snapshot, tmp_path, monkeypatch):
+        import models.attribute_snapshot as attribute_snapshot
+        source = tmp_path / 'Cultivos.gpkg'
+        path = str(tmp_path / 'zonas.vcsnap')
+        snapshot.save(path, (1, 2), content_hash(str(source)))
+        assert AttributeSnapshot.load(path, (1234567890.123456, 2), str(source), validate_hash=True) is not None
+
+        # La firma nueva quedó guardada: ya no se vuelve a calcular el hash
+        monkeypatch.setattr(attribute_snapshot, 'content_hash', lambda _: pytest.fail('hashed again'))
+        loaded = AttributeSnapshot.load(path, (1234567890.123456, 2), str(source), validate_hash=True)
+        assert loaded.find_zones(['Ahuachapán'], 'CUL_MAIZ', 'Alto') == [9, 12, 15, 21, 24]
@@ -452,4 +452,136 @@ class TestConfigListValues:
         # All items should be strings
         for version in cfg.PYTHON_VERSIONS:
             assert isinstance(version, str)
-            assert '.' in version  # Should be version format like "3.8" 
\ No newline at end of file
+            assert '.' in version  # Should be version format like "3.8" 
+
+
+class TestConfigLazySettings:
+    """Test cases for the lazily resolved, cached settings"""
+    
+    @pytest.fixture
+    def cfg(self, tmp_path, monkeypatch):
+        """Config with its own settings cache and .env file"""
+        cfg = config.Config
+        monkeypatch.setattr(cfg, '_settings', config._SettingsState(tmp_path / '.env'))
+        return cfg
+    
+    @pytest.mark.unit
+    def test_values_are_cached_until_reload(self, cfg, monkeypatch):
+        monkeypatch.setenv('CACHE_SIZE_MB', '128')
+        assert cfg.CACHE_SIZE_MB == 128
+        
+        monkeypatch.setenv('CACHE_SIZE_MB', '1024')
+        assert cfg.CACHE_SIZE_MB == 128
+        
+        cfg.reload()
+        assert cfg.CACHE_SIZE_MB == 1024
+    
+    @pytest.mark.unit
+    def test_values_are_typed(self, cfg, monkeypatch):
+        monkeypatch.setenv('PERF_TOLERANCE', '0.25')
+        monkeypatch.setenv('ENABLE_FEATURE_CACHING', 'off')
+        monkeypatch.setenv('PYTHON_VERSIONS', '3.10,3.12')
+        monkeypatch.setenv('LOG_LEVEL', 'debug')
+        
+        assert cfg.PERF_TOLERANCE == 0.25
+        assert cfg.ENABLE_FEATURE_CACHING is False
+        assert cfg.PYTHON_VERSIONS == ['3.10', '3.12']
+        assert cfg.LOG_LEVEL == 'DEBUG'
+    
+    @pytest.mark.unit
+    def test_configure_overrides_survive_reload(self, cfg, monkeypatch):
+        monkeypatch.setenv('MAX_FEATURES_IN_MEMORY', '500')
+        cfg.configure(MAX_FEATURES_IN_MEMORY=20)
+        cfg.reload()
+        assert cfg.MAX_FEATURES_IN_MEMORY == 20
+        
+        cfg.configure(MAX_FEATURES_IN_MEMORY=None)
+        assert cfg.MAX_FEATURES_IN_MEMORY == 500
+        
+        with pytest.raises(AttributeError):
+            cfg.configure(NOT_A_SETTING=1)
+    
+    @pytest.mark.unit
+    def test_patching_restores_the_setting(self, cfg):
+        with patch.object(cfg, 'ENVIRONMENT', 'production'):
+            assert cfg.is_production() is True
+        
+        assert isinstance(cfg.__dict__['ENVIRONMENT'], config.Setting)
+        assert 'ENVIRONMENT' in cfg.settings()
+    
+    @pytest.mark.unit
+    def test_hot_reload_of_env_file(self, cfg, tmp_path, monkeypatch):
+        pytest.importorskip('dotenv')
+        monkeypatch.delenv('CACHE_SIZE_MB', raising=False)
+        monkeypatch.setenv('ENABLE_HOT_RELOAD', 'true')
+        env_file = tmp_path / '.env'
+        env_file.write_text('CACHE_SIZE_MB=64\n')
+        assert cfg.CACHE_SIZE_MB == 64
+        
+        env_file.write_text('CACHE_SIZE_MB=96\n')
+        os.utime(env_file, (0, 0))
+        cfg._settings.next_check = 0.0
+        assert cfg.CACHE_SIZE_MB == 96
+        
+        # Las variables del proceso tienen prioridad sobre el archivo
+        monkeypatch.setenv('CACHE_SIZE_MB', '32')
+        cfg.reload()
+        assert cfg.CACHE_SIZE_MB == 32
+
+
+class TestPerformanceProfiles:
+    """Test cases for the performance profiles"""
+    
+    @pytest.fixture
+    def cfg(self, tmp_path, monkeypatch):
+        """Config with its own settings cache and no profile variables set"""
+        cfg = config.Config
+        monkeypatch.setattr(cfg, '_settings', config._SettingsState(tmp_path / '.env'))
+        for name in ['PERFORMANCE_PROFILE', *config.PERFORMANCE_PROFILES[config.DEFAULT_PROFILE]]:
+            monkeypatch.delenv(name, raising=False)
+        return cfg
+    
+    @pytest.mark.unit
+    def test_every_profile_defines_the_same_settings(self):
+        names = [set(values) for values in config.PERFORMANCE_PROFILES.values()]
+        assert all(profile_names == names[0] for profile_names in names)
+        assert all(isinstance(config.Config.__dict__[name], config.ProfileSetting) for name in names[0])
+    
+    @pytest.mark.unit
+    def test_profile_from_environment(self, cfg, monkeypatch):
+        assert cfg.PERFORMANCE_PROFILE == 'balanced'
+        assert cfg.MAX_FEATURES_IN_MEMORY == 10000
+        
+        monkeypatch.setenv('PERFORMANCE_PROFILE', ' Low_Memory ')
+        cfg.reload()
+        assert cfg.PERFORMANCE_PROFILE == 'low_memory'
+        assert cfg.CACHE_SIZE_MB == 32
+        assert cfg.SCAN_WORKERS == 1
+        
+        monkeypatch.setenv('PERFORMANCE_PROFILE', 'turbo')
+        cfg.reload()
+        assert cfg.PERFORMANCE_PROFILE == 'balanced'
+    
+    @pytest.mark.unit
+    def test_set_profile_keeps_explicit_settings(self, cfg, monkeypatch):
+        monkeypatch.setenv('CACHE_SIZE_MB', '100')
+        cfg.set_profile('max_throughput')
+        
+        assert cfg.SNAPSHOT_MEMORY_MAP is False
+        assert cfg.MAX_FEATURES_IN_MEMORY == 1000000
+        assert cfg.CACHE_SIZE_MB == 100
+        assert cfg.profile_settings()['CACHE_SIZE_MB'] == 100
+        
+        with pytest.raises(ValueError):
+            cfg.set_profile('turbo')
+        assert cfg.PERFORMANCE_PROFILE == 'max_throughput'
+    
+    @pytest.mark.unit
+    @patch('builtins.print')
+    def test_print_config_shows_profile(self, mock_print, cfg):
+        cfg.set_profile('low_memory')
+        cfg.print_config()
+        
+        printed_text = ' '.join([str(call[0][0]) for call in mock_print.call_args_list])
+        assert 'Performance Profile: low_memory' in printed_text
+        assert 'MAX_FEATURES_IN_MEMORY: 2000' in printed_text
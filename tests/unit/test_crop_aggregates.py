@@ -0,0 +1,93 @@
+"""
+Unit tests for the session cache of per-crop totals
+"""
+import pytest
+from unittest.mock import Mock
+from config import Config
+from models.crop_aggregates import CropAggregateService
+
+TOTALS = {'Alto': (2, 10.0), 'Medio': (1, 4.0), 'Bajo': (0, 0.0)}
+
+
+@pytest.fixture
+def engine():
+    engine = Mock()
+    engine.level_totals.return_value = TOTALS
+    return engine
+
+
+class TestCropAggregateService:
+    """Test cases for CropAggregateService"""
+
+    @pytest.mark.unit
+    def test_totals_are_cached_per_crop(self, engine):
+        engine.source_key.return_value = (('Cultivos.gpkg', None), (1, 100, None, None))
+        service = CropAggregateService(engine)
+        layer = Mock()
+
+        assert service.totals(layer, 'CUL_MAIZ') == TOTALS
+        service.totals(layer, 'CUL_MAIZ')
+        service.totals(layer, 'CUL_FRIJOL')
+
+        assert engine.level_totals.call_count == 2
+        layer.dataChanged.connect.assert_not_called()
+
+    @pytest.mark.unit
+    def test_signature_change_recomputes(self, engine):
+        engine.source_key.return_value = (('Cultivos.gpkg', None), (1, 100, None, None))
+        service = CropAggregateService(engine)
+        service.totals(Mock(), 'CUL_MAIZ')
+
+        engine.source_key.return_value = (('Cultivos.gpkg', None), (2, 120, None, None))
+        service.totals(Mock(), 'CUL_MAIZ')
+
+        assert engine.level_totals.call_count == 2
+
+    @pytest.mark.unit
+    def test_data_changed_invalidates_other_layers(self, engine):
+        engine.source_key.return_value = ('layer_id', None)
+        service = CropAggregateService(engine)
+        layer = Mock()
+
+        service.totals(layer, 'CUL_MAIZ')
+        service.totals(layer, 'CUL_MAIZ')
+        assert engine.level_totals.call_count == 1
+
+        slot = layer.dataChanged.connect.call_args.args[0]
+        slot()
+        service.totals(layer, 'CUL_MAIZ')
+        assert engine.level_totals.call_count == 2
+        layer.dataChanged.connect.assert_called_once()
+
+    @pytest.mark.unit
+    def test_least_recently_used_totals_are_dropped(self, engine, monkeypatch):
+        monkeypatch.setattr(Config, 'RESULT_CACHE_ENTRIES', 2)
+        engine.source_key.return_value = (('Cultivos.gpkg', None), (1, 100, None, None))
+        service = CropAggregateService(engine)
+        layer = Mock()
+
+        service.totals(layer, 'CUL_MAIZ')
+        service.totals(layer, 'CUL_FRIJOL')
+        service.totals(layer, 'CUL_MAIZ')
+        service.totals(layer, 'CUL_ARROZ')
+        assert engine.level_totals.call_count == 3
+
+        service.totals(layer, 'CUL_MAIZ')
+        service.totals(layer, 'CUL_FRIJOL')
+        assert engine.level_totals.call_count == 4
+
+        # Un límite menor (p. ej. al cambiar de perfil) se aplica en la siguiente consulta
+        monkeypatch.setattr(Config, 'RESULT_CACHE_ENTRIES', 1)
+        service.totals(layer, 'CUL_FRIJOL')
+        assert list(service._totals) == [(('Cultivos.gpkg', None), 'CUL_FRIJOL')]
+
+    @pytest.mark.unit
+    def test_nothing_cached_without_feature_caching(self, engine, monkeypatch):
+        monkeypatch.setattr(Config, 'ENABLE_FEATURE_CACHING', False)
+        service = CropAggregateService(engine)
+
+        service.totals(Mock(), 'CUL_MAIZ')
+        service.totals(Mock(), 'CUL_MAIZ')
+
+        assert engine.level_totals.call_count == 2
+        engine.source_key.assert_not_called()
@@ -236,4 +236,31 @@ class TestCropController:
         assert controller.validate_selection('', 'AHUACHAPAN', 'Zona_Occidental') == False
         
         # Valid selection with only crop
-        assert controller.validate_selection('Maíz', '', '') == True 
\ No newline at end of file
+        assert controller.validate_selection('Maíz', '', '') == True 
+
+
+class TestHandleQuerySpatialMode:
+    """Test cases for the spatial mode checks of handle_query"""
+
+    @pytest.mark.unit
+    def test_missing_polygon_is_reported_before_querying(self):
+        from controllers.crop_controller import CropController
+        from models.spatial_filter import SPATIAL_MODE_POLYGON
+
+        layer = Mock()
+        layer.name.return_value = "Zonas de Cultivos"
+        controller = CropController.__new__(CropController)
+        controller.iface = Mock()
+        controller.engine = Mock()
+        controller.engine.crop_column.return_value = 'CUL_MAIZ'
+        controller.view = Mock()
+        controller.view.get_selected_departments.return_value = ['Ahuachapán']
+        controller.view.get_spatial_mode.return_value = SPATIAL_MODE_POLYGON
+        controller.drawn_region = None
+
+        with patch('controllers.crop_controller.QgsProject') as project:
+            project.instance.return_value.mapLayers.return_value = {'zonas': layer}
+            controller.handle_query()
+
+        controller.view.show_error.assert_called_once_with("Dibuje un polígono en el mapa antes de consultar.")
+        controller.engine.find_zones.assert_not_called()
@@ -0,0 +1,107 @@
+"""
+Unit tests for the crop zones schema descriptor
+"""
+import pytest
+from unittest.mock import Mock
+from models.crop_schema import CROP_NAMES, CropSchema, crop_column, crop_display_name
+from models.query_engine import CropQueryEngine
+
+
+def make_layer(names, unique_values=None):
+    layer = Mock()
+    layer.fields.return_value.names.return_value = names
+    layer.uniqueValues.side_effect = lambda index: (unique_values or {}).get(names[index], set())
+    layer.id.return_value = 'zonas'
+    return layer
+
+
+class TestCropSchema:
+    """Test cases for CropSchema"""
+
+    @pytest.mark.unit
+    def test_crop_column(self):
+        assert crop_column('Caña de azúcar') == 'CUL_CAÑA_DE_AZUCAR'
+        assert crop_column('Arroz') is None
+        assert CROP_NAMES[0] == 'Maíz'
+
+    @pytest.mark.unit
+    def test_indexes_from_fields(self):
+        schema = CropSchema.from_layer(make_layer(['fid', 'NOM_DPTO', 'CUL_MAIZ', 'CUL_CAFE']))
+
+        assert schema.index_of('CUL_CAFE') == 3
+        assert schema.has('NOM_DPTO', 'CUL_MAIZ')
+        assert not schema.has('CUL_PAPA')
+        assert schema.index_of('CUL_PAPA') == -1
+
+    @pytest.mark.unit
+    def test_version_follows_fields(self):
+        assert CropSchema(['a', 'b']).version == CropSchema(['a', 'b']).version
+        assert CropSchema(['a', 'b']).version != CropSchema(['a', 'b', 'c']).version
+
+    @pytest.mark.unit
+    def test_validate_reports_unknown_levels(self):
+        layer = make_layer(['fid', 'CUL_MAIZ', 'CUL_CAFE'], {
+            'CUL_MAIZ': {'Alto', 'Medio', 'Bajo', None},
+            'CUL_CAFE': {'Alto', 'Muy alto'},
+        })
+        crops, problems = CropSchema.from_layer(layer).validate(layer)
+
+        assert crops == {'Maíz': 'CUL_MAIZ', 'Café': 'CUL_CAFE'}
+        assert problems == {'CUL_CAFE': ['Muy alto']}
+
+    @pytest.mark.unit
+    def test_crop_columns_include_new_fields(self):
+        schema = CropSchema(['fid', 'CUL_ARROZ', 'CUL_MAIZ', 'CUL_CAÑA_DE_AZUCAR', 'CUL_SORGO_DULCE'])
+
+        assert schema.crop_columns() == {
+            'Maíz': 'CUL_MAIZ',
+            'Caña de azúcar': 'CUL_CAÑA_DE_AZUCAR',
+            'Arroz': 'CUL_ARROZ',
+            'Sorgo dulce': 'CUL_SORGO_DULCE',
+        }
+        assert crop_display_name('CUL_FRIJOL') == 'Frijol'
+
+
+class TestCropDiscovery:
+    """Test cases for the crop discovery of CropQueryEngine"""
+
+    @pytest.mark.unit
+    def test_discovers_populated_crop_columns(self):
+        layer = make_layer(['fid', 'CUL_MAIZ', 'CUL_ARROZ', 'CUL_CAFE'], {
+            'CUL_MAIZ': {'Alto', 'Bajo'},
+            'CUL_ARROZ': {'Medio', None},
+            'CUL_CAFE': {None, ''},
+        })
+        engine = CropQueryEngine(use_fast_path=False)
+
+        assert engine.discover_crops(layer) == {'Maíz': 'CUL_MAIZ', 'Arroz': 'CUL_ARROZ'}
+        assert engine.crop_column(layer, 'Arroz') == 'CUL_ARROZ'
+        assert engine.crop_column(layer, 'Sorgo') is None
+        assert engine.crop_column(None, 'Frijol') == 'CUL_FRIJOL'
+
+    @pytest.mark.unit
+    def test_reports_unexpected_levels(self):
+        layer = make_layer(['fid', 'CUL_MAIZ', 'CUL_ARROZ'], {
+            'CUL_MAIZ': {'Alto', 'Muy alto'},
+            'CUL_ARROZ': {'?'},
+        })
+        engine = CropQueryEngine(use_fast_path=False)
+
+        assert engine.unexpected_levels(layer) == {'CUL_MAIZ': ['Muy alto'], 'CUL_ARROZ': ['?']}
+        assert engine.discover_crops(layer) == {'Maíz': 'CUL_MAIZ'}
+        assert layer.uniqueValues.call_count == 2
+
+    @pytest.mark.unit
+    def test_discovery_cached_per_schema_version(self):
+        names = ['fid', 'CUL_MAIZ']
+        values = {'CUL_MAIZ': {'Alto'}, 'CUL_ARROZ': {'Bajo'}}
+        layer = make_layer(names, values)
+        engine = CropQueryEngine(use_fast_path=False)
+
+        engine.discover_crops(layer)
+        engine.discover_crops(layer)
+        assert layer.uniqueValues.call_count == 1
+
+        names.append('CUL_ARROZ')
+        assert list(engine.discover_crops(layer)) == ['Maíz', 'Arroz']
+        assert layer.uniqueValues.call_count == 3
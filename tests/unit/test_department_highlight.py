@@ -0,0 +1,94 @@
+"""
+Unit tests for the rubber band department highlight
+"""
+import pytest
+from unittest.mock import Mock, patch
+from controllers.department_highlight import DepartmentHighlighter
+
+
+def make_layer(layer_id, feature_count=3):
+    layer = Mock()
+    layer.id.return_value = layer_id
+    features = []
+    for _ in range(feature_count):
+        feature = Mock()
+        feature.hasGeometry.return_value = True
+        features.append(feature)
+    layer.getFeatures.return_value = features
+    return layer
+
+
+class TestDepartmentHighlighter:
+    """Test cases for DepartmentHighlighter"""
+
+    @pytest.fixture
+    def bands(self):
+        with patch('controllers.department_highlight.QgsRubberBand', side_effect=lambda *args: Mock()) as band_cls:
+            yield band_cls
+
+    @pytest.mark.unit
+    def test_highlight_does_not_select_features(self, bands):
+        layer = make_layer('ahuachapan')
+        highlighter = DepartmentHighlighter(Mock())
+
+        assert highlighter.highlight([layer]) == 1
+
+        layer.selectAll.assert_not_called()
+        band = highlighter._bands['ahuachapan']
+        band.setToGeometry.assert_called_once()
+        band.show.assert_called_once()
+
+    @pytest.mark.unit
+    def test_outline_and_band_are_cached(self, bands):
+        ahuachapan = make_layer('ahuachapan')
+        sonsonate = make_layer('sonsonate')
+        highlighter = DepartmentHighlighter(Mock())
+
+        highlighter.highlight([ahuachapan])
+        highlighter.highlight([sonsonate])
+        highlighter.highlight([ahuachapan])
+
+        assert bands.call_count == 2
+        assert ahuachapan.getFeatures.call_count == 1
+        assert highlighter._bands['sonsonate'].hide.called
+        assert highlighter._bands['ahuachapan'].show.call_count == 2
+
+    @pytest.mark.unit
+    def test_invalidate_rebuilds_outline(self, bands):
+        layer = make_layer('ahuachapan')
+        iface = Mock()
+        highlighter = DepartmentHighlighter(iface)
+
+        highlighter.highlight([layer])
+        band = highlighter._bands['ahuachapan']
+        highlighter.invalidate('ahuachapan')
+        iface.mapCanvas.return_value.scene.return_value.removeItem.assert_called_once_with(band)
+
+        highlighter.highlight([layer])
+        assert layer.getFeatures.call_count == 2
+        layer.dataChanged.connect.assert_called_once()
+
+    @pytest.mark.unit
+    def test_fill_is_translucent(self, bands):
+        iface = Mock()
+        highlighter = DepartmentHighlighter(iface)
+
+        fill, stroke = Mock(), Mock()
+        iface.mapCanvas.return_value.selectionColor.side_effect = [fill, stroke]
+
+        highlighter.highlight([make_layer('ahuachapan')])
+
+        band = highlighter._bands['ahuachapan']
+        fill.setAlpha.assert_called_once_with(60)
+        stroke.setAlpha.assert_not_called()
+        band.setFillColor.assert_called_once_with(fill)
+        band.setStrokeColor.assert_called_once_with(stroke)
+
+    @pytest.mark.unit
+    def test_clear_hides_all_bands(self, bands):
+        highlighter = DepartmentHighlighter(Mock())
+        highlighter.highlight([make_layer('a'), make_layer('b')])
+
+        highlighter.clear()
+
+        assert all(band.hide.called for band in highlighter._bands.values())
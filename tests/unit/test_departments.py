@@ -0,0 +1,38 @@
+"""
+Unit tests for the department name helpers
+"""
+import pytest
+from models.departments import DepartmentCatalog, normalize_department
+
+
+class TestDepartments:
+    """Test cases for department normalization and the id catalog"""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('raw,expected', [
+        ('Ahuachapán', 'AHUACHAPAN'),
+        ('SANTA ANA', 'SANTA ANA'),
+        ('Santa Ana', 'SANTA ANA'),
+        ('sonsonate', 'SONSONATE'),
+        ('', ''),
+        (None, ''),
+    ])
+    def test_normalize_department(self, raw, expected):
+        assert normalize_department(raw) == expected
+
+    @pytest.mark.unit
+    def test_catalog_from_values(self):
+        catalog = DepartmentCatalog.from_values(['SONSONATE', 'Ahuachapán', 'SANTA ANA', 'AHUACHAPAN', None])
+        assert catalog.items() == [(1, 'AHUACHAPAN'), (2, 'SANTA ANA'), (3, 'SONSONATE')]
+        assert catalog.id_for('Ahuachapán') == 1
+        assert catalog.name_for(3) == 'SONSONATE'
+        assert catalog.ids_for(['Sonsonate', 'Morazán', 'Santa Ana']) == [2, 3]
+
+    @pytest.mark.unit
+    def test_catalog_extended_keeps_ids(self):
+        catalog = DepartmentCatalog.from_values(['SONSONATE', 'SANTA ANA'])
+        extended = catalog.extended(['AHUACHAPAN', 'SONSONATE'])
+        assert extended.id_for('SANTA ANA') == catalog.id_for('SANTA ANA') == 1
+        assert extended.id_for('SONSONATE') == 2
+        assert extended.id_for('AHUACHAPAN') == 3
+        assert len(extended) == 3
@@ -0,0 +1,91 @@
+"""
+Unit tests for the per-feature bounding box index
+"""
+import shutil
+import pytest
+from pathlib import Path
+from unittest.mock import Mock
+from models.feature_extents import FeatureExtentIndex
+from models.gpkg_reader import GeoPackageReader
+
+CULTIVOS_GPKG = Path(__file__).parent.parent.parent / 'Cultivos.gpkg'
+
+
+@pytest.fixture
+def reader(tmp_path):
+    path = tmp_path / 'Cultivos.gpkg'
+    shutil.copy(CULTIVOS_GPKG, path)
+    reader = GeoPackageReader(str(path))
+    yield reader
+    reader.close()
+
+
+class TestFeatureExtentIndex:
+    """Test cases for FeatureExtentIndex"""
+
+    @pytest.mark.unit
+    def test_union_extent(self):
+        index = FeatureExtentIndex.from_rows([
+            (3, 4.0, 5.0, 4.0, 6.0),
+            (1, 0.0, 1.0, 0.0, 2.0),
+            (2, 2.0, 3.0, -1.0, 1.0),
+        ])
+        assert index.union_extent([1, 3]) == (0.0, 0.0, 5.0, 6.0)
+        assert index.union_extent([2, 99]) == (2.0, -1.0, 3.0, 1.0)
+        assert index.union_extent([99]) is None
+        assert index.union_extent([]) is None
+
+    @pytest.mark.unit
+    def test_from_reader_uses_rtree(self, reader):
+        assert reader.geometry_column == 'geom'
+        assert reader.rtree_table() == 'rtree_zonas_de_cultivos_geom'
+
+        index = FeatureExtentIndex.from_reader(reader)
+        assert len(index) == len(reader.feature_bounds()) == 41
+        xmin, ymin, xmax, ymax = index.union_extent([9, 12, 15])
+        assert xmin < xmax and ymin < ymax
+
+    @pytest.mark.unit
+    def test_from_layer(self):
+        features = []
+        for fid, (xmin, xmax, ymin, ymax) in enumerate([(0, 1, 0, 1), (5, 6, 5, 7)], start=1):
+            box = Mock()
+            box.xMinimum.return_value, box.xMaximum.return_value = xmin, xmax
+            box.yMinimum.return_value, box.yMaximum.return_value = ymin, ymax
+            feature = Mock()
+            feature.id.return_value = fid
+            feature.hasGeometry.return_value = True
+            feature.geometry.return_value.boundingBox.return_value = box
+            features.append(feature)
+        layer = Mock()
+        layer.getFeatures.return_value = features
+
+        index = FeatureExtentIndex.from_layer(layer)
+        assert index.union_extent([1, 2]) == (0.0, 0.0, 6.0, 7.0)
+
+    @pytest.mark.unit
+    def test_rect_lookup_matches_rtree(self, reader):
+        index = FeatureExtentIndex.from_reader(reader)
+        xmin, ymin, xmax, ymax = index.union_extent([9, 12, 15])
+
+        from_rtree = reader.fids_in_rect(xmin, ymin, xmax, ymax)
+        assert from_rtree == index.ids_in_rect(xmin, ymin, xmax, ymax)
+        assert {9, 12, 15} <= set(from_rtree)
+        assert reader.fids_in_rect(1000, 1000, 1001, 1001) == []
+
+    @pytest.mark.unit
+    def test_rect_lookup_matches_linear_scan(self):
+        import numpy as np
+        rng = np.random.default_rng(7)
+        mins = rng.uniform(0, 1000, size=(2000, 2))
+        sizes = rng.uniform(0, 20, size=(2000, 2))
+        fids = rng.permutation(np.arange(1, 2001))
+        index = FeatureExtentIndex(fids, np.column_stack([mins[:, 0], mins[:, 0] + sizes[:, 0],
+                                                          mins[:, 1], mins[:, 1] + sizes[:, 1]]))
+
+        for xmin, ymin, xmax, ymax in [(100, 100, 300, 250), (0, 0, 1100, 1100), (-50, -50, -1, -1)]:
+            bounds = index.bounds
+            mask = ((bounds[:, 0] <= xmax) & (bounds[:, 1] >= xmin) &
+                    (bounds[:, 2] <= ymax) & (bounds[:, 3] >= ymin))
+            assert index.ids_in_rect(xmin, ymin, xmax, ymax) == index.fids[mask].tolist()
+        assert FeatureExtentIndex.from_rows([]).ids_in_rect(0, 0, 1, 1) == []
@@ -0,0 +1,134 @@
+"""
+Unit tests for the GeoPackage maintenance tasks
+"""
+import shutil
+import sqlite3
+import pytest
+from pathlib import Path
+from models.attribute_snapshot import department_source
+from models.gpkg_maintenance import (
+    connect_for_update, create_attribute_indexes, existing_indexes, has_attribute_indexes, materialize_department_columns,
+    plan_attribute_indexes
+)
+from models.gpkg_reader import GeoPackageReader
+
+CULTIVOS_GPKG = Path(__file__).parent.parent.parent / 'Cultivos.gpkg'
+
+
+@pytest.fixture
+def gpkg_path(tmp_path):
+    path = tmp_path / 'Cultivos.gpkg'
+    shutil.copy(CULTIVOS_GPKG, path)
+    return str(path)
+
+
+class TestGeoPackageMaintenance:
+    """Test cases for attribute index maintenance"""
+
+    @pytest.mark.unit
+    def test_plan_attribute_indexes(self):
+        plan = dict(plan_attribute_indexes('t', ['fid', 'NOM_DPTO', 'AREA_KM2', 'CUL_MAIZ', 'CUL_PAPA']))
+        assert plan['idx_vc_t_nom_dpto'] == ('NOM_DPTO',)
+        assert plan['idx_vc_t_area_km2'] == ('AREA_KM2',)
+        assert plan['idx_vc_t_cul_maiz'] == ('CUL_MAIZ', 'NOM_DPTO')
+        assert plan['idx_vc_t_cul_papa'] == ('CUL_PAPA', 'NOM_DPTO')
+
+    @pytest.mark.unit
+    def test_create_attribute_indexes(self, gpkg_path):
+        assert not has_attribute_indexes(gpkg_path)
+        result = create_attribute_indexes(gpkg_path)
+
+        assert result['success'] is True
+        assert len(result['created']) == 5
+        assert result['time_before'] > 0 and result['time_after'] > 0
+        assert result['speedup'] > 0
+        assert has_attribute_indexes(gpkg_path)
+
+        conn = sqlite3.connect(gpkg_path)
+        assert ('CUL_MAIZ', 'NOM_DPTO') in existing_indexes(conn, 'zonas_de_cultivos')
+        assert conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0] > 0
+        conn.close()
+
+    @pytest.mark.unit
+    def test_create_attribute_indexes_is_idempotent(self, gpkg_path):
+        create_attribute_indexes(gpkg_path, benchmark=False)
+        result = create_attribute_indexes(gpkg_path, benchmark=False)
+        assert result['created'] == []
+        assert len(result['skipped']) == 5
+        assert 'speedup' not in result
+
+    @pytest.mark.unit
+    def test_create_attribute_indexes_invalid_file(self, tmp_path):
+        path = tmp_path / 'empty.gpkg'
+        sqlite3.connect(path).close()
+        result = create_attribute_indexes(str(path))
+        assert result['success'] is False
+        assert 'message' in result
+
+    @pytest.mark.unit
+    def test_materialize_department_columns(self, gpkg_path):
+        result = materialize_department_columns(gpkg_path)
+        assert result['success'] is True
+        assert result['departments'] == {1: 'AHUACHAPAN', 2: 'SANTA ANA', 3: 'SONSONATE'}
+        assert result['updated'] == 41
+
+        conn = sqlite3.connect(gpkg_path)
+        rows = conn.execute("SELECT DISTINCT NOM_DPTO, DPTO_NORM, DPTO_ID FROM zonas_de_cultivos").fetchall()
+        conn.close()
+        assert sorted(rows) == [('AHUACHAPAN', 'AHUACHAPAN', 1), ('SANTA ANA', 'SANTA ANA', 2),
+                                ('SONSONATE', 'SONSONATE', 3)]
+
+        # Running it again keeps the columns and ids
+        assert materialize_department_columns(gpkg_path)['departments'] == result['departments']
+
+    @pytest.mark.unit
+    def test_triggers_fill_department_columns(self, gpkg_path):
+        materialize_department_columns(gpkg_path)
+
+        conn = connect_for_update(gpkg_path)
+        with conn:
+            cursor = conn.execute("INSERT INTO zonas_de_cultivos (NOM_DPTO) VALUES ('SANTA ANA')")
+            new_fid = cursor.lastrowid
+            conn.execute("UPDATE zonas_de_cultivos SET NOM_DPTO = 'SONSONATE' WHERE fid = 1")
+        rows = conn.execute("SELECT fid, DPTO_NORM, DPTO_ID FROM zonas_de_cultivos WHERE fid IN (1, ?)",
+                            (new_fid,)).fetchall()
+        conn.close()
+        assert sorted(rows) == [(1, 'SONSONATE', 3), (new_fid, 'SANTA ANA', 2)]
+
+    @pytest.mark.unit
+    def test_unmapped_department_falls_back_to_names(self, gpkg_path):
+        materialize_department_columns(gpkg_path)
+        reader = GeoPackageReader(gpkg_path)
+        assert department_source(reader) == 'DPTO_ID'
+
+        # Una grafía que el catálogo no conoce queda sin DPTO_ID
+        conn = connect_for_update(gpkg_path)
+        with conn:
+            conn.execute("INSERT INTO zonas_de_cultivos (NOM_DPTO) VALUES ('La Libertad')")
+        conn.close()
+
+        assert department_source(reader) == 'NOM_DPTO'
+        reader.close()
+
+    @pytest.mark.unit
+    def test_indexes_use_department_id_when_materialized(self, gpkg_path):
+        materialize_department_columns(gpkg_path)
+        result = create_attribute_indexes(gpkg_path, benchmark=False)
+        assert 'idx_vc_zonas_de_cultivos_cul_maiz_id' in result['created']
+        assert 'idx_vc_zonas_de_cultivos_dpto_id' in result['created']
+
+    @pytest.mark.unit
+    def test_department_id_indexes_replace_name_composites(self, gpkg_path):
+        create_attribute_indexes(gpkg_path, benchmark=False)
+        materialize_department_columns(gpkg_path)
+        assert not has_attribute_indexes(gpkg_path)
+
+        result = create_attribute_indexes(gpkg_path, benchmark=False)
+
+        assert 'idx_vc_zonas_de_cultivos_cul_maiz' in result['dropped']
+        conn = sqlite3.connect(gpkg_path)
+        present = existing_indexes(conn, 'zonas_de_cultivos')
+        conn.close()
+        assert ('CUL_MAIZ', 'NOM_DPTO') not in present
+        assert ('CUL_MAIZ', 'DPTO_ID') in present and ('NOM_DPTO',) in present
+        assert has_attribute_indexes(gpkg_path)
@@ -0,0 +1,75 @@
+"""
+Unit tests for the read-only GeoPackage reader
+"""
+import pytest
+from unittest.mock import Mock
+from models.gpkg_reader import GeoPackageReader, parse_ogr_source, quote_identifier
+
+
+def make_layer(source, provider='ogr', subset='', modified=False):
+    layer = Mock()
+    layer.providerType.return_value = provider
+    layer.source.return_value = source
+    layer.subsetString.return_value = subset
+    layer.isEditable.return_value = modified
+    layer.isModified.return_value = modified
+    return layer
+
+
+class TestGeoPackageReader:
+    """Test cases for GeoPackageReader"""
+
+    @pytest.mark.unit
+    def test_parse_ogr_source(self):
+        parsed = parse_ogr_source('/data/Cultivos.gpkg|layername=zonas_de_cultivos|subset=x')
+        assert parsed == {'path': '/data/Cultivos.gpkg', 'layername': 'zonas_de_cultivos', 'subset': 'x'}
+
+    @pytest.mark.unit
+    def test_quote_identifier(self):
+        assert quote_identifier('CUL_MAIZ') == '"CUL_MAIZ"'
+        assert quote_identifier('a"b') == '"a""b"'
+
+    @pytest.mark.unit
+    def test_for_layer_eligible(self, gpkg_path):
+        reader = GeoPackageReader.for_layer(make_layer(f'{gpkg_path}|layername=zonas_de_cultivos'))
+        assert reader is not None
+        assert reader.table == 'zonas_de_cultivos'
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('kwargs', [
+        {'provider': 'memory'},
+        {'subset': '"NOM_DPTO" = \'SONSONATE\''},
+        {'modified': True},
+    ])
+    def test_for_layer_not_eligible(self, gpkg_path, kwargs):
+        assert GeoPackageReader.for_layer(make_layer(gpkg_path, **kwargs)) is None
+
+    @pytest.mark.unit
+    def test_for_layer_missing_file(self, tmp_path):
+        assert GeoPackageReader.for_layer(make_layer(str(tmp_path / 'missing.gpkg'))) is None
+
+    @pytest.mark.unit
+    def test_default_table_and_columns(self, gpkg_path):
+        reader = GeoPackageReader(gpkg_path)
+        assert reader.table == 'zonas_de_cultivos'
+        assert reader.fid_column == 'fid'
+        assert reader.has_columns('NOM_DPTO', 'AREA_KM2', 'CUL_MAIZ')
+        assert not reader.has_columns('CUL_INEXISTENTE')
+
+    @pytest.mark.unit
+    def test_connection_is_read_only(self, gpkg_path):
+        reader = GeoPackageReader(gpkg_path)
+        with pytest.raises(Exception):
+            reader.connect().execute('DELETE FROM zonas_de_cultivos')
+
+    @pytest.mark.unit
+    def test_fids_where_in(self, gpkg_path):
+        reader = GeoPackageReader(gpkg_path)
+        fids = reader.fids_where_in({'NOM_DPTO': ['AHUACHAPAN'], 'CUL_MAIZ': ['Alto']})
+        assert fids == [9, 12, 15, 21, 24]
+        assert reader.fids_where_in({'NOM_DPTO': [], 'CUL_MAIZ': ['Alto']}) == []
+
+    @pytest.mark.unit
+    def test_top_by_area(self, gpkg_path):
+        rows = GeoPackageReader(gpkg_path).top_by_area('CUL_MAIZ', 0, 300, 2)
+        assert [row[1] for row in rows] == ['SAN FRANCISCO MENENDEZ', 'AHUACHAPAN']
@@ -0,0 +1,46 @@
+"""
+Unit tests for the memory-bounded result id spool
+"""
+import pytest
+from unittest.mock import Mock
+from controllers.selection_applier import SelectionApplier
+from models.id_spool import IdSpool, collect_ids
+
+
+class TestIdSpool:
+    """Test cases for IdSpool and collect_ids"""
+
+    @pytest.mark.unit
+    def test_small_results_stay_in_memory(self):
+        assert collect_ids(iter([5, 3, 9]), limit=3) == [5, 3, 9]
+
+    @pytest.mark.unit
+    def test_large_results_are_spooled(self):
+        spool = collect_ids(iter([7, 3, 9, 3, 1]), limit=3)
+
+        assert isinstance(spool, IdSpool)
+        assert len(spool) == 4
+        assert list(spool) == [1, 3, 7, 9]
+        assert list(spool.chunks(3)) == [[1, 3, 7], [9]]
+        assert spool.missing([2, 3, 9, 10]) == [2, 10]
+        spool.close()
+
+    @pytest.mark.unit
+    def test_selection_streams_from_spool(self):
+        pending = []
+        state = {1, 2, 50}
+        layer = Mock()
+        layer.selectedFeatureIds.side_effect = lambda: sorted(state)
+        layer.modifySelection.side_effect = lambda add, remove: (state.update(add), state.difference_update(remove))
+        progress = Mock()
+        applier = SelectionApplier(Mock(), chunk_size=4, schedule=pending.append)
+        spool = IdSpool(range(2, 12))
+
+        assert applier.apply(layer, spool, on_progress=progress) == 11
+        while pending:
+            pending.pop(0)()
+
+        assert state == set(range(2, 12))
+        assert all(len(call.args[0]) + len(call.args[1]) <= 4 for call in layer.modifySelection.call_args_list)
+        assert progress.call_args.args == (11, 11)
+        spool.close()
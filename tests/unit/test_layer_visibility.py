@@ -0,0 +1,68 @@
+"""
+Unit tests for the batched layer tree visibility updates
+"""
+import pytest
+from unittest.mock import Mock
+from controllers.layer_visibility import LayerVisibilityManager
+
+
+def make_node(name, visible):
+    node = Mock()
+    node.name.return_value = name
+    node.itemVisibilityChecked.return_value = visible
+    return node
+
+
+def make_group(*nodes):
+    group = Mock()
+    group.children.return_value = list(nodes)
+    return group
+
+
+class TestLayerVisibilityManager:
+    """Test cases for LayerVisibilityManager"""
+
+    @pytest.fixture
+    def iface(self):
+        return Mock()
+
+    @pytest.mark.unit
+    def test_show_only_touches_changed_nodes(self, iface):
+        ahuachapan = make_node('Ahuachapán', False)
+        santa_ana = make_node('Santa Ana', True)
+        sonsonate = make_node('Sonsonate', False)
+        manager = LayerVisibilityManager(iface)
+
+        matched = manager.show_only(make_group(ahuachapan, santa_ana, sonsonate), ['Ahuachapán'])
+
+        assert matched == [ahuachapan]
+        ahuachapan.setItemVisibilityChecked.assert_called_once_with(True)
+        santa_ana.setItemVisibilityChecked.assert_called_once_with(False)
+        sonsonate.setItemVisibilityChecked.assert_not_called()
+        canvas = iface.mapCanvas.return_value
+        assert canvas.freeze.call_args_list[0].args == (True,)
+        assert canvas.freeze.call_args_list[-1].args == (False,)
+        canvas.refresh.assert_called_once()
+
+    @pytest.mark.unit
+    def test_no_changes_skips_refresh(self, iface):
+        node = make_node('Sonsonate', True)
+        manager = LayerVisibilityManager(iface)
+
+        assert manager.show_only(make_group(node), ['Sonsonate']) == [node]
+        node.setItemVisibilityChecked.assert_not_called()
+        iface.mapCanvas.return_value.refresh.assert_not_called()
+
+    @pytest.mark.unit
+    def test_nested_batches_refresh_once(self, iface):
+        root = Mock()
+        root.findGroup.side_effect = lambda name: make_group(make_node(name, True)) if name != 'Vacío' else None
+        manager = LayerVisibilityManager(iface)
+
+        with manager.batch():
+            assert manager.hide_groups(root, ['Zona_Occidental', 'Vacío', 'Zona_Central']) == 2
+            manager.mark_dirty()
+
+        canvas = iface.mapCanvas.return_value
+        assert [c.args for c in canvas.freeze.call_args_list] == [(True,), (False,)]
+        canvas.refresh.assert_called_once()
@@ -0,0 +1,70 @@
+"""
+Unit tests for the partitioned batch queries
+"""
+import pytest
+from unittest.mock import Mock
+from models.partitioned_scan import PartitionedScanner, fid_partitions
+from models.query_engine import CropQueryEngine
+
+
+def make_layer(path):
+    layer = Mock()
+    layer.providerType.return_value = 'ogr'
+    layer.source.return_value = f'{path}|layername=zonas_de_cultivos'
+    layer.subsetString.return_value = ''
+    layer.isEditable.return_value = False
+    return layer
+
+
+class TestFidPartitions:
+    """Test cases for fid_partitions"""
+
+    @pytest.mark.unit
+    def test_ranges_cover_without_overlap(self):
+        assert fid_partitions(1, 10, 3) == [(1, 3), (4, 6), (7, 10)]
+        assert fid_partitions(5, 6, 4) == [(5, 5), (6, 6)]
+        assert fid_partitions(1, 1, 8) == [(1, 1)]
+
+
+class TestPartitionedScanner:
+    """Test cases for PartitionedScanner"""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('workers', [1, 3])
+    def test_results_match_query_engine(self, gpkg_path, workers):
+        engine = CropQueryEngine(use_fast_path=True, use_snapshot=False)
+        layer = make_layer(gpkg_path)
+        scanner = PartitionedScanner(gpkg_path, 'zonas_de_cultivos', workers=workers)
+        try:
+            assert len(scanner.partitions()) == workers
+            assert (scanner.find_zones(['Ahuachapán'], 'CUL_MAIZ', 'Alto') ==
+                    engine.find_zones(layer, ['Ahuachapán'], 'CUL_MAIZ', 'Alto') == [9, 12, 15, 21, 24])
+            assert scanner.level_counts('Santa Ana', 'CUL_MAIZ') == {'Alto': 5, 'Medio': 2, 'Bajo': 6}
+            by_department = scanner.level_counts_by_department(['Santa Ana', 'Ahuachapán'], 'CUL_MAIZ')
+            assert by_department == {name: engine.level_counts(layer, name, 'CUL_MAIZ')
+                                     for name in ['Santa Ana', 'Ahuachapán']}
+            for top_count in (1, 5, 50):
+                assert (scanner.top_zones('CUL_FRIJOL', 1.0, 300.0, top_count) ==
+                        engine.top_zones(layer, 'CUL_FRIJOL', 1.0, 300.0, top_count))
+        finally:
+            scanner.close()
+            engine.close()
+
+    @pytest.mark.unit
+    def test_missing_column_raises(self, gpkg_path):
+        scanner = PartitionedScanner(gpkg_path, workers=1)
+        with pytest.raises(ValueError, match='CUL_PAPA'):
+            scanner.level_counts('Santa Ana', 'CUL_PAPA')
+        scanner.close()
+
+    @pytest.mark.unit
+    def test_worker_pool_reused_until_close(self, gpkg_path):
+        scanner = PartitionedScanner(gpkg_path, workers=2)
+        try:
+            scanner.level_counts('Santa Ana', 'CUL_MAIZ')
+            pool = scanner._pool
+            scanner.find_zones(['Ahuachapán'], 'CUL_MAIZ', 'Alto')
+            assert pool is not None and scanner._pool is pool
+        finally:
+            scanner.close()
+        assert scanner._pool is None
@@ -0,0 +1,260 @@
+"""
+Unit tests for CropQueryEngine (GeoPackage fast path and getFeatures fallback)
+"""
+import sqlite3
+import pytest
+from unittest.mock import Mock
+from config import Config
+from models.id_spool import IdSpool
+from models.query_engine import CropQueryEngine
+from models.query_explain import PATH_SNAPSHOT
+
+COLUMNS = ['fid', 'NOM_DPTO', 'NOM_MUN', 'AREA_KM2', 'CUL_MAIZ', 'CUL_FRIJOL']
+# Features por filas de la GeoPackage: construir miles de Mock domina el tiempo de
+# estas pruebas, así que se crean una vez por proceso (solo lectura)
+_FEATURES = {}
+
+
+def load_features(path):
+    """Mock QGIS features for the rows of the GeoPackage"""
+    conn = sqlite3.connect(path)
+    rows = tuple(conn.execute(f"SELECT {', '.join(COLUMNS)} FROM zonas_de_cultivos ORDER BY fid").fetchall())
+    conn.close()
+    if rows not in _FEATURES:
+        features = []
+        for row in rows:
+            values = dict(zip(COLUMNS, row))
+            feature = Mock()
+            feature.__getitem__ = Mock(side_effect=lambda name, v=values: v[name])
+            feature.attribute.side_effect = lambda index, r=row: r[index]
+            feature.id.return_value = values['fid']
+            features.append(feature)
+        _FEATURES[rows] = features
+    return _FEATURES[rows]
+
+
+def make_layer(path, provider):
+    layer = Mock()
+    layer.providerType.return_value = provider
+    layer.source.return_value = f'{path}|layername=zonas_de_cultivos'
+    layer.subsetString.return_value = ''
+    layer.isEditable.return_value = False
+    layer.getFeatures.return_value = load_features(path)
+    layer.fields.return_value.names.return_value = COLUMNS
+    layer.id.return_value = f'zonas_{provider}'
+    return layer
+
+
+class TestCropQueryEngine:
+    """Test cases for CropQueryEngine"""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('use_snapshot', [True, False])
+    @pytest.mark.parametrize('departamento,col', [
+        ('Santa Ana', 'CUL_MAIZ'),
+        ('Ahuachapán', 'CUL_FRIJOL'),
+        ('Morazán', 'CUL_MAIZ'),
+    ])
+    def test_level_counts_matches_fallback(self, gpkg_path, use_snapshot, departamento, col):
+        engine = CropQueryEngine(use_fast_path=True, use_snapshot=use_snapshot)
+        fast = engine.level_counts(make_layer(gpkg_path, 'ogr'), departamento, col)
+        slow = engine.level_counts(make_layer(gpkg_path, 'memory'), departamento, col)
+        assert fast == slow
+        assert set(fast) == {'Alto', 'Medio', 'Bajo'}
+
+    @pytest.mark.unit
+    def test_snapshot_is_cached_until_file_changes(self, gpkg_path):
+        import os
+        engine = CropQueryEngine(use_fast_path=True, use_snapshot=True)
+        layer = make_layer(gpkg_path, 'ogr')
+        snapshot = engine.get_snapshot(layer)
+        assert snapshot is not None
+        assert engine.get_snapshot(layer) is snapshot
+        stat = os.stat(gpkg_path)
+        os.utime(gpkg_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert engine.get_snapshot(layer) is not snapshot
+        assert CropQueryEngine(use_fast_path=True, use_snapshot=False).get_snapshot(layer) is None
+
+    @pytest.mark.unit
+    def test_fast_path_selected_for_gpkg(self, gpkg_path):
+        engine = CropQueryEngine(use_fast_path=True)
+        assert engine.get_reader(make_layer(gpkg_path, 'ogr')) is not None
+        assert engine.get_reader(make_layer(gpkg_path, 'memory')) is None
+        assert CropQueryEngine(use_fast_path=False).get_reader(make_layer(gpkg_path, 'ogr')) is None
+
+    @pytest.mark.unit
+    def test_reader_is_cached(self, gpkg_path):
+        engine = CropQueryEngine(use_fast_path=True)
+        layer = make_layer(gpkg_path, 'ogr')
+        assert engine.get_reader(layer) is engine.get_reader(layer)
+        engine.close()
+        assert engine._readers == {}
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('departamentos,col,produccion', [
+        (['Ahuachapán'], 'CUL_MAIZ', 'Alto'),
+        (['Santa Ana'], 'CUL_FRIJOL', 'MEDIO'),
+        (['Sonsonate', 'Santa Ana'], 'CUL_MAIZ', ' bajo '),
+        (['Morazán'], 'CUL_MAIZ', 'Alto'),
+    ])
+    @pytest.mark.parametrize('use_snapshot', [True, False])
+    def test_find_zones_matches_fallback(self, gpkg_path, departamentos, col, produccion, use_snapshot):
+        engine = CropQueryEngine(use_fast_path=True, use_snapshot=use_snapshot)
+        fast = engine.find_zones(make_layer(gpkg_path, 'ogr'), departamentos, col, produccion)
+        slow = engine.find_zones(make_layer(gpkg_path, 'memory'), departamentos, col, produccion)
+        assert fast == slow
+
+    @pytest.mark.unit
+    def test_find_zones_expected_ids(self, gpkg_path):
+        engine = CropQueryEngine(use_fast_path=True)
+        ids = engine.find_zones(make_layer(gpkg_path, 'ogr'), ['Ahuachapán'], 'CUL_MAIZ', 'Alto')
+        assert ids == [9, 12, 15, 21, 24]
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('provider,use_snapshot', [('ogr', False), ('memory', False), ('ogr', True)])
+    def test_find_zones_spools_above_memory_budget(self, gpkg_path, monkeypatch, provider, use_snapshot):
+        monkeypatch.setattr(Config, 'MAX_FEATURES_IN_MEMORY', 2)
+        engine = CropQueryEngine(use_fast_path=True, use_snapshot=use_snapshot)
+        ids = engine.find_zones(make_layer(gpkg_path, provider), ['Ahuachapán'], 'CUL_MAIZ', 'Alto')
+
+        assert isinstance(ids, IdSpool)
+        assert (engine.last_explain.path == PATH_SNAPSHOT) is use_snapshot
+        assert len(ids) == 5
+        assert list(ids) == [9, 12, 15, 21, 24]
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('col,area_min,area_max,top', [
+        ('CUL_MAIZ', 0, 700, 3),
+        ('CUL_FRIJOL', 50, 200, 10),
+        ('CUL_MAIZ', 600, 700, 5),
+    ])
+    def test_top_zones_matches_fallback(self, gpkg_path, col, area_min, area_max, top):
+        engine = CropQueryEngine(use_fast_path=True)
+        fast = engine.top_zones(make_layer(gpkg_path, 'ogr'), col, area_min, area_max, top)
+        slow = engine.top_zones(make_layer(gpkg_path, 'memory'), col, area_min, area_max, top)
+        assert fast == slow
+        assert len(fast) <= top
+
+    @pytest.mark.unit
+    def test_fast_path_missing_column_falls_back(self, gpkg_path):
+        engine = CropQueryEngine(use_fast_path=True)
+        layer = make_layer(gpkg_path, 'ogr')
+        layer.getFeatures.return_value = []
+        assert engine.find_zones(layer, ['Sonsonate'], 'CUL_PAPA', 'Alto') == []
+        layer.getFeatures.assert_called_once()
+
+    @pytest.mark.unit
+    def test_auto_index_on_first_use(self, gpkg_path):
+        engine = CropQueryEngine(use_fast_path=True, auto_index=True)
+        layer = make_layer(gpkg_path, 'ogr')
+        engine.get_reader(layer)
+        engine.get_reader(layer)
+        reports = list(engine.index_reports.values())
+        assert len(reports) == 1
+        assert reports[0]['success'] is True
+        assert reports[0]['created'] and 'time_before' not in reports[0]
+        assert engine.find_zones(layer, ['Ahuachapán'], 'CUL_MAIZ', 'Alto') == [9, 12, 15, 21, 24]
+
+    @pytest.mark.unit
+    def test_find_zones_with_materialized_departments(self, gpkg_path):
+        from models.gpkg_maintenance import materialize_department_columns
+        materialize_department_columns(gpkg_path)
+        engine = CropQueryEngine(use_fast_path=True)
+        reader = engine.get_reader(make_layer(gpkg_path, 'ogr'))
+        assert reader.department_catalog() is not None
+        for departamentos in (['Ahuachapán'], ['Santa Ana', 'Sonsonate']):
+            fast = engine.find_zones(make_layer(gpkg_path, 'ogr'), departamentos, 'CUL_FRIJOL', 'Alto')
+            slow = engine.find_zones(make_layer(gpkg_path, 'memory'), departamentos, 'CUL_FRIJOL', 'Alto')
+            assert fast == slow
+
+    @pytest.mark.unit
+    def test_fallback_uses_materialized_code_column(self, gpkg_path):
+        engine = CropQueryEngine(use_fast_path=False)
+        feature = Mock()
+        feature.attribute.side_effect = lambda index: [None, 'SANTA ANA', 'Alto'][index]
+        feature.id.return_value = 7
+        layer = make_layer(gpkg_path, 'memory')
+        layer.fields.return_value.names.return_value = ['NOM_DPTO', 'DPTO_NORM', 'CUL_MAIZ']
+        layer.getFeatures.return_value = [feature]
+        assert engine.find_zones(layer, ['Santa Ana'], 'CUL_MAIZ', 'Alto') == [7]
+
+    @pytest.mark.unit
+    def test_snapshot_persisted_and_memory_mapped(self, gpkg_path, snapshot_cache):
+        import numpy as np
+        layer = make_layer(gpkg_path, 'ogr')
+        cold = CropQueryEngine(use_fast_path=True, use_snapshot=True, snapshot_dir=str(snapshot_cache))
+        expected = cold.find_zones(layer, ['Ahuachapán'], 'CUL_MAIZ', 'Alto')
+        assert len(list(snapshot_cache.iterdir())) == 1
+
+        warm = CropQueryEngine(use_fast_path=True, use_snapshot=True, snapshot_dir=str(snapshot_cache))
+        snapshot = warm.get_snapshot(layer)
+        assert isinstance(snapshot.levels, np.memmap)
+        assert warm.find_zones(layer, ['Ahuachapán'], 'CUL_MAIZ', 'Alto') == expected
+
+    @pytest.mark.unit
+    def test_snapshot_read_into_memory_without_memory_map(self, gpkg_path, snapshot_cache, monkeypatch):
+        import numpy as np
+        monkeypatch.setattr(Config, 'SNAPSHOT_MEMORY_MAP', False)
+        layer = make_layer(gpkg_path, 'ogr')
+        CropQueryEngine(use_fast_path=True, use_snapshot=True, snapshot_dir=str(snapshot_cache)).get_snapshot(layer)
+
+        warm = CropQueryEngine(use_fast_path=True, use_snapshot=True, snapshot_dir=str(snapshot_cache))
+        snapshot = warm.get_snapshot(layer)
+        assert not isinstance(snapshot.levels, np.memmap)
+
+        # Por encima del presupuesto se mantiene mapeada
+        monkeypatch.setattr(Config, 'CACHE_SIZE_MB', 0)
+        over_budget = CropQueryEngine(use_fast_path=True, use_snapshot=True, snapshot_dir=str(snapshot_cache))
+        assert isinstance(over_budget.get_snapshot(layer).levels, np.memmap)
+
+    @pytest.mark.unit
+    def test_profile_change_reloads_cached_snapshot(self, gpkg_path, snapshot_cache, monkeypatch):
+        import numpy as np
+        layer = make_layer(gpkg_path, 'ogr')
+        CropQueryEngine(use_fast_path=True, use_snapshot=True, snapshot_dir=str(snapshot_cache)).get_snapshot(layer)
+        engine = CropQueryEngine(use_fast_path=True, use_snapshot=True, snapshot_dir=str(snapshot_cache))
+        assert isinstance(engine.get_snapshot(layer).levels, np.memmap)
+
+        # Valores del perfil max_throughput
+        monkeypatch.setattr(Config, 'SNAPSHOT_MEMORY_MAP', False)
+        monkeypatch.setattr(Config, 'CACHE_SIZE_MB', 2048)
+        assert not isinstance(engine.get_snapshot(layer).levels, np.memmap)
+
+        monkeypatch.setattr(Config, 'SNAPSHOT_MEMORY_MAP', True)
+        assert isinstance(engine.get_snapshot(layer).levels, np.memmap)
+
+    @pytest.mark.unit
+    def test_snapshot_over_budget_falls_back_to_sql(self, gpkg_path, monkeypatch):
+        monkeypatch.setattr(Config, 'CACHE_SIZE_MB', 0)
+        engine = CropQueryEngine(use_fast_path=True, use_snapshot=True, snapshot_dir='')
+        layer = make_layer(gpkg_path, 'ogr')
+
+        assert engine.get_snapshot(layer) is None
+        assert engine.find_zones(layer, ['Ahuachapán'], 'CUL_MAIZ', 'Alto') == \
+            CropQueryEngine(use_fast_path=True, use_snapshot=False).find_zones(layer, ['Ahuachapán'], 'CUL_MAIZ', 'Alto')
+
+    @pytest.mark.unit
+    def test_result_extent_uses_rtree(self, gpkg_path):
+        engine = CropQueryEngine()
+        layer = make_layer(gpkg_path, 'ogr')
+        ids = engine.find_zones(layer, ['Ahuachapán'], 'CUL_MAIZ', 'Alto')
+
+        extent = engine.result_extent(layer, ids)
+
+        assert extent is not None
+        assert engine.result_extent(layer, []) is None
+        assert engine.get_extent_index(layer) is engine.get_extent_index(layer)
+        engine.close()
+
+    @pytest.mark.unit
+    def test_level_totals_agree_across_paths(self, gpkg_path):
+        snapshot = CropQueryEngine(use_snapshot=True).level_totals(make_layer(gpkg_path, 'ogr'), 'CUL_MAIZ')
+        sql = CropQueryEngine(use_snapshot=False).level_totals(make_layer(gpkg_path, 'ogr'), 'CUL_MAIZ')
+        loop = CropQueryEngine().level_totals(make_layer(gpkg_path, 'memory'), 'CUL_MAIZ')
+
+        assert set(snapshot) == {'Alto', 'Medio', 'Bajo'}
+        for level in snapshot:
+            assert snapshot[level][0] == sql[level][0] == loop[level][0]
+            assert snapshot[level][1] == pytest.approx(sql[level][1])
+            assert sql[level][1] == pytest.approx(loop[level][1])
+        assert sum(count for count, _ in snapshot.values()) > 0
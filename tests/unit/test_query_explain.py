@@ -0,0 +1,80 @@
+"""
+Unit tests for the query execution report
+"""
+import shutil
+import pytest
+from pathlib import Path
+from unittest.mock import Mock
+from config import Config
+from models.query_engine import CropQueryEngine
+from models.query_explain import PATH_PUSHDOWN, PATH_SCAN, PATH_SNAPSHOT, QueryExplain
+
+CULTIVOS_GPKG = Path(__file__).parent.parent.parent / 'Cultivos.gpkg'
+
+
+@pytest.fixture
+def gpkg_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'SNAPSHOT_CACHE_DIR', str(tmp_path / 'cache'))
+    path = tmp_path / 'Cultivos.gpkg'
+    shutil.copy(CULTIVOS_GPKG, path)
+    return str(path)
+
+
+def make_layer(path, provider='ogr', features=()):
+    layer = Mock()
+    layer.providerType.return_value = provider
+    layer.source.return_value = f'{path}|layername=zonas_de_cultivos'
+    layer.subsetString.return_value = ''
+    layer.isEditable.return_value = False
+    layer.getFeatures.return_value = list(features)
+    layer.fields.return_value.names.return_value = ['fid', 'NOM_DPTO', 'CUL_MAIZ']
+    layer.id.return_value = f'zonas_{provider}'
+    return layer
+
+
+def make_feature(fid, dpto, level):
+    feature = Mock()
+    feature.id.return_value = fid
+    feature.attribute.side_effect = lambda index: (fid, dpto, level)[index]
+    return feature
+
+
+class TestQueryExplain:
+    """Test cases for QueryExplain and the engine report"""
+
+    @pytest.mark.unit
+    def test_stages_accumulate(self):
+        explain = QueryExplain('CUL_MAIZ = Alto')
+        with explain.stage('fetch'):
+            pass
+        with explain.stage('fetch'):
+            pass
+        explain.path, explain.examined, explain.matched = PATH_SCAN, 41, 5
+
+        assert list(explain.stages) == ['fetch']
+        assert explain.summary().startswith('5 de 41 zonas vía recorrido completo en ')
+        assert 'Zonas examinadas: 41' in explain.details()
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('use_snapshot,path', [(True, PATH_SNAPSHOT), (False, PATH_PUSHDOWN)])
+    def test_engine_reports_gpkg_paths(self, gpkg_path, use_snapshot, path):
+        engine = CropQueryEngine(use_fast_path=True, use_snapshot=use_snapshot)
+        engine.find_zones(make_layer(gpkg_path), ['Ahuachapán'], 'CUL_MAIZ', 'Alto')
+        explain = engine.last_explain
+
+        assert explain.path == path
+        assert explain.matched == 5
+        assert 'lookup' in explain.stages and 'fetch' in explain.stages
+        if path == PATH_PUSHDOWN:
+            assert explain.plan and explain.examined is None
+        else:
+            assert explain.examined == 41
+
+    @pytest.mark.unit
+    def test_engine_reports_full_scan(self, gpkg_path):
+        features = [make_feature(1, 'Ahuachapán', 'Alto'), make_feature(2, 'Sonsonate', 'Alto')]
+        engine = CropQueryEngine(use_fast_path=False)
+        engine.find_zones(make_layer(gpkg_path, 'memory', features), ['Ahuachapán'], 'CUL_MAIZ', 'Alto')
+
+        assert engine.last_explain.path == PATH_SCAN
+        assert (engine.last_explain.examined, engine.last_explain.matched) == (2, 1)
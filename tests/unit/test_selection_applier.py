@@ -0,0 +1,80 @@
+"""
+Unit tests for the incremental selection applier
+"""
+import pytest
+from unittest.mock import Mock
+from controllers.selection_applier import SelectionApplier
+
+
+def make_layer(selected):
+    layer = Mock()
+    state = set(selected)
+    layer.selectedFeatureIds.side_effect = lambda: sorted(state)
+
+    def modify(add, remove):
+        state.update(add)
+        state.difference_update(remove)
+
+    layer.modifySelection.side_effect = modify
+    layer.state = state
+    return layer
+
+
+class TestSelectionApplier:
+    """Test cases for SelectionApplier"""
+
+    @pytest.mark.unit
+    def test_small_diff_is_applied_at_once(self):
+        layer = make_layer([1, 2, 3])
+        finished = Mock()
+        applier = SelectionApplier(Mock(), chunk_size=10, schedule=Mock())
+
+        assert applier.apply(layer, [2, 3, 4, 5], on_finished=finished) == 3
+
+        layer.modifySelection.assert_called_once_with([4, 5], [1])
+        layer.removeSelection.assert_not_called()
+        layer.selectByIds.assert_not_called()
+        finished.assert_called_once()
+
+    @pytest.mark.unit
+    def test_unchanged_selection_is_not_touched(self):
+        layer = make_layer([1, 2])
+        applier = SelectionApplier(Mock(), chunk_size=10, schedule=Mock())
+
+        assert applier.apply(layer, [2, 1]) == 0
+        layer.modifySelection.assert_not_called()
+
+    @pytest.mark.unit
+    def test_large_diff_is_chunked(self):
+        pending = []
+        iface = Mock()
+        layer = make_layer(range(0, 5))
+        progress = Mock()
+        finished = Mock()
+        applier = SelectionApplier(iface, chunk_size=4, schedule=pending.append)
+
+        assert applier.apply(layer, range(3, 12), on_progress=progress, on_finished=finished) == 10
+        while pending:
+            pending.pop(0)()
+
+        assert layer.state == set(range(3, 12))
+        assert layer.modifySelection.call_count == 3
+        assert progress.call_args_list[-1].args == (10, 10)
+        finished.assert_called_once()
+        canvas = iface.mapCanvas.return_value
+        assert [c.args for c in canvas.freeze.call_args_list] == [(True,), (False,)]
+        canvas.refresh.assert_called_once()
+
+    @pytest.mark.unit
+    def test_new_apply_cancels_pending_job(self):
+        pending = []
+        layer = make_layer([])
+        applier = SelectionApplier(Mock(), chunk_size=2, schedule=pending.append)
+
+        applier.apply(layer, range(10))
+        pending.pop(0)()
+        applier.apply(layer, [0])
+        while pending:
+            pending.pop(0)()
+
+        assert layer.state == {0}
@@ -0,0 +1,75 @@
+"""
+Unit tests for the idempotent signal wiring
+"""
+import pytest
+from views.signal_wiring import SignalWiring
+
+
+class FakeSignal:
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot):
+        self.slots.append(slot)
+
+    def disconnect(self, slot):
+        self.slots.remove(slot)
+
+    def emit(self, *args):
+        for slot in list(self.slots):
+            slot(*args)
+
+
+class FakeCombo:
+    def __init__(self):
+        self.currentIndexChanged = FakeSignal()
+
+
+class Receiver:
+    def __init__(self):
+        self.calls = 0
+
+    def update_data_section(self):
+        self.calls += 1
+
+
+class TestSignalWiring:
+    """Test cases for SignalWiring"""
+
+    @pytest.mark.unit
+    def test_repeated_connect_is_ignored(self):
+        combo, receiver = FakeCombo(), Receiver()
+        wiring = SignalWiring(debug=False)
+
+        assert wiring.connect(combo, 'currentIndexChanged', receiver.update_data_section) is True
+        assert wiring.connect(combo, 'currentIndexChanged', receiver.update_data_section) is False
+        combo.currentIndexChanged.emit()
+
+        assert receiver.calls == 1
+        assert wiring.connection_count() == 1
+
+    @pytest.mark.unit
+    def test_debug_counts_invocations_per_action(self):
+        combo, receiver = FakeCombo(), Receiver()
+        wiring = SignalWiring(debug=True)
+        for _ in range(3):
+            wiring.connect(combo, 'currentIndexChanged', receiver.update_data_section)
+
+        with wiring.measure() as counts:
+            # La señal entrega el índice; el slot no lo recibe
+            combo.currentIndexChanged.emit(2)
+
+        assert receiver.calls == 1
+        assert counts == {'Receiver.update_data_section': 1}
+
+    @pytest.mark.unit
+    def test_disconnect(self):
+        combo, receiver = FakeCombo(), Receiver()
+        wiring = SignalWiring(debug=True)
+        wiring.connect(combo, 'currentIndexChanged', receiver.update_data_section)
+
+        assert wiring.disconnect(combo, 'currentIndexChanged', receiver.update_data_section) is True
+        combo.currentIndexChanged.emit(0)
+
+        assert receiver.calls == 0
+        assert wiring.disconnect(combo, 'currentIndexChanged', receiver.update_data_section) is False
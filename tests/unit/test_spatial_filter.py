@@ -0,0 +1,74 @@
+"""
+Unit tests for the spatial restriction of zone queries
+"""
+import pytest
+from unittest.mock import Mock, patch
+from models.id_spool import IdSpool
+from models.spatial_filter import intersecting_zones
+
+
+def make_region(xmin, ymin, xmax, ymax):
+    box = Mock()
+    box.xMinimum.return_value, box.yMinimum.return_value = xmin, ymin
+    box.xMaximum.return_value, box.yMaximum.return_value = xmax, ymax
+    region = Mock()
+    region.isEmpty.return_value = False
+    region.boundingBox.return_value = box
+    return region
+
+
+def make_feature(fid):
+    feature = Mock()
+    feature.id.return_value = fid
+    feature.hasGeometry.return_value = True
+    feature.geometry.return_value.constGet.return_value = fid
+    return feature
+
+
+class TestSpatialFilter:
+    """Test cases for intersecting_zones"""
+
+    @pytest.mark.unit
+    def test_exact_test_only_on_candidates(self):
+        engine = Mock()
+        engine.bbox_candidates.return_value = [2, 3, 5, 8]
+        layer = Mock()
+        layer.getFeatures.side_effect = lambda request: [make_feature(fid) for fid in (3, 5, 8)]
+        geometry_engine = Mock()
+        geometry_engine.intersects.side_effect = lambda fid: fid != 5
+
+        with patch('models.spatial_filter.QgsFeatureRequest') as request_cls, \
+                patch('models.spatial_filter.QgsGeometry') as geometry_cls:
+            geometry_cls.createGeometryEngine.return_value = geometry_engine
+            ids = intersecting_zones(engine, layer, [1, 3, 5, 8], make_region(0, 0, 10, 10))
+
+        assert ids == [3, 8]
+        engine.bbox_candidates.assert_called_once_with(layer, (0, 0, 10, 10))
+        request_cls.return_value.setFilterFids.assert_called_once_with([3, 5, 8])
+        geometry_engine.prepareGeometry.assert_called_once()
+
+    @pytest.mark.unit
+    def test_no_candidates_skips_feature_fetch(self):
+        engine = Mock()
+        engine.bbox_candidates.return_value = [7]
+        layer = Mock()
+
+        assert intersecting_zones(engine, layer, [1, 2], make_region(0, 0, 1, 1)) == []
+        assert intersecting_zones(engine, layer, [], make_region(0, 0, 1, 1)) == []
+        layer.getFeatures.assert_not_called()
+
+    @pytest.mark.unit
+    def test_spooled_ids_intersected_in_chunks(self):
+        engine = Mock()
+        engine.bbox_candidates.return_value = [4, 9, 15000, 25000]
+        layer = Mock()
+        layer.getFeatures.side_effect = lambda request: []
+        spool = IdSpool(range(1, 30001, 2))
+
+        with patch('models.spatial_filter.QgsFeatureRequest') as request_cls, \
+                patch('models.spatial_filter.QgsGeometry'), \
+                patch.object(IdSpool, '__iter__', side_effect=AssertionError('whole spool read')):
+            intersecting_zones(engine, layer, spool, make_region(0, 0, 10, 10))
+        spool.close()
+
+        request_cls.return_value.setFilterFids.assert_called_once_with([9])
@@ -0,0 +1,141 @@
+"""
+Unit tests for the zone to department spatial join
+"""
+import shutil
+import sqlite3
+import struct
+import numpy as np
+import pytest
+from pathlib import Path
+from unittest.mock import Mock
+from models.gpkg_maintenance import connect_for_update
+from models.gpkg_reader import GeoPackageReader
+from models.query_engine import CropQueryEngine
+from models.spatial_join import build_department_join, interior_point, parse_gpkg_polygons, points_in_polygon
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+SQUARE_WITH_HOLE = [
+    np.array([[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]], dtype=float),
+    np.array([[4, 4], [6, 4], [6, 6], [4, 6], [4, 4]], dtype=float),
+]
+
+
+class TestSpatialJoin:
+    """Test cases for the spatial join helpers"""
+
+    @pytest.mark.unit
+    def test_parse_gpkg_polygon(self):
+        ring = [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 0.0)]
+        wkb = struct.pack('<BII', 1, 3, 1) + struct.pack('<I', len(ring)) + b''.join(
+            struct.pack('<2d', *point) for point in ring)
+        blob = b'GP\x00\x01' + struct.pack('<i', 4326) + wkb
+
+        polygons = parse_gpkg_polygons(blob)
+        assert len(polygons) == 1
+        assert polygons[0][0].tolist() == [list(point) for point in ring]
+        assert parse_gpkg_polygons(None) == []
+
+    @pytest.mark.unit
+    def test_points_in_polygon_excludes_holes(self):
+        xs = np.array([1.0, 5.0, 11.0, 9.5])
+        ys = np.array([1.0, 5.0, 5.0, 9.5])
+        assert points_in_polygon(xs, ys, SQUARE_WITH_HOLE).tolist() == [True, False, False, True]
+
+    @pytest.mark.unit
+    def test_interior_point_avoids_hole(self):
+        x, y = interior_point([SQUARE_WITH_HOLE])
+        assert points_in_polygon(np.array([x]), np.array([y]), SQUARE_WITH_HOLE)[0]
+
+    @pytest.mark.unit
+    def test_build_department_join(self, gpkg_path):
+        result = build_department_join(gpkg_path, str(PROJECT_ROOT / 'Occidente.gpkg'))
+
+        assert result['success'] is True
+        assert result['matched'] == 41
+        assert result['unmatched'] == 0
+        assert result['mismatched'] == []
+        conn = sqlite3.connect(gpkg_path)
+        assert conn.execute("SELECT COUNT(*) FROM vc_zona_departamento").fetchone()[0] == 41
+        conn.close()
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('use_snapshot', [True, False])
+    def test_queries_use_join(self, gpkg_path, tmp_path, use_snapshot):
+        build_department_join(gpkg_path, str(PROJECT_ROOT / 'Occidente.gpkg'))
+        layer = Mock()
+        layer.providerType.return_value = 'ogr'
+        layer.source.return_value = f'{gpkg_path}|layername=zonas_de_cultivos'
+        layer.subsetString.return_value = ''
+        layer.isEditable.return_value = False
+        engine = CropQueryEngine(use_snapshot=use_snapshot, snapshot_dir=str(tmp_path / 'cache'),
+                                 use_spatial_join=True)
+
+        assert engine.find_zones(layer, ['Ahuachapán'], 'CUL_MAIZ', 'Alto') == [9, 12, 15, 21, 24]
+        assert engine.level_counts(layer, 'Santa Ana', 'CUL_MAIZ') == {'Alto': 5, 'Medio': 2, 'Bajo': 6}
+        if use_snapshot:
+            assert engine.get_snapshot(layer).source == 'join'
+        engine.close()
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('use_snapshot', [True, False])
+    def test_department_outside_join_falls_back_to_names(self, gpkg_path, tmp_path, use_snapshot):
+        build_department_join(gpkg_path, str(PROJECT_ROOT / 'Occidente.gpkg'))
+        # Ahuachapán queda fuera de la capa de límites
+        conn = sqlite3.connect(gpkg_path)
+        with conn:
+            conn.execute("DELETE FROM vc_zona_departamento WHERE dpto_id = "
+                         "(SELECT id FROM vc_departamentos WHERE nombre = 'AHUACHAPAN')")
+        conn.close()
+        layer = Mock()
+        layer.providerType.return_value = 'ogr'
+        layer.source.return_value = f'{gpkg_path}|layername=zonas_de_cultivos'
+        layer.subsetString.return_value = ''
+        layer.isEditable.return_value = False
+        engine = CropQueryEngine(use_snapshot=use_snapshot, snapshot_dir=str(tmp_path / 'cache'),
+                                 use_spatial_join=True)
+
+        assert engine.find_zones(layer, ['Ahuachapán'], 'CUL_MAIZ', 'Alto') == [9, 12, 15, 21, 24]
+        assert engine.find_zones(layer, ['Ahuachapán', 'Santa Ana'], 'CUL_MAIZ', 'Alto')[:5] == [9, 12, 15, 21, 24]
+        assert sum(engine.level_counts(layer, 'Ahuachapán', 'CUL_MAIZ').values()) > 0
+        assert engine.level_counts(layer, 'Santa Ana', 'CUL_MAIZ') == {'Alto': 5, 'Medio': 2, 'Bajo': 6}
+        engine.close()
+
+    @pytest.mark.unit
+    def test_build_department_join_rejects_crs_mismatch(self, gpkg_path, tmp_path):
+        departments_path = tmp_path / 'Occidente.gpkg'
+        shutil.copy(PROJECT_ROOT / 'Occidente.gpkg', departments_path)
+        conn = sqlite3.connect(departments_path)
+        with conn:
+            conn.execute("UPDATE gpkg_geometry_columns SET srs_id = srs_id + 1")
+        conn.close()
+
+        result = build_department_join(gpkg_path, str(departments_path))
+
+        assert result['success'] is False
+        assert 'CRS' in result['message']
+        assert not GeoPackageReader(gpkg_path).has_department_join()
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('use_snapshot', [True, False])
+    def test_zones_added_after_join_fall_back_to_names(self, gpkg_path, tmp_path, use_snapshot):
+        build_department_join(gpkg_path, str(PROJECT_ROOT / 'Occidente.gpkg'))
+        layer = Mock()
+        layer.providerType.return_value = 'ogr'
+        layer.source.return_value = f'{gpkg_path}|layername=zonas_de_cultivos'
+        layer.subsetString.return_value = ''
+        layer.isEditable.return_value = False
+        engine = CropQueryEngine(use_snapshot=use_snapshot, snapshot_dir=str(tmp_path / 'cache'),
+                                 use_spatial_join=True)
+        assert engine.find_zones(layer, ['Ahuachapán'], 'CUL_MAIZ', 'Alto') == [9, 12, 15, 21, 24]
+
+        # Una zona nueva no figura en la unión guardada
+        conn = connect_for_update(gpkg_path)
+        with conn:
+            new_fid = conn.execute("INSERT INTO zonas_de_cultivos (NOM_DPTO, CUL_MAIZ) "
+                                   "VALUES ('AHUACHAPAN', 'Alto')").lastrowid
+        conn.close()
+
+        assert engine.find_zones(layer, ['Ahuachapán'], 'CUL_MAIZ', 'Alto') == [9, 12, 15, 21, 24, new_fid]
+        if use_snapshot:
+            assert engine.get_snapshot(layer).source != 'join'
+        engine.close()
@@ -0,0 +1,125 @@
+"""
+Unit tests for the synthetic GeoPackage generator
+"""
+import hashlib
+import sqlite3
+from collections import Counter
+
+import pytest
+
+from models.gpkg_reader import GeoPackageReader
+from models.spatial_join import build_department_join, parse_gpkg_polygons
+from tests.fixtures.synthetic import (
+    CROP_COLUMNS, DEPARTMENTS, DEPARTMENTS_TABLE, TABLE,
+    build_cultivos_gpkg, build_departments_gpkg, department_strips,
+)
+
+
+def table_digest(path):
+    conn = sqlite3.connect(str(path))
+    try:
+        digest = hashlib.sha256()
+        for row in conn.execute(f'SELECT * FROM "{TABLE}" ORDER BY fid'):
+            digest.update(repr(row).encode())
+        return digest.hexdigest()
+    finally:
+        conn.close()
+
+
+@pytest.fixture(scope='module')
+def fixture_pair(tmp_path_factory):
+    folder = tmp_path_factory.mktemp('synthetic')
+    zones = build_cultivos_gpkg(folder / 'Cultivos.gpkg', 3000)
+    departments = build_departments_gpkg(folder / 'Occidente.gpkg', 3000)
+    return zones, departments
+
+
+class TestSyntheticFixtures:
+    """Test the generated zones and departments GeoPackages"""
+
+    @pytest.mark.unit
+    def test_same_seed_same_data(self, tmp_path):
+        first = build_cultivos_gpkg(tmp_path / 'a.gpkg', 500, seed=7)
+        second = build_cultivos_gpkg(tmp_path / 'b.gpkg', 500, seed=7)
+        other = build_cultivos_gpkg(tmp_path / 'c.gpkg', 500, seed=8)
+
+        assert table_digest(first) == table_digest(second)
+        assert table_digest(first) != table_digest(other)
+
+    @pytest.mark.unit
+    def test_readable_by_geopackage_reader(self, fixture_pair):
+        reader = GeoPackageReader(fixture_pair[0])
+        try:
+            assert reader.table == TABLE
+            assert reader.geometry_column == 'geom'
+            assert reader.has_columns('NOM_DPTO', 'NOM_MUN', 'AREA_KM2', *CROP_COLUMNS)
+            assert reader.fid_range() == (1, 3000)
+        finally:
+            reader.close()
+
+    @pytest.mark.unit
+    def test_rtree_matches_geometries(self, fixture_pair):
+        reader = GeoPackageReader(fixture_pair[0])
+        try:
+            bounds = reader.feature_bounds()
+            assert len(bounds) == 3000
+            blob = reader.connect().execute(f'SELECT geom FROM "{TABLE}" WHERE fid = 1').fetchone()[0]
+            coords = [point for polygon in parse_gpkg_polygons(blob) for point in polygon[0].tolist()]
+            # El R-tree guarda float32 redondeados hacia afuera
+            fid, minx, maxx, miny, maxy = bounds[0]
+            assert fid == 1
+            assert minx <= min(x for x, _ in coords) and maxx >= max(x for x, _ in coords)
+            assert miny <= min(y for _, y in coords) and maxy >= max(y for _, y in coords)
+            assert maxx - minx < 2000
+            assert 1 in reader.fids_in_rect(minx, miny, maxx, maxy)
+        finally:
+            reader.close()
+
+    @pytest.mark.unit
+    def test_polygons_are_complex(self, fixture_pair):
+        conn = sqlite3.connect(fixture_pair[0])
+        try:
+            parts = [parse_gpkg_polygons(blob) for blob, in conn.execute(f'SELECT geom FROM "{TABLE}"')]
+        finally:
+            conn.close()
+
+        vertex_counts = {len(polygon[0]) - 1 for polygon_list in parts for polygon in polygon_list}
+        assert min(vertex_counts) >= 6 and max(vertex_counts) > 16
+        assert any(len(polygon_list) > 1 for polygon_list in parts)
+
+    @pytest.mark.unit
+    def test_department_and_level_distributions_are_skewed(self, fixture_pair):
+        conn = sqlite3.connect(fixture_pair[0])
+        try:
+            departments = Counter(name for name, in conn.execute(f'SELECT NOM_DPTO FROM "{TABLE}"'))
+            cane = Counter(level for level, in conn.execute(f'SELECT "CUL_CAÑA_DE_AZUCAR" FROM "{TABLE}"'))
+            maize = Counter(level for level, in conn.execute(f'SELECT CUL_MAIZ FROM "{TABLE}"'))
+        finally:
+            conn.close()
+
+        assert set(departments) == set(DEPARTMENTS)
+        assert departments[DEPARTMENTS[0]] > 2 * departments[DEPARTMENTS[-1]]
+        assert cane[None] > cane['Alto'] * 5
+        assert maize['Bajo'] > maize['Alto'] > maize[None]
+
+    @pytest.mark.unit
+    def test_zones_lie_in_their_department(self, fixture_pair):
+        zones, departments = fixture_pair
+        reader = GeoPackageReader(departments)
+        try:
+            assert reader.table == DEPARTMENTS_TABLE
+        finally:
+            reader.close()
+
+        result = build_department_join(zones, departments)
+
+        assert result['success'] is True
+        assert result['matched'] == 3000
+        assert result['mismatched'] == []
+
+    @pytest.mark.unit
+    def test_department_strips_cover_grid(self):
+        strips = department_strips(55)
+
+        assert strips[0][1] == 0 and strips[-1][2] == 54
+        assert all(a[2] + 1 == b[1] for a, b in zip(strips, strips[1:]))
@@ -0,0 +1,85 @@
+"""
+Unit tests for the verification step graph in verify_all.py
+"""
+import threading
+import pytest
+from unittest.mock import patch
+from verify_all import VerificationRunner, main, run_step_graph
+
+
+def recording_step(order, name, result=True, barrier=None):
+    def step():
+        if barrier is not None:
+            barrier.wait(timeout=5)
+        order.append(name)
+        return result
+    return step
+
+
+class TestStepGraph:
+    """Test cases for run_step_graph"""
+
+    @pytest.mark.unit
+    def test_dependencies_run_first(self, capsys):
+        order = []
+        steps = [
+            ('b', recording_step(order, 'b'), ['a']),
+            ('a', recording_step(order, 'a'), []),
+            ('c', recording_step(order, 'c'), ['a', 'b']),
+        ]
+
+        assert run_step_graph(VerificationRunner(), steps, jobs=4) is True
+        assert order == ['a', 'b', 'c']
+
+    @pytest.mark.unit
+    def test_independent_steps_run_concurrently(self, capsys):
+        # Ambos pasos esperan en la barrera: solo terminan si corren a la vez
+        order = []
+        barrier = threading.Barrier(2)
+        steps = [
+            ('setup', recording_step(order, 'setup'), []),
+            ('lint', recording_step(order, 'lint', barrier=barrier), ['setup']),
+            ('tests', recording_step(order, 'tests', barrier=barrier), ['setup']),
+        ]
+
+        assert run_step_graph(VerificationRunner(), steps, jobs=2) is True
+        assert order[0] == 'setup' and set(order[1:]) == {'lint', 'tests'}
+
+    @pytest.mark.unit
+    def test_failures_and_exceptions_do_not_stop_dependents(self, capsys):
+        order = []
+
+        def broken():
+            raise RuntimeError("boom")
+
+        steps = [
+            ('a', recording_step(order, 'a', result=False), []),
+            ('b', broken, ['a']),
+            ('c', recording_step(order, 'c'), ['b']),
+        ]
+        runner = VerificationRunner()
+
+        assert run_step_graph(runner, steps, jobs=2) is False
+        assert order == ['a', 'c']
+        assert set(runner.step_times) == {'a', 'b', 'c'}
+        assert 'b failed with exception: boom' in capsys.readouterr().out
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('steps', [
+        [('a', lambda: True, ['missing'])],
+        [('a', lambda: True, ['b']), ('b', lambda: True, ['a'])],
+    ])
+    def test_invalid_graphs(self, steps):
+        with pytest.raises(ValueError):
+            run_step_graph(VerificationRunner(), steps, jobs=1)
+
+    @pytest.mark.unit
+    def test_main_runs_comprehensive_tests_last_and_fails_with_steps(self, capsys):
+        with patch('verify_all.run_step_graph', return_value=False) as graph, \
+                patch.object(VerificationRunner, 'generate_summary', return_value=True), \
+                patch('sys.argv', ['verify_all.py']), pytest.raises(SystemExit) as exit_info:
+            main()
+
+        assert exit_info.value.code == 1
+        deps = {name: set(step_deps) for name, _, step_deps in graph.call_args[0][1]}
+        assert {'Core Tests', 'CI Simulation'} <= deps['Comprehensive Tests']
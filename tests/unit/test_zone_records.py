@@ -0,0 +1,40 @@
+"""
+Unit tests for the compact TOP zones result records
+"""
+import sys
+import pytest
+from models.zone_records import ZoneRecord, ZoneResults
+
+
+class TestZoneResults:
+    """Test cases for ZoneResults"""
+
+    @pytest.mark.unit
+    def test_names_are_interned(self):
+        results = ZoneResults.from_rows([
+            ('SANTA ANA', 'METAPAN', 691.47, 'Bajo'),
+            ('SANTA ANA', 'SANTA ANA', 409.81, ' Bajo '),
+            ('AHUACHAPAN', 'TACUBA', 120.5, 'Alto'),
+        ])
+
+        assert len(results) == 3
+        assert len(results.departments) == 2
+        assert len(results.levels) == 2
+        assert [record.dept_id for record in results] == [0, 0, 1]
+        assert results.as_tuples()[1] == ('SANTA ANA', 'SANTA ANA', 409.81, 'Bajo')
+
+    @pytest.mark.unit
+    def test_formatting_deferred_to_display(self):
+        results = ZoneResults.from_rows([('SONSONATE', 'IZALCO', '175.456', 'Medio')])
+
+        assert results.records[0].area == pytest.approx(175.456)
+        assert results.display_row(0) == ['SONSONATE', 'IZALCO', '175.46', 'Medio']
+
+    @pytest.mark.unit
+    def test_record_is_compact(self):
+        record = ZoneRecord(0, 0, 1.5, 2)
+        row = {'departamento': 'SANTA ANA', 'municipio': 'METAPAN', 'area': 1.5, 'produccion': 'Alto'}
+
+        assert not hasattr(record, '__dict__')
+        assert sys.getsizeof(record) < sys.getsizeof(row)
+        assert ZoneResults.from_rows([('A', 'B', 1, 'Alto')]) == ZoneResults.from_rows([('A', 'B', 1.0, 'Alto')])
@@ -3,14 +3,25 @@
 Complete verification script for visualizacion_de_cultivos plugin
 
 This script runs all necessary checks to ensure the plugin and tests
-work correctly both locally and in CI environments.
+work correctly both locally and in CI environments. Pass --perf (or set
+VERIFY_PERF=true) to also run the performance benchmarks.
+
+Steps form a dependency graph: a step starts as soon as the steps it needs
+have finished, so independent checks (imports, code quality, the test
+suites) run at the same time. --jobs limits how many run at once
+(--jobs 1 runs them one after another).
 """
+import argparse
 import os
 import sys
 import subprocess
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import List, Tuple, Dict
+from typing import Callable, List, Sequence, Tuple, Dict
+
+from run_tests import parallel_args
 
 
 class Colors:
@@ -31,31 +42,60 @@ class VerificationRunner:
     def __init__(self):
         self.project_root = Path(__file__).parent
         self.results = []
+        self.step_times = {}
         self.start_time = time.time()
+        # Salida de cada paso en un búfer propio: los pasos concurrentes no se mezclan
+        self._local = threading.local()
+        self._print_lock = threading.Lock()
+        
+    def _emit(self, text: str) -> None:
+        """Print a line, or buffer it while a step is running in this thread"""
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            print(text)
+        else:
+            buffer.append(text)
         
     def print_header(self, title: str, emoji: str = "🔍") -> None:
         """Print a formatted header"""
-        print(f"\n{Colors.CYAN}{Colors.BOLD}")
-        print("=" * 70)
-        print(f"{emoji} {title}")
-        print("=" * 70)
-        print(f"{Colors.END}")
+        self._emit(f"\n{Colors.CYAN}{Colors.BOLD}")
+        self._emit("=" * 70)
+        self._emit(f"{emoji} {title}")
+        self._emit("=" * 70)
+        self._emit(f"{Colors.END}")
         
     def print_step(self, step: str, emoji: str = "🔄") -> None:
         """Print a step description"""
-        print(f"\n{Colors.BLUE}{emoji} {step}...{Colors.END}")
+        self._emit(f"\n{Colors.BLUE}{emoji} {step}...{Colors.END}")
         
     def print_success(self, message: str) -> None:
         """Print success message"""
-        print(f"{Colors.GREEN}✅ {message}{Colors.END}")
+        self._emit(f"{Colors.GREEN}✅ {message}{Colors.END}")
         
     def print_error(self, message: str) -> None:
         """Print error message"""
-        print(f"{Colors.RED}❌ {message}{Colors.END}")
+        self._emit(f"{Colors.RED}❌ {message}{Colors.END}")
         
     def print_warning(self, message: str) -> None:
         """Print warning message"""
-        print(f"{Colors.YELLOW}⚠️  {message}{Colors.END}")
+        self._emit(f"{Colors.YELLOW}⚠️  {message}{Colors.END}")
+        
+    def run_step(self, name: str, func: Callable[[], bool]) -> bool:
+        """Run one verification step and print its output as a single block"""
+        self._local.buffer = []
+        start = time.time()
+        try:
+            try:
+                result = bool(func())
+            except Exception as e:
+                self.print_error(f"{name} failed with exception: {e}")
+                result = False
+        finally:
+            self.step_times[name] = time.time() - start
+            lines, self._local.buffer = self._local.buffer, None
+            with self._print_lock:
+                print('\n'.join(lines), flush=True)
+        return result
         
     def run_command(self, cmd: List[str], description: str, critical: bool = True) -> Tuple[bool, str]:
         """Run a command and return success status and output"""
@@ -124,18 +164,17 @@ class VerificationRunner:
         """Install required dependencies"""
         self.print_header("Dependencies Installation", "📦")
         
-        # Install pytest and related packages
+        # Install pytest and related packages (one pip run resolves them all at once)
         pytest_packages = [
-            "pytest", "pytest-cov", "pytest-mock", "pytest-timeout", 
+            "pytest", "pytest-cov", "pytest-mock", "pytest-timeout", "pytest-xdist",
             "coverage", "black", "isort", "flake8"
         ]
         
-        for package in pytest_packages:
-            success, _ = self.run_command(
-                [sys.executable, "-m", "pip", "install", "--user", package],
-                f"Installing {package}",
-                critical=False
-            )
+        success, _ = self.run_command(
+            [sys.executable, "-m", "pip", "install", "--user", *pytest_packages],
+            f"Installing {', '.join(pytest_packages)}",
+            critical=False
+        )
             
         # Try to install project requirements
         if (self.project_root / "requirements.txt").exists():
@@ -241,7 +280,8 @@ except Exception as e:
         
         # Test config module
         success, _ = self.run_command(
-            [sys.executable, "-m", "pytest", "tests/unit/test_config.py", "-v", "--tb=short"],
+            [sys.executable, "-m", "pytest", "tests/unit/test_config.py", "-v", "--tb=short",
+             "-p", "no:cacheprovider"],
             "Config module tests"
         )
         if not success:
@@ -249,7 +289,8 @@ except Exception as e:
             
         # Test crop model
         success, _ = self.run_command(
-            [sys.executable, "-m", "pytest", "tests/unit/test_crop_model.py", "-v", "--tb=short"],
+            [sys.executable, "-m", "pytest", "tests/unit/test_crop_model.py", "-v", "--tb=short",
+             "-p", "no:cacheprovider"],
             "Crop model tests"
         )
         if not success:
@@ -289,9 +330,10 @@ exclude_lines =
         with open(self.project_root / ".coveragerc", "w") as f:
             f.write(coveragerc_content)
         
-        # Run comprehensive tests with coverage
+        # Run comprehensive tests with coverage, sharded over the CPU cores
+        # (pytest-cov merges the coverage data of every xdist worker)
         success, output = self.run_command([
-            sys.executable, "-m", "pytest",
+            sys.executable, "-m", "pytest", *parallel_args('auto'),
             "tests/unit/test_config.py",
             "tests/unit/test_crop_model.py", 
             "tests/unit/test_crop_controller.py",
@@ -364,11 +406,21 @@ except Exception as e:
             sys.executable, "-m", "pytest",
             "tests/unit/test_config.py",
             "tests/unit/test_crop_model.py",
-            "-v", "--tb=short", "--timeout=30"
+            "-v", "--tb=short", "--timeout=30", "-p", "no:cacheprovider"
         ], "CI simulation tests")
         
         return success
     
+    def run_performance_tests(self) -> bool:
+        """Run the throughput benchmarks against the stored baseline"""
+        self.print_header("Performance Benchmarks", "⏱️")
+        
+        success, _ = self.run_command(
+            [sys.executable, "run_tests.py", "--type", "perf", "--no-cov"],
+            "Throughput vs. tests/perf/baseline.json"
+        )
+        return success
+    
     def generate_summary(self) -> None:
         """Generate and print final summary"""
         self.print_header("Summary Report", "📊")
@@ -391,7 +443,10 @@ except Exception as e:
                         print(f"     {error.strip()}")
         
         execution_time = time.time() - self.start_time
-        print(f"\n{Colors.CYAN}Execution time: {execution_time:.1f} seconds{Colors.END}")
+        print(f"\n{Colors.CYAN}Execution time: {execution_time:.1f} seconds "
+              f"(steps: {sum(self.step_times.values()):.1f} seconds){Colors.END}")
+        for name, seconds in sorted(self.step_times.items(), key=lambda item: -item[1]):
+            print(f"  {name:<28} {seconds:6.1f}s")
         
         if failed_tests == 0:
             print(f"\n{Colors.GREEN}{Colors.BOLD}🎉 ALL CHECKS PASSED!{Colors.END}")
@@ -403,8 +458,53 @@ except Exception as e:
             return False
 
 
+def run_step_graph(runner: VerificationRunner, steps: Sequence[Tuple[str, Callable[[], bool], Sequence[str]]],
+                   jobs: int) -> bool:
+    """
+    Run verification steps in dependency order, independent ones concurrently
+
+    A step starts once all the steps it depends on have finished (whatever
+    their result, as when they ran one after another).
+
+    Args:
+        runner: Runner that executes and reports each step
+        steps: (name, function, names of the steps it depends on), in the
+            order they should start when several are ready
+        jobs: Maximum number of steps running at the same time
+
+    Returns:
+        True if every step passed
+    """
+    pending = {name: (func, set(deps)) for name, func, deps in steps}
+    unknown = {dep for _, deps in pending.values() for dep in deps} - set(pending)
+    if unknown:
+        raise ValueError(f"Unknown step dependencies: {', '.join(sorted(unknown))}")
+    
+    done = set()
+    all_passed = True
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        running = {}
+        while pending or running:
+            for name in [name for name, (_, deps) in pending.items() if deps <= done]:
+                func, _ = pending.pop(name)
+                running[pool.submit(runner.run_step, name, func)] = name
+            if not running:
+                raise ValueError(f"Circular step dependencies: {', '.join(sorted(pending))}")
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                done.add(running.pop(future))
+                all_passed = future.result() and all_passed
+    return all_passed
+
+
 def main():
     """Main verification function"""
+    parser = argparse.ArgumentParser(description="Complete verification for visualizacion_de_cultivos")
+    parser.add_argument('--perf', action='store_true', help='Also run the performance benchmarks')
+    parser.add_argument('--jobs', '-j', type=int, default=max(2, os.cpu_count() or 1),
+                        help='Steps run at the same time (default: CPU count, at least 2; 1 = sequential)')
+    args = parser.parse_args()
+    
     print(f"{Colors.CYAN}{Colors.BOLD}")
     print("🔍 Complete Verification for visualizacion_de_cultivos")
     print("=" * 70)
@@ -413,33 +513,30 @@ def main():
     runner = VerificationRunner()
     
     try:
-        # Run all verification steps
+        # Grafo de pasos: (nombre, función, pasos de los que depende)
         steps = [
-            ("Environment Check", runner.check_environment),
-            ("Dependencies Installation", runner.install_dependencies),
-            ("Mocking System Test", runner.test_mocking_system),
-            ("Import Tests", runner.run_import_tests),
-            ("Code Quality Checks", runner.run_code_quality_checks),
-            ("Core Tests", runner.run_core_tests),
-            ("CI Simulation", runner.simulate_ci_environment),
-            ("Comprehensive Tests", runner.run_comprehensive_tests),
+            ("Environment Check", runner.check_environment, []),
+            ("Dependencies Installation", runner.install_dependencies, ["Environment Check"]),
+            ("Mocking System Test", runner.test_mocking_system, ["Dependencies Installation"]),
+            ("Import Tests", runner.run_import_tests, ["Dependencies Installation"]),
+            ("Code Quality Checks", runner.run_code_quality_checks, ["Dependencies Installation"]),
+            ("Core Tests", runner.run_core_tests, ["Mocking System Test"]),
+            ("CI Simulation", runner.simulate_ci_environment, ["Mocking System Test"]),
+            # La suite completa (xdist + cobertura) corre sola tras las demás ejecuciones de pytest
+            ("Comprehensive Tests", runner.run_comprehensive_tests, ["Core Tests", "CI Simulation"]),
         ]
+        # Benchmarks opcionales: python verify_all.py --perf (o VERIFY_PERF=true)
+        # Corren solos al final para que ningún otro paso altere las mediciones
+        if args.perf or os.getenv('VERIFY_PERF', 'False').lower() in ('true', '1', 'yes', 'on'):
+            steps.append(("Performance Benchmarks", runner.run_performance_tests, [name for name, _, _ in steps]))
         
-        all_passed = True
-        for step_name, step_func in steps:
-            try:
-                result = step_func()
-                if not result:
-                    all_passed = False
-            except Exception as e:
-                runner.print_error(f"{step_name} failed with exception: {e}")
-                all_passed = False
+        steps_passed = run_step_graph(runner, steps, args.jobs)
         
         # Generate final summary
         summary_passed = runner.generate_summary()
         
         # Exit with appropriate code
-        sys.exit(0 if summary_passed else 1)
+        sys.exit(0 if steps_passed and summary_passed else 1)
         
     except KeyboardInterrupt:
         print(f"\n{Colors.YELLOW}Verification interrupted by user{Colors.END}")
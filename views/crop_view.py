@@ -11,6 +11,12 @@ import os
 import unicodedata
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from models.crop_aggregates import CropAggregateService
+from models.crop_schema import CROP_NAMES
+from models.query_engine import CropQueryEngine
+from models.zone_records import ZoneResults
+from views.signal_wiring import SignalWiring
+from models.spatial_filter import SPATIAL_MODE_EXTENT, SPATIAL_MODE_NONE, SPATIAL_MODE_POLYGON
 
 class RangeSlider(QFrame):
     """Widget personalizado para seleccionar un rango de valores"""
@@ -127,8 +133,11 @@ class RangeSlider(QFrame):
                 painter.drawText(pos - text_width // 2, track_y + track_height // 2 + 25, text)
 
 class CropView(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, query_engine=None, aggregates=None):
         super(CropView, self).__init__(parent)
+        self.query_engine = query_engine or CropQueryEngine()
+        self.aggregates = aggregates or CropAggregateService(self.query_engine)
+        self.signals = SignalWiring()
         self.setup_ui()
         
     def setup_ui(self):
@@ -199,6 +208,19 @@ class CropView(QDialog):
         radio_widget.setLayout(radio_layout)
         search_layout.addRow("Departamentos:", radio_widget)
 
+        # Spatial filter mode
+        self.cmbAreaBusqueda = QComboBox()
+        self.cmbAreaBusqueda.setStyleSheet("QComboBox { padding: 4px; font-size: 14px; }")
+        self.cmbAreaBusqueda.addItem("Todo el departamento", SPATIAL_MODE_NONE)
+        self.cmbAreaBusqueda.addItem("Extensión actual del mapa", SPATIAL_MODE_EXTENT)
+        self.cmbAreaBusqueda.addItem("Polígono dibujado", SPATIAL_MODE_POLYGON)
+        self.btnDibujarPoligono = QPushButton("Dibujar")
+        self.btnDibujarPoligono.setToolTip("Clic izquierdo agrega vértices, clic derecho cierra el polígono")
+        area_layout = QHBoxLayout()
+        area_layout.addWidget(self.cmbAreaBusqueda)
+        area_layout.addWidget(self.btnDibujarPoligono)
+        search_layout.addRow("Área de búsqueda:", area_layout)
+
         search_group.setLayout(search_layout)
         layout.addWidget(search_group)
 
@@ -314,9 +336,7 @@ class CropView(QDialog):
 
         self.cmbStatsCultivo = QComboBox()
         self.cmbStatsCultivo.setStyleSheet("QComboBox { padding: 4px; font-size: 14px; }")
-        self.cmbStatsCultivo.addItems([
-            "Maíz", "Frijol", "Caña de azúcar", "Papa", "Café", "Tomate"
-        ])
+        self.cmbStatsCultivo.addItems(CROP_NAMES)
         stats_filters_layout.addRow("Tipo de Cultivo:", self.cmbStatsCultivo)
 
         stats_filters_group.setLayout(stats_filters_layout)
@@ -331,8 +351,8 @@ class CropView(QDialog):
         tab_widget.addTab(stats_tab, "Estadísticas")
 
         # Conectar señales para actualizar el gráfico
-        self.cmbStatsDepartamento.currentIndexChanged.connect(self.update_stats_chart)
-        self.cmbStatsCultivo.currentIndexChanged.connect(self.update_stats_chart)
+        self.signals.connect(self.cmbStatsDepartamento, 'currentIndexChanged', self.update_stats_chart)
+        self.signals.connect(self.cmbStatsCultivo, 'currentIndexChanged', self.update_stats_chart)
         self.update_stats_chart()
 
     def update_stats_chart(self):
@@ -350,34 +370,12 @@ class CropView(QDialog):
                 return
             dep = self.cmbStatsDepartamento.currentText()
             cultivo = self.cmbStatsCultivo.currentText()
-            cultivo_col_map = {
-                "Maíz": "CUL_MAIZ",
-                "Frijol": "CUL_FRIJOL",
-                "Caña de azúcar": "CUL_CAÑA_DE_AZUCAR",
-                "Papa": "CUL_PAPA",
-                "Café": "CUL_CAFE",
-                "Tomate": "CUL_TOMATE"
-            }
-            col_cultivo = cultivo_col_map.get(cultivo)
+            col_cultivo = self.query_engine.crop_column(layer, cultivo)
             if not col_cultivo:
                 self.stats_figure.clear()
                 self.stats_canvas.draw()
                 return
-            def normalize(text):
-                if text == 'SANTA ANA':
-                    return 'SANTA ANA'
-                text = text.upper()
-                import unicodedata
-                text = ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
-                return text
-            dep_norm = normalize(dep)
-            counts = {"Alto": 0, "Medio": 0, "Bajo": 0}
-            for feature in layer.getFeatures():
-                nom_dpto = feature["NOM_DPTO"]
-                nom_dpto_norm = normalize(nom_dpto)
-                prod = str(feature[col_cultivo]).strip().capitalize() if feature[col_cultivo] else None
-                if nom_dpto_norm == dep_norm and prod in counts:
-                    counts[prod] += 1
+            counts = self.query_engine.level_counts(layer, dep, col_cultivo)
             total = sum(counts.values())
             self.stats_figure.clear()
             ax = self.stats_figure.add_subplot(111)
@@ -401,16 +399,18 @@ class CropView(QDialog):
             self.stats_canvas.draw()
 
     def set_available_crops(self, crops):
-        """Set available crops in the combo box"""
-        self.cmbCultivo.clear()
-        self.cmbCultivo.addItems(crops)
-        # Conectar señal para actualizar datos
-        self.cmbCultivo.currentIndexChanged.connect(self.update_data_section)
+        """Set available crops in the query, statistics and table combo boxes"""
+        # Sin señales durante clear()/addItems(), que emitirían currentIndexChanged
+        # dos veces por combo; cada sección se refresca una sola vez al final
+        for combo in (self.cmbCultivo, self.cmbStatsCultivo, self.cmbTableCultivo):
+            combo.blockSignals(True)
+            combo.clear()
+            combo.addItems(crops)
+            combo.blockSignals(False)
+        # Conectar señal para actualizar datos (una sola vez aunque se llame de nuevo)
+        self.signals.connect(self.cmbCultivo, 'currentIndexChanged', self.update_data_section)
         self.update_data_section()
-        
-        # También configurar los cultivos en la pestaña de tabla
-        self.cmbTableCultivo.clear()
-        self.cmbTableCultivo.addItems(crops)
+        self.update_stats_chart()
         
     def get_selected_crop(self):
         """Get the selected crop type"""
@@ -449,6 +449,10 @@ class CropView(QDialog):
     def get_selected_zone(self):
         return self.cmbZona.currentText()
 
+    def get_spatial_mode(self):
+        """Spatial filter mode of the query (SPATIAL_MODE_* constant)"""
+        return self.cmbAreaBusqueda.currentData() or SPATIAL_MODE_NONE
+
     def get_selected_departments(self):
         # Devuelve una lista con el departamento seleccionado, o vacía si ninguno
         seleccionados = [radio.text() for radio in self.radio_departamentos if radio.isChecked()]
@@ -464,6 +468,7 @@ class CropView(QDialog):
             self.cmbCultivo.setCurrentIndex(0)
         if self.cmbProduccion.count() > 0:
             self.cmbProduccion.setCurrentIndex(0)
+        self.cmbAreaBusqueda.setCurrentIndex(0)
         self.lblFeatureCount.setText("0")
         self.status_label.setText("")
         
@@ -473,42 +478,22 @@ class CropView(QDialog):
     def update_data_section(self):
         """Actualizar la sección de datos según el cultivo seleccionado"""
         crop = self.get_selected_crop()
-        data = {
-            "Maíz": [
-                ("Producción alta", "18,500 toneladas"),
-                ("Producción media", "12,000 toneladas"),
-                ("Producción baja", "6,500 toneladas")
-            ],
-            "Frijol": [
-                ("Producción alta", "9,200 toneladas"),
-                ("Producción media", "6,500 toneladas"),
-                ("Producción baja", "3,800 toneladas")
-            ],
-            "Caña de azúcar": [
-                ("Producción alta", "250,000 toneladas"),
-                ("Producción media", "180,000 toneladas"),
-                ("Producción baja", "110,000 toneladas")
-            ],
-            "Café": [
-                ("Producción alta", "22,000 toneladas"),
-                ("Producción media", "14,000 toneladas"),
-                ("Producción baja", "7,500 toneladas")
-            ],
-            "Papa": [
-                ("Producción alta", "6,800 toneladas"),
-                ("Producción media", "4,200 toneladas"),
-                ("Producción baja", "2,100 toneladas")
-            ],
-            "Tomate": [
-                ("Producción alta", "5,500 toneladas"),
-                ("Producción media", "3,800 toneladas"),
-                ("Producción baja", "2,300 toneladas")
-            ]
-        }
-        if crop in data:
+        layer = None
+        if crop:
+            from qgis.core import QgsProject
+            for lyr in QgsProject.instance().mapLayers().values():
+                if lyr.name() == "Zonas de Cultivos":
+                    layer = lyr
+                    break
+        col_cultivo = self.query_engine.crop_column(layer, crop)
+        if layer is not None and col_cultivo:
+            # Totales reales de la capa, calculados una vez por sesión
+            totals = self.aggregates.totals(layer, col_cultivo)
+            labels = [("Alto", "Producción alta"), ("Medio", "Producción media"), ("Bajo", "Producción baja")]
             text = f"<b>{crop}</b><br>"
-            for label, value in data[crop]:
-                text += f"&nbsp;&nbsp;• {label}: <b>{value}</b><br>"
+            for level, label in labels:
+                zonas, area = totals[level]
+                text += f"&nbsp;&nbsp;• {label}: <b>{zonas} zonas</b> ({area:,.2f} km²)<br>"
         else:
             text = "No hay datos disponibles para este cultivo."
         self.data_label.setText(text)
@@ -532,9 +517,7 @@ class CropView(QDialog):
         # Selector de cultivo
         self.cmbTableCultivo = QComboBox()
         self.cmbTableCultivo.setStyleSheet("QComboBox { padding: 4px; font-size: 14px; }")
-        self.cmbTableCultivo.addItems([
-            "Maíz", "Frijol", "Caña de azúcar", "Papa", "Café", "Tomate"
-        ])
+        self.cmbTableCultivo.addItems(CROP_NAMES)
         table_filters_layout.addRow("Tipo de Cultivo:", self.cmbTableCultivo)
 
         # Contador TOP
@@ -662,13 +645,14 @@ class CropView(QDialog):
         return self.rangeSlider.getRange()[1]
         
     def update_table_data(self, data):
-        """Update the table with new data"""
+        """Update the table with new data (rows of values or ZoneResults)"""
         self.tableWidget.setRowCount(0)  # Clear existing rows
         
         if not data:
             return
             
-        for row, item_data in enumerate(data):
+        for row in range(len(data)):
+            item_data = data.display_row(row) if isinstance(data, ZoneResults) else data[row]
             self.tableWidget.insertRow(row)
             for col, value in enumerate(item_data):
                 item = QTableWidgetItem(str(value))
@@ -0,0 +1,93 @@
+"""
+Idempotent signal/slot wiring for CropView and CropController.
+
+Qt keeps every connect() call, so wiring the same slot twice makes it run
+twice per emission. SignalWiring remembers each (sender, signal, slot)
+connection and ignores repeated requests. In debug mode every slot is
+wrapped with an invocation counter, which can be read per user action to
+spot slots that run more often than expected.
+"""
+import inspect
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+from config import Config
+
+
+def _slot_label(slot: Callable) -> str:
+    return getattr(slot, '__qualname__', None) or repr(slot)
+
+
+def _max_positional(slot: Callable):
+    """Number of positional arguments a slot accepts (None if unlimited)"""
+    try:
+        parameters = inspect.signature(slot).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    if any(p.kind == p.VAR_POSITIONAL for p in parameters):
+        return None
+    return sum(1 for p in parameters if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD))
+
+
+class SignalWiring:
+    """Registry of signal connections that makes connect() idempotent"""
+
+    def __init__(self, debug: bool = None):
+        self.debug = Config.DEBUG if debug is None else debug
+        self.invocations = Counter()
+        self._connections: Dict[tuple, tuple] = {}
+
+    def connect(self, sender, signal_name: str, slot: Callable) -> bool:
+        """
+        Connect sender.<signal_name> to slot unless already connected
+
+        Returns:
+            True if a new connection was made, False if it already existed
+        """
+        key = (id(sender), signal_name, slot)
+        if key in self._connections:
+            return False
+        receiver = self._counted(slot) if self.debug else slot
+        getattr(sender, signal_name).connect(receiver)
+        self._connections[key] = (sender, receiver)
+        return True
+
+    def disconnect(self, sender, signal_name: str, slot: Callable) -> bool:
+        """Remove a connection made through connect()"""
+        entry = self._connections.pop((id(sender), signal_name, slot), None)
+        if entry is None:
+            return False
+        getattr(sender, signal_name).disconnect(entry[1])
+        return True
+
+    def connection_count(self) -> int:
+        """Number of live connections made through the registry"""
+        return len(self._connections)
+
+    @contextmanager
+    def measure(self):
+        """
+        Count the slot invocations triggered inside the block
+
+        Yields a Counter of slot name -> invocations, filled when the block
+        ends (empty unless debug mode is on).
+        """
+        before = Counter(self.invocations)
+        counts = Counter()
+        try:
+            yield counts
+        finally:
+            counts.update(self.invocations - before)
+
+    def _counted(self, slot: Callable) -> Callable:
+        label = _slot_label(slot)
+        limit = _max_positional(slot)
+
+        def receiver(*args):
+            self.invocations[label] += 1
+            # Qt entrega todos los argumentos de la señal; el slot puede aceptar menos
+            return slot(*(args if limit is None else args[:limit]))
+
+        receiver.__qualname__ = label
+        return receiver